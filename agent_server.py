@@ -1,22 +1,88 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
+import httpx
 import os
 from dotenv import load_dotenv
-from quart import Quart, request, jsonify
+from quart import Quart, request, jsonify, make_response
 from datetime import datetime
 import argparse
+from app.agent_cache import AgentClientCache
+from app.agent_manager import AgentManager
+from app.cluster import create_router_app, spawn_workers
+from app.concurrency import KeyedLock, SingleFlight
+from app.history import HistoryManager
+from app.intent_parser import IntentParser
+from app.json_provider import FastJSONProvider
+from app.loop_monitor import LoopMonitor
+from app.pending_actions import (
+    PendingActionStore,
+    describe_tool_calls,
+    is_confirmation,
+    is_rejection,
+)
+from app.profiler import RequestProfiler
+from app.response_templates import ResponseTemplates
+from app.result_cache import ResultCache
+from app.result_shapers import ResultShapers
+from app.session_store import create_session_store
+from app.tool_router import ToolRouter
 from injective_functions.factory import InjectiveClientFactory
+from injective_functions.triggers import InjectiveTriggers
+from injective_functions.triggers.engine import PriceTriggerEngine
+from injective_functions.utils import json_codec
+from injective_functions.utils.indexer_requests import (
+    cached_derivative_tickers,
+    prefetch_metadata,
+)
+from injective_functions.utils.metrics import (
+    REGISTRY,
+    STAGE_SECONDS,
+    TURN_SECONDS,
+    TURNS_IN_FLIGHT,
+)
+from injective_functions.utils.tracing import TRACER, current_span, span
 from injective_functions.utils.function_helper import (
     FunctionSchemaLoader,
     FunctionExecutor,
+    InjectiveFunctionMapper,
 )
 import json
 import asyncio
+import hmac
+import importlib
+import time
+from typing import Optional
 from hypercorn.config import Config
 from hypercorn.asyncio import serve
 import aiohttp
 
 # Initialize Quart app (async version of Flask)
 app = Quart(__name__)
+app.json = FastJSONProvider(app)
+
+SYSTEM_PROMPT = """You are a helpful AI assistant on Injective Chain. 
+                    You will be answering all things related to injective chain, and help out with
+                    on-chain functions.
+                    
+                    When handling market IDs, always use these standardized formats:
+                    - For BTC perpetual: "BTC/USDT PERP" maps to "btcusdt-perp"
+                    - For ETH perpetual: "ETH/USDT PERP" maps to "ethusdt-perp"
+                    
+                    When users mention markets:
+                    1. If they use casual terms like "Bitcoin perpetual" or "BTC perp", interpret it as "BTC/USDT PERP"
+                    2. If they mention "Ethereum futures" or "ETH perpetual", interpret it as "ETH/USDT PERP"
+                    3. Always use the standardized format in your responses
+                    
+                    When users want to perform an action, call the function directly:
+                    the user is shown the action and asked for an explicit "yes"
+                    before it is executed, so do not ask for confirmation yourself.
+                    
+                    When making function calls:
+                    1. Convert the standardized format (e.g., "BTC/USDT PERP") to the internal format (e.g., "btcusdt-perp")
+                    2. When displaying results to users, convert back to the standard format
+                    
+                    For general questions, provide informative responses."""
+
+DEFAULT_RESPONSE = "I'm here to help you with trading on Injective Chain. You can ask me about trading, checking balances, making transfers, or staking. How can I assist you today?"
 
 
 class InjectiveChatAgent:
@@ -31,13 +97,74 @@ class InjectiveChatAgent:
                 "No OpenAI API key found. Please set the OPENAI_API_KEY environment variable."
             )
 
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
+        # Per-request timeout for completion calls, in seconds
+        self.llm_timeout = float(os.getenv("OPENAI_TIMEOUT", "60"))
+        # Model of the first call of a turn and of the calls following tool results
+        self.chat_model = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o")
+        self.followup_model = os.getenv("OPENAI_FOLLOWUP_MODEL", "gpt-4-turbo-preview")
+        # Rounds of tool calls allowed in one turn before an answer is forced
+        self.max_tool_iterations = int(os.getenv("MAX_TOOL_ITERATIONS", "3"))
+
+        # Initialize OpenAI client on a connection pool shared by every chat,
+        # so concurrent turns are bounded by sockets rather than threads
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "1000")),
+                max_keepalive_connections=int(
+                    os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "200")
+                ),
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(self.llm_timeout, connect=10.0),
+        )
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            http_client=self.http_client,
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+        )
 
         # Initialize conversation histories
-        self.conversations = {}
-        # Initialize injective agents
-        self.agents = {}
+        # Each session is kept within a token budget; evicted turns are folded
+        # into a rolling summary in the background
+        self.summary_model = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+        # Sessions live in a bounded LRU/TTL store, optionally persisted to SQLite
+        self.session_store = create_session_store(
+            os.getenv("SESSION_STORE", "memory"),
+            path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+            max_sessions=int(os.getenv("SESSION_MAX_RESIDENT", "10000")),
+            ttl=float(os.getenv("SESSION_TTL", str(24 * 3600))),
+        )
+        self.conversations = HistoryManager(
+            max_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "6000")),
+            max_function_tokens=int(os.getenv("HISTORY_MAX_FUNCTION_TOKENS", "800")),
+            summarizer=self.summarize_history,
+            store=self.session_store,
+        )
+        # Initialize injective agents; idle ones are evicted and their channels
+        # closed, agents with active conditional orders stay resident
+        self.agents = AgentClientCache(
+            close=self.close_agent,
+            max_agents=int(os.getenv("AGENT_CACHE_SIZE", "256")),
+            idle_ttl=float(os.getenv("AGENT_IDLE_TTL", "1800")),
+            pinned=lambda: self.trigger_engine.active_agents(),
+        )
+        self.agent_init = SingleFlight()
+        # False while configured agents are warmed up, /ping answers 503 until then
+        self.ready = True
+        self.warmup_status = {}
+        self.session_locks = KeyedLock()
+        # INJECTIVE_CLIENT_FACTORY="module:function" replaces the chain clients,
+        # e.g. benchmarks.fake_chain:create_all for offline load tests
+        factory = os.getenv("INJECTIVE_CLIENT_FACTORY")
+        if factory:
+            module_name, _, function_name = factory.partition(":")
+            self.create_clients = getattr(
+                importlib.import_module(module_name), function_name
+            )
+        else:
+            self.create_clients = InjectiveClientFactory.create_all
+        # Conditional orders of every agent share one engine and price feed
+        self.trigger_engine = PriceTriggerEngine(get_clients=self.agents.get)
         schema_paths = [
             "./injective_functions/account/account_schema.json",
             "./injective_functions/auction/auction_schema.json",
@@ -46,19 +173,130 @@ class InjectiveChatAgent:
             "./injective_functions/exchange/exchange_schema.json",
             "./injective_functions/staking/staking_schema.json",
             "./injective_functions/token_factory/token_factory_schema.json",
+            "./injective_functions/triggers/triggers_schema.json",
             "./injective_functions/utils/utils_schema.json",
         ]
         self.function_schemas = FunctionSchemaLoader.load_schemas(schema_paths)
+        # Only the schemas relevant to a turn are sent, TOOL_ROUTER_TOP_K=0 sends all
+        self.tool_router = ToolRouter(
+            self.function_schemas, top_k=int(os.getenv("TOOL_ROUTER_TOP_K", "8"))
+        )
+        # Read results with a template are answered without a follow-up model
+        # call; RESPONSE_TEMPLATES is "all", "none" or a list of function names
+        self.response_templates = ResponseTemplates.from_setting(
+            os.getenv("RESPONSE_TEMPLATES")
+        )
+        # Commands like "balance" or "buy 0.01 btc perp 5x" are parsed locally,
+        # INTENT_PARSER=false routes every message to the model
+        self.intent_parser = IntentParser(
+            enabled=os.getenv("INTENT_PARSER", "true").lower() == "true",
+            markets=cached_derivative_tickers,
+        )
+        # Market reads are shared across sessions of a network for a few
+        # seconds, RESULT_CACHE=false sends every read to the chain
+        self.result_cache = ResultCache(
+            enabled=os.getenv("RESULT_CACHE", "true").lower() == "true"
+        )
+        # The model sees compact views of large results such as orderbooks,
+        # RESULT_SHAPERS is "all", "none" or a list of function names
+        self.result_shapers = ResultShapers.from_setting(
+            os.getenv("RESULT_SHAPERS"),
+            max_tokens=self.conversations.max_function_tokens,
+        )
+        # State-changing calls proposed by the model wait here for a "yes"
+        self.pending_actions = PendingActionStore(
+            ttl=float(os.getenv("PENDING_ACTION_TTL", "120"))
+        )
+        # Heartbeat measuring event loop lag; callbacks blocking the loop for
+        # more than LOOP_STALL_THRESHOLD seconds are recorded with their stack
+        self.loop_monitor = LoopMonitor(
+            interval=float(os.getenv("LOOP_LAG_INTERVAL", "0.1")),
+            threshold=float(os.getenv("LOOP_STALL_THRESHOLD", "0.25")),
+        )
+        # Single /chat requests are profiled on demand, see admin_authorized()
+        self.profiler = RequestProfiler(
+            directory=os.getenv("PROFILE_DIR", "profiles"),
+            min_interval=float(os.getenv("PROFILE_MIN_INTERVAL", "60")),
+            max_profiles=int(os.getenv("PROFILE_MAX_FILES", "20")),
+        )
 
     async def initialize_agent(
         self, agent_id: str, private_key: str, environment: str = "testnet"
     ) -> None:
         """Initialize Injective clients if they don't exist"""
-        if agent_id not in self.agents:
-            clients = await InjectiveClientFactory.create_all(
-                private_key=private_key, network_type=environment
-            )
-            self.agents[agent_id] = clients
+        if agent_id in self.agents:
+            return
+        # concurrent first requests of an agent share one initialization
+        await self.agent_init.do(
+            agent_id, lambda: self._create_agent(agent_id, private_key, environment)
+        )
+
+    async def warm_up(self, agents: dict, concurrency: int = 8) -> None:
+        """
+        Initialize agents and download the chain registries before users do.
+
+        Clients are stored under the agent address, the agent_id that clients
+        send with their requests.
+
+        Args:
+            agents (dict): name -> {"address": ..., "private_key": ..., "network": ...},
+                as in agents_config.yaml
+            concurrency (int): Agents initialized at the same time
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(concurrency)
+        self.ready = False
+        self.warmup_status = {
+            "agents": len(agents),
+            "initialized": 0,
+            "failed": {},
+            "metadata": {},
+        }
+
+        async def initialize(name: str, config: dict) -> None:
+            async with semaphore:
+                try:
+                    await self.initialize_agent(
+                        config["address"],
+                        config["private_key"],
+                        config.get("network", "testnet"),
+                    )
+                    self.warmup_status["initialized"] += 1
+                except Exception as e:
+                    self.warmup_status["failed"][name] = str(e)
+
+        async def prefetch(network: str) -> None:
+            try:
+                self.warmup_status["metadata"][network] = await prefetch_metadata(
+                    network
+                )
+            except Exception as e:
+                self.warmup_status["metadata"][network] = {"error": str(e)}
+
+        networks = {config.get("network", "testnet") for config in agents.values()}
+        await asyncio.gather(
+            *[prefetch(network) for network in networks],
+            *[initialize(name, config) for name, config in agents.items()],
+        )
+        self.warmup_status["seconds"] = time.perf_counter() - started
+        print(f"Warm-up finished: {self.warmup_status}")
+        self.ready = True
+
+    @staticmethod
+    async def close_agent(clients: dict) -> None:
+        """Release the channels of an agent, every module shares one chain client"""
+        await clients["trader"].chain_client.close()
+
+    async def _create_agent(
+        self, agent_id: str, private_key: str, environment: str
+    ) -> None:
+        clients = await self.create_clients(
+            private_key=private_key, network_type=environment
+        )
+        clients["triggers"] = InjectiveTriggers(
+            clients["trader"].chain_client, self.trigger_engine, agent_id
+        )
+        self.agents[agent_id] = clients
 
     async def execute_function(
         self, function_name: str, arguments: dict, agent_id: str
@@ -72,9 +310,25 @@ class InjectiveChatAgent:
                     "error": "Agent not initialized. Please provide valid credentials."
                 }
 
-            return await FunctionExecutor.execute_function(
-                clients=clients, function_name=function_name, arguments=arguments
-            )
+            chain_client = clients["bank"].chain_client
+            network = chain_client.network_type
+            address = chain_client.address.to_acc_bech32()
+
+            async def fetch():
+                return await FunctionExecutor.execute_function(
+                    clients=clients, function_name=function_name, arguments=arguments
+                )
+
+            if self.result_cache.cacheable(function_name):
+                return await self.result_cache.get_or_fetch(
+                    self.result_cache.key(network, address, function_name, arguments),
+                    fetch,
+                )
+            result = await fetch()
+            if not InjectiveFunctionMapper.is_read_only(function_name):
+                # balances and orders of the account changed
+                self.result_cache.invalidate_account(network, address)
+            return result
 
         except Exception as e:
             return {
@@ -83,7 +337,190 @@ class InjectiveChatAgent:
                 "details": {"function": function_name, "arguments": arguments},
             }
 
-    async def get_response(
+    async def _stream_completion(self, **kwargs):
+        """
+        Stream a chat completion.
+
+        Yields ("token", text) for every content delta and finally
+        ("message", {"content": ..., "tool_calls": [...]}) with the accumulated message.
+        """
+        stream = await self.client.chat.completions.create(
+            stream=True,
+            max_tokens=2000,
+            temperature=0.7,
+            timeout=self.llm_timeout,
+            **kwargs,
+        )
+        content = []
+        tool_calls = {}
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content.append(delta.content)
+                yield "token", delta.content
+            # tool calls arrive in pieces keyed by their position in the response
+            for tool_call in delta.tool_calls or []:
+                call = tool_calls.setdefault(
+                    tool_call.index, {"id": "", "name": "", "arguments": ""}
+                )
+                call["id"] += tool_call.id or ""
+                if tool_call.function:
+                    call["name"] += tool_call.function.name or ""
+                    call["arguments"] += tool_call.function.arguments or ""
+
+        yield "message", {
+            "content": "".join(content) or None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)],
+        }
+
+    async def execute_tool_calls(self, tool_calls: list, agent_id: str) -> list:
+        """
+        Execute the tool calls of one model response.
+
+        Consecutive read-only calls run concurrently, state-changing calls run
+        one at a time in the order the model issued them.
+        """
+        results = [None] * len(tool_calls)
+
+        async def run(index):
+            call = tool_calls[index]
+            try:
+                arguments = json.loads(call["arguments"] or "{}")
+            except json.JSONDecodeError as e:
+                results[index] = {"success": False, "error": f"Invalid arguments: {e}"}
+                return
+            with span("tool", function=call["name"], call_id=call["id"]) as tool:
+                results[index] = await self.execute_function(
+                    call["name"], arguments, agent_id
+                )
+                result = results[index]
+                if isinstance(result, dict) and (
+                    "error" in result or result.get("success") is False
+                ):
+                    tool.set(failed=True)
+
+        index = 0
+        while index < len(tool_calls):
+            if InjectiveFunctionMapper.is_read_only(tool_calls[index]["name"]):
+                end = index
+                while end < len(tool_calls) and InjectiveFunctionMapper.is_read_only(
+                    tool_calls[end]["name"]
+                ):
+                    end += 1
+                await asyncio.gather(*[run(i) for i in range(index, end)])
+                index = end
+            else:
+                await run(index)
+                index += 1
+        return results
+
+    def _function_call_events(self, tool_calls: list) -> list:
+        return [
+            {
+                "event": "function_call",
+                "data": {
+                    "id": call["id"],
+                    "name": call["name"],
+                    "arguments": call["arguments"],
+                },
+            }
+            for call in tool_calls
+        ]
+
+    def _function_result_events(
+        self, tool_calls: list, results: list, function_calls: list
+    ) -> list:
+        events = []
+        for call, result in zip(tool_calls, results):
+            function_calls.append({"name": call["name"], "result": result})
+            events.append(
+                {
+                    "event": "function_result",
+                    "data": {"id": call["id"], "name": call["name"], "result": result},
+                }
+            )
+        return events
+
+    def _propose_action(
+        self, session_id: str, agent_id, environment, tool_calls: list, content
+    ) -> tuple:
+        """
+        Store state-changing calls until the user confirms them.
+
+        Returns the events to stream and the assistant message of the turn,
+        which starts with content, the text the model already streamed.
+        """
+        self.pending_actions.propose(session_id, tool_calls, agent_id, environment)
+        prompt = (
+            "Please confirm that I should execute:\n"
+            + describe_tool_calls(tool_calls)
+            + '\nReply "yes" to proceed or "no" to cancel.'
+        )
+        content = (content or "").strip()
+        if content:
+            prompt = "\n\n" + prompt
+        events = [
+            {
+                "event": "confirmation_required",
+                "data": {"tool_calls": tool_calls, "expires_in": self.pending_actions.ttl},
+            },
+            {"event": "token", "data": {"content": prompt}},
+        ]
+        return events, content + prompt
+
+    async def _execute_and_record(
+        self, session_id: str, agent_id: str, content, tool_calls: list
+    ) -> list:
+        """
+        Execute a round of tool calls and add it to the session history.
+
+        A disconnecting client must not abandon a transaction halfway
+        through, so execution and recording are shielded together: executed
+        calls always end up in the history, even when the turn is cancelled.
+        """
+
+        async def execute_and_record() -> list:
+            with STAGE_SECONDS.time(stage="functions"), span(
+                "tools", calls=len(tool_calls)
+            ):
+                results = await self.execute_tool_calls(tool_calls, agent_id)
+
+            self.conversations.append(
+                session_id,
+                {
+                    "role": "assistant",
+                    "content": content,
+                    "tool_calls": [
+                        {
+                            "id": call["id"],
+                            "type": "function",
+                            "function": {
+                                "name": call["name"],
+                                "arguments": call["arguments"],
+                            },
+                        }
+                        for call in tool_calls
+                    ],
+                },
+            )
+            # the model gets compact views of large results, the client still
+            # receives the full results
+            for call, result in zip(tool_calls, results):
+                self.conversations.append(
+                    session_id,
+                    {
+                        "role": "tool",
+                        "tool_call_id": call["id"],
+                        "content": self.result_shapers.content(call["name"], result),
+                    },
+                )
+            return results
+
+        return await asyncio.shield(execute_and_record())
+
+    async def stream_response(
         self,
         message,
         session_id="default",
@@ -91,167 +528,389 @@ class InjectiveChatAgent:
         agent_id=None,
         environment="testnet",
     ):
-        """Get response from OpenAI API."""
-        await self.initialize_agent(
-            agent_id=agent_id, private_key=private_key, environment=environment
-        )
+        """
+        Get response from OpenAI API as a sequence of events.
+
+        Yields dictionaries of the form {"event": ..., "data": ...} where event is
+        "token", "function_call", "function_result", "confirmation_required" or
+        "done". The "done" event carries the same payload get_response returns.
+
+        Turns of the same session are queued and run in arrival order, turns of
+        different sessions run concurrently.
+        """
+        queued = time.perf_counter()
+        with TURNS_IN_FLIGHT.track_inprogress():
+            async with self.session_locks.hold(session_id), self.agents.lease(
+                agent_id
+            ):
+                waited = time.perf_counter() - queued
+                STAGE_SECONDS.observe(waited, stage="queue")
+                current_span().set(queue_ms=round(waited * 1000, 3))
+                async for event in self._stream_turn(
+                    message, session_id, private_key, agent_id, environment
+                ):
+                    yield event
+
+    async def _stream_turn(
+        self, message, session_id, private_key, agent_id, environment
+    ):
+        turn_started = time.perf_counter()
+        with STAGE_SECONDS.time(stage="agent_init"), span("agent_init"):
+            await self.initialize_agent(
+                agent_id=agent_id, private_key=private_key, environment=environment
+            )
         print("initialized agents")
+        # Initialize conversation history for new sessions
+        await self.conversations.load(session_id)
+        history = self.conversations.get(session_id)
+
+        # Remember where this turn starts so it can be rolled back if the
+        # HTTP client disconnects before the turn is recorded
+        turn_start = None
+        recorded = False
+        function_calls = []
+        proposed_calls = None
         try:
-            # Initialize conversation history for new sessions
-            if session_id not in self.conversations:
-                self.conversations[session_id] = []
-
-            # Add user message to conversation history
-            self.conversations[session_id].append({"role": "user", "content": message})
-
-            # Get response from OpenAI
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a helpful AI assistant on Injective Chain. 
-                    You will be answering all things related to injective chain, and help out with
-                    on-chain functions.
-                    
-                    When handling market IDs, always use these standardized formats:
-                    - For BTC perpetual: "BTC/USDT PERP" maps to "btcusdt-perp"
-                    - For ETH perpetual: "ETH/USDT PERP" maps to "ethusdt-perp"
-                    
-                    When users mention markets:
-                    1. If they use casual terms like "Bitcoin perpetual" or "BTC perp", interpret it as "BTC/USDT PERP"
-                    2. If they mention "Ethereum futures" or "ETH perpetual", interpret it as "ETH/USDT PERP"
-                    3. Always use the standardized format in your responses
-                    
-                    Before performing any action:
-                    1. Describe what you're about to do
-                    2. Ask for explicit confirmation
-                    3. Only proceed after receiving a "yes"
-                    
-                    When making function calls:
-                    1. Convert the standardized format (e.g., "BTC/USDT PERP") to the internal format (e.g., "btcusdt-perp")
-                    2. When displaying results to users, convert back to the standard format
-                    3. Always confirm before executing any functions
-                    
-                    For general questions, provide informative responses.
-                    When users want to perform actions, describe the action and ask for confirmation but for fetching data you dont have to ask for confirmation.""",
-                    }
-                ]
-                + self.conversations[session_id],
-                functions=self.function_schemas,
-                function_call="auto",
-                max_tokens=2000,
-                temperature=0.7,
-            )
+            bot_message = None
+            first_iteration = 0
+            messages_since = None
+            route = "llm"
 
-            response_message = response.choices[0].message
-            print(response_message)
-            # Handle function calling
-            if (
-                hasattr(response_message, "function_call")
-                and response_message.function_call
-            ):
-                # Extract function details
-                function_name = response_message.function_call.name
-                function_args = json.loads(response_message.function_call.arguments)
-                # Execute the function
-                function_response = await self.execute_function(
-                    function_name, function_args, agent_id
+            # Any new message settles the action proposed in the previous turn:
+            # explicit answers are handled here without asking the model
+            pending = self.pending_actions.pop(session_id, agent_id, environment)
+            if pending is not None and is_confirmation(message):
+                self.pending_actions.confirmed += 1
+                route = "confirmation"
+                turn_start = self.conversations.append(
+                    session_id, {"role": "user", "content": message}
+                )
+                tool_calls = pending.tool_calls
+                for event in self._function_call_events(tool_calls):
+                    yield event
+                # executed calls are recorded even if the client goes away
+                recorded = True
+                results = await self._execute_and_record(
+                    session_id, agent_id, None, tool_calls
                 )
+                for event in self._function_result_events(
+                    tool_calls, results, function_calls
+                ):
+                    yield event
+                bot_message = self.response_templates.render_all(tool_calls, results)
+                if bot_message is not None:
+                    yield {"event": "token", "data": {"content": bot_message}}
+                    first_iteration = self.max_tool_iterations + 1
+                else:
+                    # the model only has to describe the results of this turn
+                    first_iteration = self.max_tool_iterations
+                    messages_since = turn_start
+            elif pending is not None and is_rejection(message):
+                self.pending_actions.rejected += 1
+                route = "confirmation"
+                turn_start = self.conversations.append(
+                    session_id, {"role": "user", "content": message}
+                )
+                bot_message = "Okay, I did not execute it. How else can I help you?"
+                yield {"event": "token", "data": {"content": bot_message}}
+                first_iteration = self.max_tool_iterations + 1
+            else:
+                if pending is not None:
+                    self.pending_actions.abandoned += 1
+                # Unambiguous commands skip the model's first round
+                intent = self.intent_parser.parse(message, environment)
+                if intent is None:
+                    tools = [
+                        {"type": "function", "function": schema}
+                        for schema in self.tool_router.select(
+                            message, history.messages
+                        )
+                    ]
 
-                # Add function call and response to conversation
-                self.conversations[session_id].append(
-                    {
-                        "role": "assistant",
-                        "content": None,
-                        "function_call": {
-                            "name": function_name,
-                            "arguments": json.dumps(function_args),
-                        },
-                    }
+                # Add user message to conversation history
+                turn_start = self.conversations.append(
+                    session_id, {"role": "user", "content": message}
                 )
 
-                self.conversations[session_id].append(
-                    {
-                        "role": "function",
-                        "name": function_name,
-                        "content": json.dumps(function_response),
-                    }
+                if intent is not None:
+                    route = "intent"
+                    tool_calls = [intent.to_tool_call()]
+                    first_iteration = self.max_tool_iterations + 1
+                    if not InjectiveFunctionMapper.is_read_only(intent.function_name):
+                        proposed_calls = tool_calls
+                        events, bot_message = self._propose_action(
+                            session_id, agent_id, environment, tool_calls, None
+                        )
+                        for event in events:
+                            yield event
+                    else:
+                        for event in self._function_call_events(tool_calls):
+                            yield event
+                        # executed calls are recorded even if the client goes away
+                        recorded = True
+                        results = await self._execute_and_record(
+                            session_id, agent_id, None, tool_calls
+                        )
+                        for event in self._function_result_events(
+                            tool_calls, results, function_calls
+                        ):
+                            yield event
+                        bot_message = self.response_templates.render_all(
+                            tool_calls, results
+                        )
+                        if bot_message is not None:
+                            yield {"event": "token", "data": {"content": bot_message}}
+                        else:
+                            first_iteration = self.max_tool_iterations
+                            messages_since = turn_start
+
+            for iteration in range(first_iteration, self.max_tool_iterations + 1):
+                # once the iteration limit is reached the model has to answer
+                context = (
+                    history.messages_since(messages_since)
+                    if messages_since is not None
+                    else history.request_messages()
                 )
+                request = {
+                    "model": self.chat_model if iteration == 0 else self.followup_model,
+                    "messages": [{"role": "system", "content": SYSTEM_PROMPT}] + context,
+                }
+                if iteration < self.max_tool_iterations:
+                    request["tools"] = tools
+                    request["tool_choice"] = "auto"
 
-                # Get final response
-                second_response = await asyncio.to_thread(
-                    self.client.chat.completions.create,
-                    model="gpt-4-turbo-preview",
-                    messages=self.conversations[session_id],
-                    max_tokens=2000,
-                    temperature=0.7,
+                # Get response from OpenAI
+                response_message = None
+                started = time.perf_counter()
+                with span("llm", model=request["model"], iteration=iteration) as llm:
+                    async for kind, payload in self._stream_completion(**request):
+                        if kind == "token":
+                            yield {"event": "token", "data": {"content": payload}}
+                        else:
+                            response_message = payload
+                    llm.set(tool_calls=len(response_message["tool_calls"]))
+                llm_seconds = time.perf_counter() - started
+                STAGE_SECONDS.observe(
+                    llm_seconds, stage="first_llm" if iteration == 0 else "followup_llm"
                 )
+                if iteration > 0:
+                    self.response_templates.observe_llm_latency(llm_seconds)
+                print(response_message)
 
-                final_response = second_response.choices[0].message.content.strip()
-                self.conversations[session_id].append(
-                    {"role": "assistant", "content": final_response}
+                if not response_message["tool_calls"]:
+                    bot_message = (response_message["content"] or "").strip()
+                    break
+
+                # Handle tool calling
+                tool_calls = response_message["tool_calls"]
+
+                # State-changing calls wait for an explicit confirmation in
+                # the next turn instead of a described-and-confirmed model round
+                if not all(
+                    InjectiveFunctionMapper.is_read_only(call["name"])
+                    for call in tool_calls
+                ):
+                    proposed_calls = tool_calls
+                    events, bot_message = self._propose_action(
+                        session_id,
+                        agent_id,
+                        environment,
+                        tool_calls,
+                        response_message["content"],
+                    )
+                    for event in events:
+                        yield event
+                    break
+
+                for event in self._function_call_events(tool_calls):
+                    yield event
+                # executed calls are recorded even if the client goes away
+                recorded = True
+                results = await self._execute_and_record(
+                    session_id, agent_id, response_message["content"], tool_calls
                 )
+                for event in self._function_result_events(
+                    tool_calls, results, function_calls
+                ):
+                    yield event
 
-                return {
-                    "response": final_response,
-                    "function_call": {
-                        "name": function_name,
-                        "result": function_response,
-                    },
-                    "session_id": session_id,
-                }
+                # well-known read results are rendered locally instead of being
+                # described by another model round
+                templated = self.response_templates.render_all(tool_calls, results)
+                if templated is not None:
+                    bot_message = templated
+                    yield {"event": "token", "data": {"content": bot_message}}
+                    break
 
             # Handle regular response
-            bot_message = response_message.content
-            if bot_message:
-                self.conversations[session_id].append(
-                    {"role": "assistant", "content": bot_message}
-                )
+            if not bot_message:
+                bot_message = DEFAULT_RESPONSE
+                yield {"event": "token", "data": {"content": bot_message}}
+            self.conversations.append(
+                session_id, {"role": "assistant", "content": bot_message}
+            )
+            recorded = True
+            turn_seconds = time.perf_counter() - turn_started
+            self.intent_parser.record_turn(route, turn_seconds)
+            current_span().set(route=route)
+            TURN_SECONDS.observe(turn_seconds, route=route)
 
-                return {
+            yield {
+                "event": "done",
+                "data": {
                     "response": bot_message,
-                    "function_call": None,
+                    "function_call": function_calls[-1] if function_calls else None,
+                    "function_calls": function_calls,
+                    "pending_action": proposed_calls,
                     "session_id": session_id,
-                }
-            else:
-                default_response = "I'm here to help you with trading on Injective Chain. You can ask me about trading, checking balances, making transfers, or staking. How can I assist you today?"
-                self.conversations[session_id].append(
-                    {"role": "assistant", "content": default_response}
-                )
-
-                return {
-                    "response": default_response,
-                    "function_call": None,
-                    "session_id": session_id,
-                }
+                },
+            }
 
         except Exception as e:
+            recorded = True
             error_response = f"I apologize, but I encountered an error: {str(e)}. How else can I help you?"
-            return {
-                "response": error_response,
-                "function_call": None,
-                "session_id": session_id,
+            yield {
+                "event": "done",
+                "data": {
+                    "response": error_response,
+                    "function_call": None,
+                    "function_calls": function_calls,
+                    "pending_action": None,
+                    "session_id": session_id,
+                },
             }
+        finally:
+            # The HTTP client went away mid-turn: drop the unanswered turn
+            if not recorded and turn_start is not None:
+                self.conversations.rollback_to(session_id, turn_start)
+
+    async def get_response(
+        self,
+        message,
+        session_id="default",
+        private_key=None,
+        agent_id=None,
+        environment="testnet",
+    ):
+        """Get response from OpenAI API."""
+        result = None
+        async for event in self.stream_response(
+            message, session_id, private_key, agent_id, environment
+        ):
+            if event["event"] == "done":
+                result = event["data"]
+        return result
 
-    def clear_history(self, session_id="default"):
+    async def summarize_history(self, summary, messages):
+        """Fold evicted messages into a session's rolling summary"""
+        transcript = "\n".join(
+            f"{message['role']}: {message.get('content') or json.dumps(message.get('tool_calls') or message.get('function_call'))}"
+            for message in messages
+        )
+        response = await self.client.chat.completions.create(
+            model=self.summary_model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Update the summary of a conversation between a user and an Injective Chain trading assistant. "
+                    "Keep market ids, amounts, addresses, order hashes and pending requests. Answer with the summary only, under 150 words.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Current summary: {summary or 'none'}\n\nNew messages:\n{transcript}",
+                },
+            ],
+            max_tokens=300,
+            temperature=0,
+            timeout=self.llm_timeout,
+        )
+        return response.choices[0].message.content.strip()
+
+    async def clear_history(self, session_id="default"):
         """Clear conversation history for a specific session."""
-        if session_id in self.conversations:
-            self.conversations[session_id].clear()
+        # wait for the session's running turns instead of clearing under them
+        async with self.session_locks.hold(session_id):
+            await self.conversations.load(session_id)
+            self.conversations.clear(session_id)
+            self.pending_actions.discard(session_id)
 
-    def get_history(self, session_id="default"):
+    async def get_history(self, session_id="default"):
         """Get conversation history for a specific session."""
-        return self.conversations.get(session_id, [])
+        await self.conversations.load(session_id)
+        if session_id not in self.session_store:
+            return []
+        return self.conversations.get(session_id).request_messages()
 
 
-# Initialize chat agent
-agent = InjectiveChatAgent()
+# Chat agent of this process, built when the app starts serving so the
+# multi-worker router, which imports this module, never builds one
+agent: Optional[InjectiveChatAgent] = None
+
+
+def create_agent() -> InjectiveChatAgent:
+    """Build the chat agent of this process on first use"""
+    global agent
+    if agent is None:
+        agent = InjectiveChatAgent()
+        REGISTRY.register_collector(agent.loop_monitor.collect)
+    return agent
+
+
+@app.before_serving
+async def start_background_tasks():
+    """Start the shared price feed, the session write-behind and the warm-up"""
+    create_agent()
+    agent.profiler.install(asyncio.get_running_loop())
+    if os.getenv("LOOP_MONITOR", "true").lower() == "true":
+        agent.loop_monitor.start()
+    agent.trigger_engine.start()
+    agent.agents.start()
+    await agent.session_store.start()
+
+    # WARMUP_AGENTS_CONFIG names an agents_config.yaml style file, WARMUP_AGENTS
+    # optionally restricts it to a comma separated list of agent names or addresses
+    config_path = os.getenv("WARMUP_AGENTS_CONFIG")
+    if config_path:
+        agents = AgentManager(config_path).list_agents()
+        selected = os.getenv("WARMUP_AGENTS")
+        if selected:
+            names = {name.strip() for name in selected.split(",")}
+            agents = {
+                name: config
+                for name, config in agents.items()
+                if name in names or config.get("address") in names
+            }
+        # serving starts right away, readiness is reported on /ping
+        agent.ready = False
+        agent.warmup_task = asyncio.ensure_future(
+            agent.warm_up(agents, int(os.getenv("WARMUP_CONCURRENCY", "8")))
+        )
+
+
+@app.after_serving
+async def stop_background_tasks():
+    await agent.loop_monitor.stop()
+    await agent.trigger_engine.stop()
+    await agent.agents.stop()
+    await agent.session_store.close()
+    await agent.http_client.aclose()
 
 
 @app.route("/ping", methods=["GET"])
 async def ping():
-    """Health check endpoint"""
+    """Health check endpoint, 503 until the startup warm-up is done"""
+    if not agent.ready:
+        return (
+            jsonify(
+                {
+                    "status": "warming_up",
+                    "warmup": agent.warmup_status,
+                    "timestamp": datetime.now().isoformat(),
+                    "version": "1.0.0",
+                }
+            ),
+            503,
+        )
     return jsonify(
         {"status": "ok", "timestamp": datetime.now().isoformat(), "version": "1.0.0"}
     )
@@ -281,11 +940,27 @@ async def chat_endpoint():
         private_key = data.get("agent_key", "default")
         agent_id = data.get("agent_id", "default")
         environment = data.get("environment", "testnet")
-        response = await agent.get_response(
-            data["message"], session_id, private_key, agent_id, environment
-        )
 
-        return jsonify(response)
+        trace_id = TRACER.sample()
+
+        async def respond():
+            with TRACER.trace(
+                "chat", trace_id, session_id=session_id, agent_id=agent_id
+            ):
+                response = await agent.get_response(
+                    data["message"], session_id, private_key, agent_id, environment
+                )
+            response = jsonify(response)
+            if trace_id:
+                response.headers["X-Trace-Id"] = trace_id
+            return response
+
+        requested = request.headers.get("X-Profile") == "1" and admin_authorized()
+        if agent.profiler.should_profile(requested):
+            response, profile_id = await agent.profiler.run(respond(), session_id)
+            response.headers["X-Profile-Id"] = profile_id
+            return response
+        return await respond()
     except Exception as e:
         return (
             jsonify(
@@ -299,34 +974,349 @@ async def chat_endpoint():
         )
 
 
+def format_sse(event: dict) -> str:
+    """Encode an agent event as a server-sent event"""
+    return f"event: {event['event']}\ndata: {json_codec.dumps(event['data'])}\n\n"
+
+
+@app.route("/chat/stream", methods=["POST"])
+async def chat_stream_endpoint():
+    """Streaming chat endpoint, sends the turn as server-sent events"""
+    data = await request.get_json()
+    if not data or "message" not in data:
+        return (
+            jsonify(
+                {
+                    "error": "No message provided",
+                    "response": "Please provide a message to continue our conversation.",
+                    "session_id": (data or {}).get("session_id", "default"),
+                }
+            ),
+            400,
+        )
+
+    session_id = data.get("session_id", "default")
+    private_key = data.get("agent_key", "default")
+    agent_id = data.get("agent_id", "default")
+    environment = data.get("environment", "testnet")
+    trace_id = TRACER.sample()
+
+    async def events():
+        try:
+            with TRACER.trace(
+                "chat.stream", trace_id, session_id=session_id, agent_id=agent_id
+            ):
+                async for event in agent.stream_response(
+                    data["message"], session_id, private_key, agent_id, environment
+                ):
+                    yield format_sse(event)
+        except Exception as e:
+            yield format_sse(
+                {
+                    "event": "error",
+                    "data": {
+                        "error": str(e),
+                        "response": "I apologize, but I encountered an error. Please try again.",
+                        "session_id": session_id,
+                    },
+                }
+            )
+
+    headers = {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    }
+    if trace_id:
+        headers["X-Trace-Id"] = trace_id
+    response = await make_response(events(), headers)
+    response.timeout = None
+    return response
+
+
 @app.route("/history", methods=["GET"])
 async def history_endpoint():
     """Get chat history endpoint"""
     session_id = request.args.get("session_id", "default")
-    return jsonify({"history": agent.get_history(session_id)})
+    return jsonify({"history": await agent.get_history(session_id)})
 
 
 @app.route("/clear", methods=["POST"])
 async def clear_endpoint():
     """Clear chat history endpoint"""
     session_id = request.args.get("session_id", "default")
-    agent.clear_history(session_id)
+    await agent.clear_history(session_id)
     return jsonify({"status": "success"})
 
 
+@app.route("/triggers", methods=["GET"])
+async def triggers_endpoint():
+    """List conditional orders of an agent"""
+    agent_id = request.args.get("agent_id", "default")
+    return jsonify({"triggers": agent.trigger_engine.list_triggers(agent_id)})
+
+
+@app.route("/triggers/stats", methods=["GET"])
+async def trigger_stats_endpoint():
+    """Conditional order engine counters and tick-to-broadcast latency"""
+    return jsonify(agent.trigger_engine.stats())
+
+
+@app.route("/stats", methods=["GET"])
+async def stats_endpoint():
+    """Counters of the agent's optimization layers"""
+    return jsonify(
+        {
+            "tool_router": agent.tool_router.stats(),
+            "sessions": agent.conversations.stats(),
+            "response_templates": agent.response_templates.stats(),
+            "pending_actions": agent.pending_actions.stats(),
+            "intent_parser": agent.intent_parser.stats(),
+            "result_cache": agent.result_cache.stats(),
+            "result_shapers": agent.result_shapers.stats(),
+            "session_locks": agent.session_locks.stats(),
+            "agent_init": agent.agent_init.stats(),
+            "agents": agent.agents.stats(),
+            "profiler": agent.profiler.stats(),
+            "event_loop": agent.loop_monitor.stats(),
+            "tracing": TRACER.stats(),
+        }
+    )
+
+
+def admin_authorized() -> bool:
+    """Admin endpoints and request profiling are disabled unless ADMIN_TOKEN is set"""
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token)
+
+
+@app.route("/admin/stalls", methods=["GET"])
+async def stalls_endpoint():
+    """Recent event loop stalls with the stack of the blocking code"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(
+        {
+            "event_loop": agent.loop_monitor.stats(),
+            "stalls": agent.loop_monitor.stalls_report(),
+        }
+    )
+
+
+@app.route("/admin/traces", methods=["GET"])
+async def traces_endpoint():
+    """Recent request traces, ?limit=50&min_ms=0 keeps the slow ones"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        limit = int(request.args.get("limit", "50"))
+        min_ms = float(request.args.get("min_ms", "0"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {str(e)}"}), 400
+    return jsonify({"traces": TRACER.recent(limit, min_ms)})
+
+
+@app.route("/admin/traces/<trace_id>", methods=["GET"])
+async def trace_endpoint(trace_id):
+    """Spans of one trace"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    trace = TRACER.get(trace_id)
+    if trace is None:
+        return jsonify({"error": "Trace not found"}), 404
+    return jsonify(trace)
+
+
+@app.route("/admin/profile", methods=["POST"])
+async def profile_endpoint():
+    """Profile the next /chat requests, {"count": n} defaults to one"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    data = await request.get_json(silent=True) or {}
+    agent.profiler.arm(int(data.get("count", 1)))
+    return jsonify(agent.profiler.stats())
+
+
+@app.route("/admin/profiles", methods=["GET"])
+async def profiles_endpoint():
+    """Stored request profiles, newest first"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({"profiles": await asyncio.to_thread(agent.profiler.list)})
+
+
+@app.route("/admin/profiles/<profile_id>", methods=["GET"])
+async def profile_report_endpoint(profile_id):
+    """pstats report of a profile, ?sort=cumulative|tottime|calls&limit=40"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        report = await asyncio.to_thread(
+            agent.profiler.report,
+            profile_id,
+            request.args.get("sort", "cumulative"),
+            int(request.args.get("limit", "40")),
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid report options: {str(e)}"}), 400
+    if report is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return report, 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+
+def collect_metrics():
+    """Gauges and counters read from the live state of the agent at scrape time"""
+    cache = agent.result_cache.stats()
+    locks = agent.session_locks.stats()
+    yield (
+        "agent_result_cache_requests_total",
+        "counter",
+        "Cacheable function calls by how they were served",
+        [
+            ({"function": function_name, "result": result}, counts[result])
+            for function_name, counts in cache["functions"].items()
+            for result in ("hits", "coalesced", "misses")
+        ],
+    )
+    yield (
+        "agent_result_cache_hit_ratio",
+        "gauge",
+        "Share of cacheable function calls served without a chain request",
+        [
+            ({"function": function_name}, counts["hit_rate"])
+            for function_name, counts in cache["functions"].items()
+        ]
+        + [({"function": "all"}, cache["hit_rate"])],
+    )
+    yield (
+        "agent_result_cache_entries",
+        "gauge",
+        "Entries in the result cache",
+        [({}, cache["entries"])],
+    )
+    yield (
+        "agent_session_turns_waiting",
+        "gauge",
+        "Turns queued behind another turn of their session",
+        [({}, locks["waiting"])],
+    )
+    yield (
+        "agent_session_lock_wait_seconds_total",
+        "counter",
+        "Time turns spent waiting for their session",
+        [({}, locks["wait_seconds"])],
+    )
+    yield (
+        "agent_inits_in_flight",
+        "gauge",
+        "Agent client initializations in progress",
+        [({}, agent.agent_init.stats()["inflight"])],
+    )
+    agents = agent.agents.stats()
+    yield (
+        "agent_clients_resident",
+        "gauge",
+        "Agents with initialized clients, and those used by a running turn",
+        [
+            ({"state": "resident"}, agents["resident_agents"]),
+            ({"state": "leased"}, agents["leased_agents"]),
+        ],
+    )
+    yield (
+        "agent_sessions_resident",
+        "gauge",
+        "Sessions held in memory",
+        [({}, agent.conversations.sessions.stats()["resident_sessions"])],
+    )
+    yield (
+        "agent_pending_actions",
+        "gauge",
+        "Proposed actions waiting for a confirmation",
+        [({}, agent.pending_actions.stats()["pending"])],
+    )
+    yield (
+        "agent_active_triggers",
+        "gauge",
+        "Conditional orders being watched",
+        [({}, agent.trigger_engine.stats()["active_triggers"])],
+    )
+
+
+REGISTRY.register_collector(collect_metrics)
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics_endpoint():
+    """Latency histograms and live counters in the Prometheus text format"""
+    return (
+        REGISTRY.render(),
+        200,
+        {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run the chatbot API server")
     parser.add_argument("--port", type=int, default=5000, help="Port for API server")
     parser.add_argument("--host", default="0.0.0.0", help="Host for API server")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes; above 1 a router on --port spreads sessions over "
+        "workers listening on the following ports",
+    )
+    parser.add_argument(
+        "--warmup",
+        nargs="?",
+        const="agents_config.yaml",
+        help="Initialize the agents of this config file (agents_config.yaml when "
+        "no file is given) before reporting ready on /ping",
+    )
+    parser.add_argument(
+        "--warmup-agents",
+        help="Comma separated agent names or addresses to warm up, all by default",
+    )
+    parser.add_argument(
+        "--warmup-concurrency", type=int, help="Agents initialized at the same time"
+    )
     args = parser.parse_args()
 
+    # passed through the environment so worker processes warm up as well
+    if args.warmup:
+        os.environ["WARMUP_AGENTS_CONFIG"] = args.warmup
+    if args.warmup_agents:
+        os.environ["WARMUP_AGENTS"] = args.warmup_agents
+    if args.warmup_concurrency:
+        os.environ["WARMUP_CONCURRENCY"] = str(args.warmup_concurrency)
+
     config = Config()
     config.bind = [f"{args.host}:{args.port}"]
     config.debug = args.debug
 
-    print(f"Starting API server on {args.host}:{args.port}")
-    asyncio.run(serve(app, config))
+    if args.workers <= 1:
+        print(f"Starting API server on {args.host}:{args.port}")
+        asyncio.run(serve(app, config))
+        return
+
+    ports = [args.port + index + 1 for index in range(args.workers)]
+    workers = spawn_workers(os.path.abspath(__file__), ports)
+    # a turn spans several model rounds, the workers enforce their own timeouts
+    router = create_router_app([f"http://127.0.0.1:{port}" for port in ports])
+    print(
+        f"Starting router on {args.host}:{args.port} for {args.workers} workers "
+        f"on ports {ports[0]}-{ports[-1]}"
+    )
+    try:
+        asyncio.run(serve(router, config))
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
 
 
 if __name__ == "__main__":
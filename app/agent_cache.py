@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+"""Bounded cache of per-agent Injective clients"""
+
+
+class AgentClientCache:
+    """
+    LRU cache of client dictionaries with an idle TTL.
+
+    Evicted agents have their channels closed. Agents leased by a running
+    turn, or pinned (e.g. because they have active conditional orders), are
+    never evicted, so the cache may briefly hold more than max_agents.
+    """
+
+    def __init__(
+        self,
+        close: Callable[[Dict], Awaitable[None]],
+        max_agents: int = 256,
+        idle_ttl: Optional[float] = 1800.0,
+        pinned: Optional[Callable[[], Iterable[str]]] = None,
+    ) -> None:
+        """
+        Args:
+            close (Callable): Coroutine function releasing the resources of a client dictionary
+            max_agents (int): Agents kept before the least recently used idle one is evicted
+            idle_ttl (float): Seconds without use after which an agent is evicted
+            pinned (Callable): Returns the agent ids that must stay resident
+        """
+        self.close = close
+        self.max_agents = max_agents
+        self.idle_ttl = idle_ttl
+        self.pinned = pinned or (lambda: ())
+        # agent_id -> (clients, last use), least recently used first
+        self._agents: "OrderedDict[str, tuple]" = OrderedDict()
+        self._leases: Dict[str, int] = {}
+        self._tasks = set()
+        self._sweeper = None
+        self.evictions = 0
+        self.close_failures = 0
+
+    def get(self, agent_id: str) -> Optional[Dict]:
+        entry = self._agents.get(agent_id)
+        if entry is None:
+            return None
+        self._agents[agent_id] = (entry[0], time.monotonic())
+        self._agents.move_to_end(agent_id)
+        return entry[0]
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._agents
+
+    def __setitem__(self, agent_id: str, clients: Dict) -> None:
+        previous = self._agents.get(agent_id)
+        if previous is not None and previous[0] is not clients:
+            self._schedule_close(previous[0])
+        self._agents[agent_id] = (clients, time.monotonic())
+        self._agents.move_to_end(agent_id)
+        self.evict()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    @asynccontextmanager
+    async def lease(self, agent_id: str):
+        """Keep an agent resident while a turn uses its clients"""
+        self._leases[agent_id] = self._leases.get(agent_id, 0) + 1
+        try:
+            yield
+        finally:
+            self._leases[agent_id] -= 1
+            if not self._leases[agent_id]:
+                del self._leases[agent_id]
+            if agent_id in self._agents:
+                self.get(agent_id)
+
+    def evict(self) -> int:
+        """Evict idle agents past their TTL and the least recently used over capacity"""
+        now = time.monotonic()
+        protected = set(self.pinned()) | set(self._leases)
+        overflow = len(self._agents) - self.max_agents
+        evicted = 0
+        for agent_id, (clients, last_used) in list(self._agents.items()):
+            expired = self.idle_ttl is not None and now - last_used > self.idle_ttl
+            if not expired and overflow - evicted <= 0:
+                # the rest of the LRU was used more recently
+                break
+            if agent_id in protected:
+                continue
+            del self._agents[agent_id]
+            self._schedule_close(clients)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def _schedule_close(self, clients: Dict) -> None:
+        task = asyncio.ensure_future(self._close(clients))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _close(self, clients: Dict) -> None:
+        try:
+            await self.close(clients)
+        except Exception as e:
+            self.close_failures += 1
+            print(f"Closing agent clients failed: {str(e)}")
+
+    async def _sweep(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.evict()
+
+    def start(self, interval: float = 60.0) -> None:
+        """Evict idle agents periodically, also when no new agent arrives"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self._sweep(interval))
+
+    async def stop(self) -> None:
+        """Stop sweeping and close every resident agent"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        while self._agents:
+            _, (clients, _) = self._agents.popitem(last=False)
+            self._schedule_close(clients)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            "resident_agents": len(self._agents),
+            "max_agents": self.max_agents,
+            "idle_ttl": self.idle_ttl,
+            "leased_agents": len(self._leases),
+            "evictions": self.evictions,
+            "close_failures": self.close_failures,
+        }
@@ -0,0 +1,341 @@
+import asyncio
+import bisect
+import hashlib
+import subprocess
+import sys
+from typing import Dict, List, Optional
+import httpx
+from quart import Quart, Response, jsonify, make_response, request
+from app.json_provider import FastJSONProvider
+
+"""Multi-worker mode: a consistent-hash router in front of agent_server workers"""
+
+# Routes bound to one session, and where their session_id is read from
+SESSION_ROUTES = {
+    "/chat": "json",
+    "/chat/stream": "json",
+    "/history": "args",
+    "/clear": "args",
+}
+# Request headers passed on to workers, and response headers passed back
+FORWARDED_HEADERS = ("Content-Type", "X-Admin-Token", "X-Profile")
+RETURNED_HEADERS = ("X-Profile-Id", "X-Trace-Id")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring over worker URLs.
+
+    Each worker owns replicas points of the ring, so adding a worker only
+    moves about 1/N of the sessions.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = 200) -> None:
+        """
+        Args:
+            nodes (List[str]): Worker base URLs
+            replicas (int): Virtual points per worker, more points spread keys more evenly
+        """
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._nodes: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            self._nodes[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str) -> None:
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            del self._nodes[point]
+            self._points.remove(point)
+
+    def get(self, key: str) -> str:
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._nodes[self._points[index]]
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(set(self._nodes.values()))
+
+
+def merge_metrics(texts: Dict[str, str]) -> str:
+    """
+    Merge the Prometheus exposition of several workers into one.
+
+    Every sample gets a worker label and samples of the same metric are
+    grouped under a single HELP and TYPE header.
+    """
+    # name -> [header lines, sample lines]
+    families: Dict[str, List[List[str]]] = {}
+    for worker, text in texts.items():
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = families.setdefault(parts[2], [[], []])
+                    if len(family[0]) < 2:
+                        family[0].append(line)
+                continue
+            if not line.strip() or family is None:
+                continue
+            label = f'worker="{worker}"'
+            name, brace, rest = line.partition("{")
+            if brace:
+                separator = "" if rest.startswith("}") else ","
+                sample = f"{name}{{{label}{separator}{rest}"
+            else:
+                name, _, value = line.partition(" ")
+                sample = f"{name}{{{label}}} {value}"
+            family[1].append(sample)
+    lines = []
+    for headers, samples in families.values():
+        lines.extend(headers)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def spawn_workers(
+    script: str, ports: List[int], extra_args: Optional[List[str]] = None
+) -> List[subprocess.Popen]:
+    """Start one agent_server process per port, bound to localhost"""
+    return [
+        subprocess.Popen(
+            [sys.executable, script, "--host", "127.0.0.1", "--port", str(port)]
+            + (extra_args or [])
+        )
+        for port in ports
+    ]
+
+
+def create_router_app(worker_urls: List[str], timeout: Optional[float] = None) -> Quart:
+    """
+    Build the router app.
+
+    Session routes are proxied to the worker owning the session on the ring,
+    so a session's history, pending actions and turn queue live in one
+    process. /ping, /stats, /triggers, /triggers/stats and /metrics are
+    answered from every worker, /admin/* from every worker or the one named
+    by ?worker=.
+    """
+    router = Quart(__name__)
+    router.json = FastJSONProvider(router)
+    ring = HashRing(worker_urls)
+    clients: Dict[str, httpx.AsyncClient] = {}
+
+    @router.before_serving
+    async def open_clients():
+        # one keep-alive pool per worker
+        for url in worker_urls:
+            clients[url] = httpx.AsyncClient(
+                base_url=url, timeout=httpx.Timeout(timeout)
+            )
+
+    @router.after_serving
+    async def close_clients():
+        for client in clients.values():
+            await client.aclose()
+
+    async def session_id_of(path: str) -> str:
+        if SESSION_ROUTES[path] == "json":
+            data = await request.get_json(silent=True) or {}
+            return data.get("session_id", "default")
+        return request.args.get("session_id", "default")
+
+    def forwarded_headers() -> Dict[str, str]:
+        headers = {
+            name: request.headers[name]
+            for name in FORWARDED_HEADERS
+            if name in request.headers
+        }
+        headers.setdefault("Content-Type", "application/json")
+        return headers
+
+    def relay_response(upstream: httpx.Response) -> Response:
+        response = Response(
+            upstream.content,
+            status=upstream.status_code,
+            content_type=upstream.headers.get("Content-Type", "application/json"),
+        )
+        for name in RETURNED_HEADERS:
+            if name in upstream.headers:
+                response.headers[name] = upstream.headers[name]
+        return response
+
+    async def proxy(path: str):
+        worker = ring.get(await session_id_of(path))
+        client = clients[worker]
+        body = await request.get_data()
+        headers = forwarded_headers()
+        if path == "/chat/stream":
+            upstream = await client.send(
+                client.build_request(
+                    request.method,
+                    path,
+                    params=request.args,
+                    content=body,
+                    headers=headers,
+                ),
+                stream=True,
+            )
+
+            async def relay():
+                try:
+                    async for chunk in upstream.aiter_raw():
+                        yield chunk
+                finally:
+                    await upstream.aclose()
+
+            relayed = {
+                "Content-Type": upstream.headers.get(
+                    "Content-Type", "text/event-stream"
+                ),
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            }
+            for name in RETURNED_HEADERS:
+                if name in upstream.headers:
+                    relayed[name] = upstream.headers[name]
+            response = await make_response(relay(), upstream.status_code, relayed)
+            response.timeout = None
+            return response
+
+        upstream = await client.request(
+            request.method, path, params=request.args, content=body, headers=headers
+        )
+        return relay_response(upstream)
+
+    async def fan_out(path: str) -> Dict[str, httpx.Response]:
+        urls = ring.nodes
+        responses = await asyncio.gather(
+            *[clients[url].get(path, params=request.args) for url in urls],
+            return_exceptions=True,
+        )
+        return dict(zip(urls, responses))
+
+    # views have to be coroutine functions, Quart runs plain functions in a thread
+    def view(handler, path: str):
+        async def handle():
+            return await handler(path)
+
+        return handle
+
+    for path in SESSION_ROUTES:
+        router.add_url_rule(
+            path, endpoint=path, view_func=view(proxy, path), methods=["GET", "POST"]
+        )
+
+    @router.route("/ping", methods=["GET"])
+    async def ping():
+        responses = await fan_out("/ping")
+        ready = all(
+            isinstance(response, httpx.Response) and response.status_code == 200
+            for response in responses.values()
+        )
+        return (
+            jsonify(
+                {
+                    "status": "ok" if ready else "unavailable",
+                    "workers": {
+                        url: (
+                            response.status_code
+                            if isinstance(response, httpx.Response)
+                            else str(response)
+                        )
+                        for url, response in responses.items()
+                    },
+                }
+            ),
+            200 if ready else 503,
+        )
+
+    @router.route("/triggers", methods=["GET"])
+    async def triggers():
+        # an agent's triggers live in the workers of its sessions
+        merged = []
+        for response in (await fan_out("/triggers")).values():
+            if isinstance(response, httpx.Response) and response.status_code == 200:
+                merged.extend(response.json()["triggers"])
+        return jsonify({"triggers": merged})
+
+    async def per_worker(path: str):
+        stats = {}
+        for url, response in (await fan_out(path)).items():
+            if isinstance(response, httpx.Response) and response.status_code == 200:
+                stats[url] = response.json()
+            else:
+                stats[url] = {"error": str(response)}
+        return jsonify({"workers": stats})
+
+    for path in ("/stats", "/triggers/stats"):
+        router.add_url_rule(path, endpoint=path, view_func=view(per_worker, path))
+
+    @router.route("/admin/<path:rest>", methods=["GET", "POST"])
+    async def admin(rest):
+        # loop stalls, traces and profiles are per process: ?worker=<index or
+        # url> asks one worker, otherwise every worker answers
+        path = f"/admin/{rest}"
+        params = {
+            name: value for name, value in request.args.items() if name != "worker"
+        }
+        body = await request.get_data()
+        headers = forwarded_headers()
+        urls = ring.nodes
+        selected = request.args.get("worker")
+        if selected is not None:
+            if selected.isdigit() and int(selected) < len(urls):
+                selected = urls[int(selected)]
+            if selected not in clients:
+                return jsonify({"error": f"Unknown worker: {selected}"}), 400
+            upstream = await clients[selected].request(
+                request.method, path, params=params, content=body, headers=headers
+            )
+            return relay_response(upstream)
+
+        responses = await asyncio.gather(
+            *[
+                clients[url].request(
+                    request.method, path, params=params, content=body, headers=headers
+                )
+                for url in urls
+            ],
+            return_exceptions=True,
+        )
+        workers = {}
+        statuses = []
+        for url, response in zip(urls, responses):
+            if not isinstance(response, httpx.Response):
+                workers[url] = {"error": str(response)}
+                continue
+            statuses.append(response.status_code)
+            content_type = response.headers.get("Content-Type", "")
+            if content_type.startswith("application/json"):
+                workers[url] = response.json()
+            else:
+                workers[url] = response.text
+        # forbidden or not found on every worker stays an error
+        status = 200 if not statuses or 200 in statuses else statuses[0]
+        return jsonify({"workers": workers}), status
+
+    @router.route("/metrics", methods=["GET"])
+    async def metrics():
+        texts = {
+            url: response.text
+            for url, response in (await fan_out("/metrics")).items()
+            if isinstance(response, httpx.Response) and response.status_code == 200
+        }
+        return (
+            merge_metrics(texts),
+            200,
+            {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+    return router
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+"""Keyed async locks and single-flight execution"""
+
+
+class KeyedLock:
+    """
+    One FIFO lock per key, created on first use and dropped once unused.
+
+    Holders of the same key run one at a time in arrival order, different
+    keys never wait for each other.
+    """
+
+    def __init__(self) -> None:
+        # key -> [lock, holders and waiters]
+        self._locks: Dict[Hashable, list] = {}
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+        self.max_queue = 0
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        self.max_queue = max(self.max_queue, entry[1])
+        try:
+            if entry[0].locked():
+                self.contended += 1
+            start = time.perf_counter()
+            # asyncio.Lock wakes its waiters in arrival order
+            async with entry[0]:
+                self.acquisitions += 1
+                self.wait_seconds += time.perf_counter() - start
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def queued(self, key: Hashable) -> int:
+        """Requests holding or waiting for key"""
+        entry = self._locks.get(key)
+        return entry[1] if entry else 0
+
+    def stats(self) -> Dict:
+        return {
+            "active_keys": len(self._locks),
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_seconds": self.wait_seconds,
+            "max_queue": self.max_queue,
+            # one request per key holds the lock, the others wait
+            "waiting": sum(entry[1] for entry in self._locks.values()) - len(self._locks),
+        }
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share the result of the first one"""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+            # a cancelled waiter must not cancel the call the others share
+            return await asyncio.shield(future)
+
+        self.calls += 1
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict:
+        return {"inflight": len(self._inflight), "calls": self.calls, "shared": self.shared}
@@ -0,0 +1,284 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+from injective_functions.utils import json_codec
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional, fall back to a character estimate
+    _ENCODING = None
+
+# Fixed per-message overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+Summarizer = Callable[[Optional[str], List[dict]], Awaitable[str]]
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Count tokens of a string, estimating ~4 characters per token without tiktoken"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: dict) -> int:
+    """Token cost of one chat message"""
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content"))
+    tokens += count_tokens(message.get("name"))
+    function_call = message.get("function_call")
+    if function_call:
+        tokens += count_tokens(function_call.get("name"))
+        tokens += count_tokens(function_call.get("arguments"))
+    for tool_call in message.get("tool_calls") or []:
+        tokens += MESSAGE_OVERHEAD_TOKENS
+        tokens += count_tokens(tool_call["function"].get("name"))
+        tokens += count_tokens(tool_call["function"].get("arguments"))
+    return tokens
+
+
+def digest_payload(value, max_items: int = 5, max_chars: int = 200, depth: int = 4):
+    """
+    Shrink a decoded JSON payload while keeping its shape.
+
+    Lists keep their first max_items entries plus a count, long strings are
+    cut to max_chars and nesting below depth is replaced by a type marker.
+    """
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"<object with {len(value)} keys>"
+        return {
+            key: digest_payload(item, max_items, max_chars, depth - 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        if depth <= 0:
+            return f"<list of {len(value)} items>"
+        head = [
+            digest_payload(item, max_items, max_chars, depth - 1)
+            for item in value[:max_items]
+        ]
+        if len(value) > max_items:
+            head.append(f"<{len(value) - max_items} more items>")
+        return head
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "..."
+    return value
+
+
+class ConversationHistory:
+    """Messages of one session with incrementally maintained token counts"""
+
+    def __init__(self) -> None:
+        self.messages: List[dict] = []
+        self.token_counts: List[int] = []
+        self.total_tokens = 0
+        self.summary: Optional[str] = None
+        self.summary_tokens = 0
+        # evicted messages waiting to be folded into the summary
+        self.pending_summary: List[dict] = []
+        self.summarizing = False
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def request_messages(self) -> List[dict]:
+        """Messages to send to the model, prefixed by the rolling summary if any"""
+        if not self.summary:
+            return list(self.messages)
+        return [
+            {
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {self.summary}",
+            }
+        ] + self.messages
+
+    def set_summary(self, summary: Optional[str]) -> None:
+        self.summary = summary
+        self.summary_tokens = count_tokens(summary)
+
+    def _push(self, message: dict) -> None:
+        tokens = message_tokens(message)
+        self.messages.append(message)
+        self.token_counts.append(tokens)
+        self.total_tokens += tokens
+
+    def _pop_front(self, count: int) -> List[dict]:
+        evicted = self.messages[:count]
+        self.total_tokens -= sum(self.token_counts[:count])
+        del self.messages[:count]
+        del self.token_counts[:count]
+        return evicted
+
+    def messages_since(self, message: dict) -> List[dict]:
+        """Message and everything appended after it"""
+        for index in range(len(self.messages) - 1, -1, -1):
+            if self.messages[index] is message:
+                return self.messages[index:]
+        return list(self.messages)
+
+    def rollback_to(self, message: dict) -> None:
+        """Drop message and everything appended after it"""
+        for index in range(len(self.messages) - 1, -1, -1):
+            if self.messages[index] is message:
+                self.total_tokens -= sum(self.token_counts[index:])
+                del self.messages[index:]
+                del self.token_counts[index:]
+                return
+
+    def clear(self) -> None:
+        self.messages.clear()
+        self.token_counts.clear()
+        self.total_tokens = 0
+        self.set_summary(None)
+        self.pending_summary.clear()
+
+
+class HistoryManager:
+    """Keeps every session's history within a token budget"""
+
+    def __init__(
+        self,
+        max_tokens: int = 6000,
+        max_function_tokens: int = 800,
+        summarizer: Optional[Summarizer] = None,
+        store=None,
+    ) -> None:
+        """
+        Args:
+            max_tokens (int): Token budget of a session's history, summary included
+            max_function_tokens (int): Function results above this size are stored as digests
+            summarizer (Summarizer): Coroutine folding evicted messages into the summary.
+                Evicted turns are simply dropped when it is not set.
+            store (SessionStore): Backend holding the histories, an unbounded
+                in-memory store when not set
+        """
+        # imported here as the store module depends on ConversationHistory
+        from app.session_store import InMemorySessionStore
+
+        self.max_tokens = max_tokens
+        self.max_function_tokens = max_function_tokens
+        self.summarizer = summarizer
+        self.sessions = (
+            store
+            if store is not None
+            else InMemorySessionStore(max_sessions=float("inf"), ttl=None)
+        )
+        self._tasks = set()
+
+    async def load(self, session_id: str) -> None:
+        """Read a persisted session into memory without blocking the event loop"""
+        await self.sessions.load(session_id)
+
+    def get(self, session_id: str) -> ConversationHistory:
+        history = self.sessions.get(session_id)
+        if history is None:
+            history = ConversationHistory()
+            self.sessions.put(session_id, history)
+        return history
+
+    def clear(self, session_id: str) -> None:
+        history = self.sessions.get(session_id)
+        if history is not None:
+            history.clear()
+            self.sessions.put(session_id, history)
+
+    def compact_function_content(self, content: str) -> str:
+        """Replace a large function payload by a digest that fits the per-result budget"""
+        if count_tokens(content) <= self.max_function_tokens:
+            return content
+        try:
+            digest = json_codec.dumps(digest_payload(json_codec.loads(content)))
+        except (TypeError, ValueError):
+            digest = content
+        # hard cap for payloads that are still too large after digesting
+        max_chars = self.max_function_tokens * 4
+        if count_tokens(digest) > self.max_function_tokens:
+            digest = digest[:max_chars] + "...<truncated>"
+        return digest
+
+    def append(self, session_id: str, message: dict) -> dict:
+        """Append a message to a session and enforce its token budget"""
+        history = self.get(session_id)
+        if message.get("role") in ("function", "tool") and message.get("content"):
+            message = dict(message)
+            message["content"] = self.compact_function_content(message["content"])
+        history._push(message)
+        self._enforce_budget(session_id, history)
+        self.sessions.put(session_id, history)
+        return message
+
+    def _turn_starts(self, history: ConversationHistory) -> List[int]:
+        return [
+            index
+            for index, message in enumerate(history.messages)
+            if message.get("role") == "user"
+        ]
+
+    def _enforce_budget(self, session_id: str, history: ConversationHistory) -> None:
+        if history.total_tokens + history.summary_tokens <= self.max_tokens:
+            return
+        # evict whole turns, oldest first, so function calls never lose their
+        # results; the current turn is always kept
+        starts = self._turn_starts(history)
+        target = self.max_tokens * 3 // 4
+        cut = 0
+        remaining = history.total_tokens
+        for start in starts[1:]:
+            if remaining + history.summary_tokens <= target:
+                break
+            remaining -= sum(history.token_counts[cut:start])
+            cut = start
+        if cut == 0:
+            return
+
+        evicted = history._pop_front(cut)
+        if self.summarizer is None:
+            return
+        history.pending_summary.extend(evicted)
+        if not history.summarizing:
+            history.summarizing = True
+            task = asyncio.ensure_future(self._summarize(session_id, history))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def rollback_to(self, session_id: str, message: dict) -> None:
+        """Drop message and everything appended after it from a session"""
+        history = self.sessions.get(session_id)
+        if history is not None:
+            history.rollback_to(message)
+            self.sessions.put(session_id, history)
+
+    async def _summarize(self, session_id: str, history: ConversationHistory) -> None:
+        """Fold evicted messages into the rolling summary in the background"""
+        try:
+            while history.pending_summary:
+                batch = list(history.pending_summary)
+                history.pending_summary.clear()
+                try:
+                    summary = await self.summarizer(history.summary, batch)
+                except Exception as e:
+                    print(f"History summarization failed: {str(e)}")
+                    continue
+                history.set_summary(summary)
+                # a longer summary can push the history over its budget, turns
+                # evicted for it are folded in by the next round of the loop
+                self._enforce_budget(session_id, history)
+                self.sessions.put(session_id, history)
+        finally:
+            history.summarizing = False
+
+    def stats(self) -> Dict:
+        stats = self.sessions.stats()
+        stats.update(
+            {
+                "resident_tokens": sum(
+                    history.total_tokens + history.summary_tokens
+                    for history in self.sessions.values()
+                ),
+                "max_tokens_per_session": self.max_tokens,
+            }
+        )
+        return stats
@@ -0,0 +1,230 @@
+import json
+import re
+import time
+import uuid
+from collections import deque
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Mapping, Optional
+from injective_functions.utils.metrics import percentile
+
+"""
+Deterministic parser mapping unambiguous commands to function calls.
+
+Market commands are only parsed for perpetual markets: tickers are
+resolved through the derivative ticker map, spot market names go to the
+model.
+"""
+
+_NUMBER = r"\d+(?:\.\d+)?"
+_MARKET = (
+    r"(?P<base>[a-z][a-z0-9]{1,9}?)"
+    r"(?:\s*[/-]\s*(?P<quote>usdt|usdc|inj)|(?P<joined>usdt|usdc))?"
+    r"(?P<perp>\s*-?\s*(?:perp|perpetual|perps|futures?))?"
+)
+
+BALANCE = re.compile(
+    r"^(?:(?:show|check|get|what(?:'s| is| are))\s+)?(?:me\s+)?(?:my\s+)?"
+    r"(?:wallet\s+)?balances?$"
+)
+PRICE = re.compile(
+    r"^(?:(?:what(?:'s| is)\s+(?:the\s+)?)|(?:get|show)\s+(?:the\s+)?)?"
+    r"(?:price|mid price|quote)\s+(?:of|for)\s+" + _MARKET + r"$"
+    r"|^" + _MARKET.replace("?P<", "?P<m_") + r"\s+price$"
+)
+CANCEL = re.compile(
+    r"^cancel\s+(?:order\s+)?(?P<order_hash>0x[0-9a-f]{64})\s+(?:on|in)\s+"
+    + _MARKET
+    + r"$"
+)
+ORDER = re.compile(
+    r"^(?P<side>buy|sell|long|short)\s+(?P<quantity>" + _NUMBER + r")\s+"
+    + _MARKET
+    + r"(?:\s+(?:at|@)\s+(?P<price>" + _NUMBER + r"))?"
+    r"(?:\s+(?:with\s+)?(?P<leverage>" + _NUMBER + r")\s*x(?:\s+leverage)?)?$"
+)
+
+
+class Intent:
+    def __init__(self, function_name: str, arguments: Dict) -> None:
+        self.function_name = function_name
+        self.arguments = arguments
+
+    def to_tool_call(self) -> Dict:
+        """Shape of a model tool call, so the turn is recorded like any other"""
+        return {
+            "id": f"call_local_{uuid.uuid4().hex[:16]}",
+            "name": self.function_name,
+            "arguments": json.dumps(self.arguments),
+        }
+
+
+# network -> cached derivative ticker -> market id map, None while it is not
+# downloaded
+Markets = Callable[[str], Optional[Mapping[str, str]]]
+
+
+def _market(groups: Dict, prefix: str = "") -> Optional[str]:
+    """Ticker of the perpetual market, None for spot or unqualified markets"""
+    # without "perp", "btc" could be the spot or the perpetual market
+    if not groups.get(f"{prefix}perp"):
+        return None
+    base = groups.get(f"{prefix}base").upper()
+    quote = groups.get(f"{prefix}quote") or groups.get(f"{prefix}joined") or "usdt"
+    return f"{base}/{quote.upper()} PERP"
+
+
+def _positive(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        if Decimal(value) <= 0:
+            return None
+    except InvalidOperation:
+        return None
+    return value
+
+
+class IntentParser:
+    """
+    Maps high-confidence commands straight to function calls.
+
+    Every message that does not match one of the grammars exactly, leaves
+    an argument open or names a market missing from the cached derivative
+    tickers returns None and is routed to the model.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        latency_samples: int = 1000,
+        markets: Optional[Markets] = None,
+    ) -> None:
+        """
+        Args:
+            enabled (bool): When False every message is routed to the model
+            latency_samples (int): Turn latencies kept per route for percentiles
+            markets (Callable): Returns the cached derivative ticker -> market id map
+                of a network, commands naming a market are only parsed when it is set
+        """
+        self.enabled = enabled
+        self.markets = markets
+        self.attempts = 0
+        self.unknown_markets = 0
+        self.matches: Dict[str, int] = {}
+        self.parse_seconds = 0.0
+        self.latency_samples = latency_samples
+        self.latencies: Dict[str, deque] = {}
+
+    @staticmethod
+    def _normalize(message: str) -> str:
+        return re.sub(r"\s+", " ", message.strip().lower()).rstrip("?!. ")
+
+    def _known(self, ticker: Optional[str], network: str) -> Optional[str]:
+        """The ticker if the network lists it, else None"""
+        if ticker is None:
+            return None
+        tickers = self.markets(network) if self.markets is not None else None
+        if not tickers or ticker not in tickers:
+            self.unknown_markets += 1
+            return None
+        return ticker
+
+    def _parse(self, text: str, network: str) -> Optional[Intent]:
+        if BALANCE.match(text):
+            return Intent("query_balances", {})
+
+        match = PRICE.match(text)
+        if match:
+            groups = match.groupdict()
+            market = self._known(
+                _market(groups) if groups["base"] else _market(groups, "m_"),
+                network,
+            )
+            if market is None:
+                return None
+            return Intent(
+                "get_mid_price_and_tob_derivatives_market", {"market_id": market}
+            )
+
+        match = CANCEL.match(text)
+        if match:
+            market = self._known(_market(match.groupdict()), network)
+            if market is None:
+                return None
+            return Intent(
+                "cancel_derivative_limit_order",
+                {
+                    "market_id": market,
+                    "subaccount_idx": 0,
+                    "order_hash": match["order_hash"],
+                },
+            )
+
+        match = ORDER.match(text)
+        if match:
+            return self._parse_order(match, network)
+        return None
+
+    def _parse_order(self, match, network: str) -> Optional[Intent]:
+        market = self._known(_market(match.groupdict()), network)
+        if market is None:
+            return None
+        quantity = _positive(match["quantity"])
+        price = _positive(match["price"])
+        # leverage is required and is not guessed
+        leverage = _positive(match["leverage"])
+        if quantity is None or leverage is None or (match["price"] and price is None):
+            return None
+        side = "BUY" if match["side"] in ("buy", "long") else "SELL"
+        arguments = {
+            "market_id": market,
+            "side": side,
+            "quantity": quantity,
+            "subaccount_idx": 0,
+            "leverage": leverage,
+        }
+        if price is not None:
+            arguments["price"] = price
+            return Intent("place_derivative_limit_order", arguments)
+        return Intent("place_derivative_market_order", arguments)
+
+    def parse(self, message: str, network: str = "mainnet") -> Optional[Intent]:
+        """Return the intent of a message, None when the model has to handle it"""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        self.attempts += 1
+        intent = self._parse(self._normalize(message), network)
+        self.parse_seconds += time.perf_counter() - start
+        if intent is not None:
+            self.matches[intent.function_name] = (
+                self.matches.get(intent.function_name, 0) + 1
+            )
+        return intent
+
+    def record_turn(self, route: str, seconds: float) -> None:
+        """Record the latency of a turn served by route ("intent", "llm", ...)"""
+        samples = self.latencies.setdefault(
+            route, deque(maxlen=self.latency_samples)
+        )
+        samples.append(seconds)
+
+    def stats(self) -> Dict:
+        matched = sum(self.matches.values())
+        routes = {}
+        for route, samples in self.latencies.items():
+            routes[route] = {
+                "turns": len(samples),
+                "p50": percentile(list(samples), 50),
+                "p99": percentile(list(samples), 99),
+            }
+        return {
+            "enabled": self.enabled,
+            "messages": self.attempts,
+            "matched": matched,
+            "match_rate": matched / self.attempts if self.attempts else 0.0,
+            "matches_by_function": dict(self.matches),
+            "unknown_markets": self.unknown_markets,
+            "parse_seconds": self.parse_seconds,
+            "turn_latency": routes,
+        }
@@ -0,0 +1,24 @@
+from typing import Any
+from quart.json.provider import DefaultJSONProvider
+from injective_functions.utils import json_codec
+
+"""Quart JSON provider backed by the shared JSON codec"""
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Encodes jsonify() responses and decodes request bodies with json_codec.
+
+    Keys keep their insertion order instead of being sorted. Indented output
+    (debug mode) still goes through the default provider.
+    """
+
+    sort_keys = False
+
+    def dumps(self, object_: Any, **kwargs: Any) -> str:
+        if kwargs.get("indent") or kwargs.get("sort_keys"):
+            return super().dumps(object_, **kwargs)
+        return json_codec.dumps(object_, default=self.default)
+
+    def loads(self, object_: Any, **kwargs: Any) -> Any:
+        return json_codec.loads(object_)
@@ -0,0 +1,160 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from injective_functions.utils.metrics import counter, histogram, percentile
+
+"""Event loop lag measurement and stall detection"""
+
+LOOP_LAG_SECONDS = histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = counter(
+    "event_loop_stalls_total", "Heartbeats delayed by more than the stall threshold"
+)
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag and records what blocks the loop.
+
+    A heartbeat task sleeps interval seconds and measures how late it wakes
+    up; every other request on the loop is delayed by the same amount. A
+    watchdog thread checks the heartbeat and, once it is threshold seconds
+    overdue, captures the stack of the event loop thread while the blocking
+    callback is still running.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        samples: int = 1000,
+        max_stalls: int = 50,
+    ) -> None:
+        """
+        Args:
+            interval (float): Seconds between two heartbeats
+            threshold (float): Lag in seconds above which the loop counts as stalled
+            samples (int): Recent lag samples kept for percentiles
+            max_stalls (int): Recent stalls kept with their stacks
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self._lags = deque(maxlen=samples)
+        self.recent_stalls = deque(maxlen=max_stalls)
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._current: Optional[Dict] = None
+        self._loop_thread: Optional[int] = None
+        self._heartbeat_task = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start the heartbeat on the running loop and the watchdog thread"""
+        if self._heartbeat_task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.ensure_future(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._heartbeat_task is None:
+            return
+        self._stopped.set()
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat_task = None
+        await asyncio.to_thread(self._watchdog.join)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                LOOP_STALLS.inc()
+            with self._lock:
+                self._beat = now
+                stall, self._current = self._current, None
+            if stall is not None:
+                stall["lag_seconds"] = lag
+
+    def _watch(self) -> None:
+        # poll often enough to catch the loop inside stalls just over threshold
+        poll = max(0.01, self.threshold / 4)
+        while not self._stopped.wait(poll):
+            with self._lock:
+                overdue = time.monotonic() - self._beat - self.interval
+                if overdue < self.threshold or self._current is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = traceback.format_stack(frame)[-30:] if frame else []
+                stall = {
+                    "detected_at": datetime.now().isoformat(),
+                    "blocked_for_seconds": overdue,
+                    # filled in once the loop runs again
+                    "lag_seconds": None,
+                    "stack": stack,
+                }
+                self._current = stall
+                self.recent_stalls.append(stall)
+            location = stack[-1].strip().splitlines()[0] if stack else "unknown"
+            print(f"Event loop blocked for {overdue:.3f}s at {location}")
+
+    def stalls_report(self) -> List[Dict]:
+        """Recent stalls with the stack of the loop thread, newest first"""
+        return list(reversed(self.recent_stalls))
+
+    def stats(self) -> Dict:
+        lags = list(self._lags)
+        return {
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "lag_seconds": {
+                "samples": len(lags),
+                "p50": percentile(lags, 50),
+                "p90": percentile(lags, 90),
+                "p99": percentile(lags, 99),
+                "max": self.max_lag,
+            },
+            "stalls": self.stalls,
+        }
+
+    def collect(self):
+        """Recent lag percentiles for the metrics registry"""
+        lags = list(self._lags)
+        if not lags:
+            return
+        yield (
+            "event_loop_lag_recent_seconds",
+            "gauge",
+            "Event loop lag percentiles over the recent heartbeats",
+            [
+                ({"quantile": str(q / 100)}, percentile(lags, q))
+                for q in (50, 90, 99)
+            ]
+            + [({"quantile": "1.0"}, max(lags))],
+        )
@@ -0,0 +1,133 @@
+import json
+import re
+import time
+from typing import Dict, List, Optional
+
+"""State-changing tool calls waiting for the user's confirmation"""
+
+_CONFIRMATION = re.compile(
+    r"^(yes|y|yep|yeah|confirm|confirmed|go ahead|do it|proceed|ok|okay|sure)"
+    r"( please| do it| go ahead| confirm)?$"
+)
+_REJECTION = re.compile(r"^(no|n|nope|cancel|stop|abort|don't|do not)( please| it)?$")
+
+
+def _normalize(message: str) -> str:
+    return re.sub(r"[^a-z' ]", "", message.lower()).strip()
+
+
+def is_confirmation(message: str) -> bool:
+    """Only short explicit answers count, anything longer goes to the model"""
+    return bool(_CONFIRMATION.match(_normalize(message)))
+
+
+def is_rejection(message: str) -> bool:
+    return bool(_REJECTION.match(_normalize(message)))
+
+
+def describe_tool_calls(tool_calls: List[dict]) -> str:
+    """Plain text description of the calls a user is asked to confirm"""
+    lines = []
+    for call in tool_calls:
+        try:
+            arguments = json.loads(call["arguments"] or "{}")
+        except json.JSONDecodeError:
+            arguments = {}
+        details = ", ".join(f"{key}={value}" for key, value in arguments.items())
+        lines.append(f"- {call['name']}({details})")
+    return "\n".join(lines)
+
+
+class PendingAction:
+    def __init__(
+        self,
+        tool_calls: List[dict],
+        expires_at: float,
+        agent_id: Optional[str] = None,
+        environment: Optional[str] = None,
+    ) -> None:
+        self.tool_calls = tool_calls
+        self.expires_at = expires_at
+        # the wallet and network the calls were proposed for
+        self.agent_id = agent_id
+        self.environment = environment
+
+
+class PendingActionStore:
+    """One pending action per session, replaced by any newer proposal"""
+
+    def __init__(self, ttl: float = 120.0) -> None:
+        """
+        Args:
+            ttl (float): Seconds a proposed action can be confirmed for
+        """
+        self.ttl = ttl
+        self._actions: Dict[str, PendingAction] = {}
+        self.proposed = 0
+        self.confirmed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.abandoned = 0
+
+    def propose(
+        self,
+        session_id: str,
+        tool_calls: List[dict],
+        agent_id: Optional[str] = None,
+        environment: Optional[str] = None,
+    ) -> PendingAction:
+        self._purge(time.monotonic())
+        action = PendingAction(
+            tool_calls, time.monotonic() + self.ttl, agent_id, environment
+        )
+        self._actions[session_id] = action
+        self.proposed += 1
+        return action
+
+    def pop(
+        self,
+        session_id: str,
+        agent_id: Optional[str] = None,
+        environment: Optional[str] = None,
+    ) -> Optional[PendingAction]:
+        """
+        Take the session's pending action.
+
+        None if there is none, it expired, or it was proposed for another
+        agent or network than the one of the current request; such an action
+        is discarded and counted as abandoned.
+        """
+        action = self._actions.pop(session_id, None)
+        if action is None:
+            return None
+        if action.expires_at < time.monotonic():
+            self.expired += 1
+            return None
+        if action.agent_id != agent_id or action.environment != environment:
+            self.abandoned += 1
+            return None
+        return action
+
+    def discard(self, session_id: str) -> None:
+        self._actions.pop(session_id, None)
+
+    def _purge(self, now: float) -> None:
+        expired = [
+            session_id
+            for session_id, action in self._actions.items()
+            if action.expires_at < now
+        ]
+        for session_id in expired:
+            del self._actions[session_id]
+        self.expired += len(expired)
+
+    def stats(self) -> Dict:
+        return {
+            "pending": len(self._actions),
+            "proposed": self.proposed,
+            "confirmed": self.confirmed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "abandoned": self.abandoned,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,240 @@
+import asyncio
+import collections.abc
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+from typing import Any, Coroutine, Dict, List, Optional, Tuple
+
+"""On-demand cProfile captures of single requests"""
+
+_PROFILE_ID = re.compile(r"^[\w.-]+$")
+_UNSAFE = re.compile(r"[^\w-]")
+
+
+class _Capture:
+    def __init__(self) -> None:
+        self.profile = cProfile.Profile()
+        self.active = True
+        self.steps = 0
+
+
+# capture of the request the current task works for
+_current: contextvars.ContextVar[Optional[_Capture]] = contextvars.ContextVar(
+    "profile_capture", default=None
+)
+
+
+class _ProfiledCoroutine(collections.abc.Coroutine):
+    """
+    Coroutine wrapper enabling the profiler only while its task runs.
+
+    Other requests served by the event loop in the meantime stay out of the
+    profile, so the capture reflects the CPU time of one request.
+    """
+
+    def __init__(self, coro: Coroutine, capture: _Capture) -> None:
+        self._coro = coro
+        self._capture = capture
+
+    def _step(self, method, *args):
+        if not self._capture.active:
+            return method(*args)
+        self._capture.steps += 1
+        self._capture.profile.enable()
+        try:
+            return method(*args)
+        finally:
+            self._capture.profile.disable()
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+
+class RequestProfiler:
+    """
+    Profiles single requests on demand and stores the result as a pstats file.
+
+    Captures follow the request into the tasks it spawns (tool calls run
+    concurrently, transactions are shielded), see install(). At most one
+    capture runs at a time and captures start at least min_interval seconds
+    apart, requests arriving in between are served without profiling.
+    """
+
+    def __init__(
+        self,
+        directory: str = "profiles",
+        min_interval: float = 60.0,
+        max_profiles: int = 20,
+    ) -> None:
+        """
+        Args:
+            directory (str): Where pstats files are written
+            min_interval (float): Minimum seconds between the start of two captures
+            max_profiles (int): Files kept in directory, the oldest are deleted
+        """
+        self.directory = directory
+        self.min_interval = min_interval
+        self.max_profiles = max_profiles
+        self.armed = 0
+        self._running = False
+        self._last_start: Optional[float] = None
+        self.captured = 0
+        self.rate_limited = 0
+        self.save_failures = 0
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Wrap tasks created on behalf of a profiled request"""
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            capture = _current.get()
+            if capture is not None and capture.active:
+                if not isinstance(coro, _ProfiledCoroutine):
+                    coro = _ProfiledCoroutine(coro, capture)
+            if previous is not None:
+                return previous(loop, coro, **kwargs)
+            return asyncio.Task(coro, loop=loop, **kwargs)
+
+        loop.set_task_factory(factory)
+
+    def arm(self, count: int = 1) -> int:
+        """Profile the next count requests, subject to the rate limit"""
+        self.armed += max(0, count)
+        return self.armed
+
+    def should_profile(self, requested: bool = False) -> bool:
+        """Decide whether this request is captured, consuming an armed slot"""
+        if not (requested or self.armed):
+            return False
+        now = time.monotonic()
+        if self._running or (
+            self._last_start is not None and now - self._last_start < self.min_interval
+        ):
+            self.rate_limited += 1
+            return False
+        if not requested:
+            self.armed -= 1
+        self._running = True
+        self._last_start = now
+        return True
+
+    async def run(self, coro: Coroutine, label: str = "request") -> Tuple[Any, str]:
+        """
+        Run coro under the profiler.
+
+        Only call this after should_profile() returned True. Returns the
+        result of coro and the id of the stored profile, which is also stored
+        when coro raises.
+        """
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        profile_id = f"{stamp}-{_UNSAFE.sub('_', label)[:40] or 'request'}"
+        capture = _Capture()
+        token = _current.set(capture)
+        try:
+            # the request runs in its own task so that its steps can be told
+            # apart from the rest of the event loop
+            task = asyncio.ensure_future(_ProfiledCoroutine(coro, capture))
+        finally:
+            _current.reset(token)
+        started = time.perf_counter()
+        try:
+            return await task, profile_id
+        finally:
+            capture.active = False
+            self._running = False
+            self.captured += 1
+            try:
+                await asyncio.to_thread(
+                    self._save, capture, profile_id, time.perf_counter() - started
+                )
+            except Exception as e:
+                # the response, or the request's own error, goes out regardless
+                self.save_failures += 1
+                print(f"Saving profile {profile_id} failed: {str(e)}")
+
+    def _path(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.prof")
+
+    def _save(self, capture: _Capture, profile_id: str, wall_seconds: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        stats = pstats.Stats(capture.profile)
+        stats.dump_stats(self._path(profile_id))
+        with open(os.path.join(self.directory, f"{profile_id}.txt"), "w") as file:
+            file.write(
+                f"wall_seconds: {wall_seconds:.6f}\n"
+                f"profiled_seconds: {stats.total_tt:.6f}\n"
+                f"task_steps: {capture.steps}\n"
+            )
+        profiles = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(".prof")
+        )
+        for name in profiles[: max(0, len(profiles) - self.max_profiles)]:
+            for suffix in (".prof", ".txt"):
+                path = os.path.join(self.directory, name[: -len(".prof")] + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def list(self) -> List[Dict]:
+        """Stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".prof"):
+                continue
+            profile_id = name[: -len(".prof")]
+            entry = {"id": profile_id}
+            summary = os.path.join(self.directory, f"{profile_id}.txt")
+            if os.path.exists(summary):
+                with open(summary) as file:
+                    for line in file:
+                        key, _, value = line.partition(":")
+                        value = value.strip()
+                        entry[key.strip()] = float(value) if "." in value else int(value)
+            profiles.append(entry)
+        return profiles
+
+    def report(
+        self, profile_id: str, sort: str = "cumulative", limit: int = 40
+    ) -> Optional[str]:
+        """Text report of a stored profile, None if it does not exist"""
+        path = self._path(profile_id)
+        if path is None or not os.path.exists(path):
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def stats(self) -> Dict:
+        return {
+            "armed": self.armed,
+            "running": self._running,
+            "captured": self.captured,
+            "rate_limited": self.rate_limited,
+            "save_failures": self.save_failures,
+            "min_interval": self.min_interval,
+            "directory": self.directory,
+        }
@@ -0,0 +1,214 @@
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+"""Deterministic renderings of read-only function results"""
+
+Template = Callable[[dict, object], str]
+
+
+def _market(arguments: dict) -> str:
+    return str(arguments.get("market_id", "the market")).upper()
+
+
+def _amounts(title: str, amounts: Dict) -> str:
+    if not amounts:
+        return f"{title}: none found."
+    lines = [f"{title}:"]
+    lines += [f"- {denom}: {amount}" for denom, amount in amounts.items()]
+    return "\n".join(lines)
+
+
+def render_balances(arguments: dict, result) -> str:
+    return _amounts("Your balances", result)
+
+
+def render_spendable_balances(arguments: dict, result) -> str:
+    return _amounts("Your spendable balances", result)
+
+
+def render_total_supply(arguments: dict, result) -> str:
+    return _amounts("Total supply", result)
+
+
+def render_subaccount_deposits(arguments: dict, result) -> str:
+    if not result:
+        return "No subaccount deposits found."
+    lines = [f"Deposits of subaccount {arguments.get('subaccount_idx', 0)}:"]
+    for denom, deposit in result.items():
+        lines.append(
+            f"- {denom}: {deposit['available_balance']} available, "
+            f"{deposit['total_balance']} total"
+        )
+    return "\n".join(lines)
+
+
+def render_mid_price_and_tob(arguments: dict, result) -> str:
+    return (
+        f"{_market(arguments)}: mid price {result.get('midPrice', 'n/a')}, "
+        f"best bid {result.get('bestBuyPrice', 'n/a')}, "
+        f"best ask {result.get('bestSellPrice', 'n/a')}."
+    )
+
+
+def render_auction(arguments: dict, result) -> str:
+    fields = ", ".join(
+        f"{key}: {json.dumps(value) if isinstance(value, (dict, list)) else value}"
+        for key, value in result.items()
+    )
+    return f"Latest auction - {fields}."
+
+
+def render_price_triggers(arguments: dict, result) -> str:
+    active = [trigger for trigger in result if trigger["status"] == "active"]
+    if not result:
+        return "You have no conditional orders."
+    lines = [f"You have {len(active)} active conditional order(s):"]
+    for trigger in active:
+        order = trigger["order"]
+        lines.append(
+            f"- {trigger['trigger_id']}: {order['function']} "
+            f"{order['arguments'].get('side', '')} {order['arguments'].get('quantity', '')} "
+            f"when {trigger['market_id']} goes {trigger['direction']} {trigger['trigger_price']}"
+        )
+    done = len(result) - len(active)
+    if done:
+        lines.append(f"{done} more fired, failed or cancelled.")
+    return "\n".join(lines)
+
+
+def render_set_price_trigger(arguments: dict, result) -> str:
+    return (
+        f"Conditional order {result['trigger_id']} set: {result['order']['function']} "
+        f"when {result['market_id']} goes {result['direction']} {result['trigger_price']}."
+    )
+
+
+def render_cancel_price_trigger(arguments: dict, result) -> str:
+    return f"Conditional order {result['trigger_id']} cancelled."
+
+
+def render_transaction(arguments: dict, result: dict) -> Optional[str]:
+    """Render a broadcast result, None when the chain rejected the transaction"""
+    tx_response = result["result"].get("txResponse", {})
+    if int(tx_response.get("code", 0)):
+        return None
+    text = (
+        f"Transaction sent, hash {tx_response.get('txhash', 'n/a')}, "
+        f"gas fee {result.get('gas_fee', 'n/a')}."
+    )
+    pricing = result.get("pricing")
+    if isinstance(pricing, dict):
+        text += (
+            f" Expected average price {pricing['average_price']}, "
+            f"limit price {pricing['limit_price']}."
+        )
+    return text
+
+
+def _with_age(text: str, age: Optional[float]) -> str:
+    """Mention how old a result served from the result cache is"""
+    if not age:
+        return text
+    # on its own line after lists, so it does not read as part of the last entry
+    separator = "\n" if "\n" in text else " "
+    return f"{text}{separator}(as of {age:g}s ago)"
+
+
+# Name under which render_transaction is enabled, it applies to every
+# function returning a broadcast result
+BROADCAST = "broadcast"
+
+TEMPLATES: Dict[str, Template] = {
+    "query_balances": render_balances,
+    "query_spendable_balances": render_spendable_balances,
+    "query_total_supply": render_total_supply,
+    "get_subaccount_deposits": render_subaccount_deposits,
+    "get_mid_price_and_tob_derivatives_market": render_mid_price_and_tob,
+    "get_mid_price_and_tob_spot_market": render_mid_price_and_tob,
+    "fetch_latest_auction": render_auction,
+    "list_price_triggers": render_price_triggers,
+    "set_price_trigger": render_set_price_trigger,
+    "cancel_price_trigger": render_cancel_price_trigger,
+}
+
+
+class ResponseTemplates:
+    """Renders well-known read results locally instead of asking the model"""
+
+    def __init__(self, enabled: Optional[Iterable[str]] = None) -> None:
+        """
+        Args:
+            enabled (Iterable[str]): Functions rendered by template, "broadcast"
+                for transaction results. Every template is enabled when not set
+        """
+        known = set(TEMPLATES) | {BROADCAST}
+        self.enabled = (known if enabled is None else set(enabled)) & known
+        self.hits = 0
+        self.misses = 0
+        self.render_seconds = 0.0
+        # moving average of the follow-up model call a template replaces
+        self.llm_seconds_ewma = None
+
+    @classmethod
+    def from_setting(cls, setting: Optional[str]) -> "ResponseTemplates":
+        """Build from a comma separated list of functions, "all" or "none" """
+        if setting is None or setting.strip().lower() == "all":
+            return cls()
+        if setting.strip().lower() == "none":
+            return cls(enabled=())
+        return cls(enabled=[name.strip() for name in setting.split(",") if name.strip()])
+
+    def observe_llm_latency(self, seconds: float) -> None:
+        if self.llm_seconds_ewma is None:
+            self.llm_seconds_ewma = seconds
+        else:
+            self.llm_seconds_ewma = 0.9 * self.llm_seconds_ewma + 0.1 * seconds
+
+    def render(self, function_name: str, arguments: dict, result) -> Optional[str]:
+        """Render one successful result, None if the model has to describe it"""
+        if not isinstance(result, dict) or not result.get("success"):
+            return None
+        try:
+            if function_name in TEMPLATES:
+                if function_name in self.enabled:
+                    return _with_age(
+                        TEMPLATES[function_name](arguments, result.get("result")),
+                        result.get("data_age_seconds"),
+                    )
+            elif BROADCAST in self.enabled and "gas_fee" in result:
+                return render_transaction(arguments, result)
+        except Exception:
+            pass
+        return None
+
+    def render_all(self, tool_calls: List[dict], results: List) -> Optional[str]:
+        """Render a round of tool calls, None unless every result has a template"""
+        start = time.perf_counter()
+        rendered = []
+        for call, result in zip(tool_calls, results):
+            try:
+                arguments = json.loads(call["arguments"] or "{}")
+            except json.JSONDecodeError:
+                arguments = {}
+            text = self.render(call["name"], arguments, result)
+            if text is None:
+                self.misses += 1
+                return None
+            rendered.append(text)
+        self.hits += 1
+        self.render_seconds += time.perf_counter() - start
+        return "\n\n".join(rendered)
+
+    def stats(self) -> Dict:
+        saved = None
+        if self.llm_seconds_ewma is not None:
+            saved = self.hits * self.llm_seconds_ewma - self.render_seconds
+        return {
+            "enabled": sorted(self.enabled),
+            "templated_turns": self.hits,
+            "model_described_turns": self.misses,
+            "render_seconds": self.render_seconds,
+            "followup_llm_seconds_avg": self.llm_seconds_ewma,
+            "estimated_seconds_saved": saved,
+        }
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from injective_functions.utils.tracing import span
+
+"""Read-through cache of read-only function results shared by every session"""
+
+# Seconds a result stays fresh, functions not listed here are never cached
+DEFAULT_TTLS: Dict[str, float] = {
+    "get_mid_price_and_tob_derivatives_market": 1.0,
+    "get_mid_price_and_tob_spot_market": 1.0,
+    "get_derivatives_orderbook": 1.0,
+    "get_spot_orderbook": 1.0,
+    "get_aggregate_market_volumes": 30.0,
+    "query_total_supply": 60.0,
+    "fetch_auctions": 30.0,
+    "fetch_latest_auction": 30.0,
+    "fetch_auction_bids": 10.0,
+    # account specific, see ACCOUNT_FUNCTIONS
+    "query_balances": 5.0,
+    "query_spendable_balances": 5.0,
+    "get_subaccount_deposits": 5.0,
+    "get_subaccount_orders": 2.0,
+    "get_historical_orders": 10.0,
+    "get_aggregate_account_volumes": 30.0,
+    "trader_derivative_orders": 2.0,
+    "trader_derivative_orders_by_hash": 2.0,
+    "trader_spot_orders": 2.0,
+    "trader_spot_orders_by_hash": 2.0,
+    "fetch_grants": 10.0,
+}
+
+# Functions reading the state of the calling account, keyed by its address
+ACCOUNT_FUNCTIONS = frozenset(
+    {
+        "query_balances",
+        "query_spendable_balances",
+        "get_subaccount_deposits",
+        "get_subaccount_orders",
+        "get_historical_orders",
+        "get_aggregate_account_volumes",
+        "trader_derivative_orders",
+        "trader_derivative_orders_by_hash",
+        "trader_spot_orders",
+        "trader_spot_orders_by_hash",
+        "fetch_grants",
+    }
+)
+
+CacheKey = Tuple[str, Optional[str], str, str]
+
+
+class ResultCache:
+    """
+    TTL cache in front of FunctionExecutor.
+
+    Market data is shared by every agent on the same network, account data by
+    the sessions of the same address. Concurrent identical reads share a
+    single chain request.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = 10000,
+        enabled: bool = True,
+    ) -> None:
+        """
+        Args:
+            ttls (Dict[str, float]): Seconds each cached function stays fresh
+            max_entries (int): Entries kept before the least recently used is evicted
+            enabled (bool): When False every call goes to the chain
+        """
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.max_entries = max_entries
+        self.enabled = enabled
+        # key -> (result, fetched_at), least recently used first
+        self._entries: "OrderedDict[CacheKey, tuple]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+
+    def cacheable(self, function_name: str) -> bool:
+        return self.enabled and function_name in self.ttls
+
+    def key(
+        self, network: str, address: str, function_name: str, arguments: dict
+    ) -> CacheKey:
+        return (
+            network,
+            address if function_name in ACCOUNT_FUNCTIONS else None,
+            function_name,
+            json.dumps(arguments, sort_keys=True, default=str),
+        )
+
+    @staticmethod
+    def _count(counter: Dict[str, int], function_name: str) -> None:
+        counter[function_name] = counter.get(function_name, 0) + 1
+
+    @staticmethod
+    def _with_age(result: dict, fetched_at: float) -> dict:
+        # the model is told how old the data is so it can mention staleness
+        return dict(result, data_age_seconds=round(time.monotonic() - fetched_at, 2))
+
+    async def get_or_fetch(
+        self, key: CacheKey, fetch: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """Return a fresh cached result or fetch it, caching only successes"""
+        function_name = key[2]
+        with span("result_cache", function=function_name) as lookup:
+            return await self._get_or_fetch(key, fetch, lookup)
+
+    async def _get_or_fetch(
+        self, key: CacheKey, fetch: Callable[[], Awaitable[dict]], lookup
+    ) -> dict:
+        function_name = key[2]
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() - entry[1] <= self.ttls[function_name]:
+                self._entries.move_to_end(key)
+                self._count(self.hits, function_name)
+                lookup.set(outcome="hit")
+                return self._with_age(*entry)
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count(self.coalesced, function_name)
+            lookup.set(outcome="coalesced")
+            return self._with_age(*await asyncio.shield(inflight))
+
+        self._count(self.misses, function_name)
+        lookup.set(outcome="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch()
+            fetched_at = time.monotonic()
+            future.set_result((result, fetched_at))
+            if isinstance(result, dict) and result.get("success"):
+                self._entries[key] = (result, fetched_at)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return self._with_age(result, fetched_at)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # waiters get the exception, nobody else has to retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def invalidate_account(self, network: str, address: str) -> None:
+        """Drop the cached reads of an account after it changed state"""
+        for key in [key for key in self._entries if key[:2] == (network, address)]:
+            del self._entries[key]
+
+    def stats(self) -> Dict:
+        functions = {}
+        for function_name in set(self.hits) | set(self.misses) | set(self.coalesced):
+            hits = self.hits.get(function_name, 0) + self.coalesced.get(function_name, 0)
+            total = hits + self.misses.get(function_name, 0)
+            functions[function_name] = {
+                "hits": self.hits.get(function_name, 0),
+                "coalesced": self.coalesced.get(function_name, 0),
+                "misses": self.misses.get(function_name, 0),
+                "hit_rate": hits / total if total else 0.0,
+            }
+        hits = sum(self.hits.values()) + sum(self.coalesced.values())
+        total = hits + sum(self.misses.values())
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hit_rate": hits / total if total else 0.0,
+            "functions": functions,
+        }
@@ -0,0 +1,236 @@
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional
+from app.history import count_tokens
+from injective_functions.exchange.pricing import OrderbookSnapshot
+from injective_functions.utils import json_codec
+
+"""Compact views of function results for the model context"""
+
+# A shaper returns the view of a result payload keeping at most limit
+# entries per list
+Shaper = Callable[[object, int], object]
+
+# Entries per list tried in turn until the view fits the token budget
+LIMITS = (20, 10, 5, 2, 1)
+
+
+def _number(value) -> str:
+    """Plain decimal string without exponent or trailing zeros"""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    if value == value.to_integral_value():
+        return str(value.quantize(Decimal(1)))
+    return format(value.normalize(), "f")
+
+
+def _head(items: list, limit: int, latest: bool = False):
+    """The list itself when short, else its count and first or last entries"""
+    if len(items) <= limit:
+        return items
+    if latest:
+        return {"count": len(items), "latest": items[-limit:]}
+    return {"count": len(items), "first": items[:limit]}
+
+
+def shape_lists(result, limit: int):
+    """Cap the lists of a result and those of its top level values"""
+    if isinstance(result, list):
+        return _head(result, limit)
+    if isinstance(result, dict):
+        return {
+            key: _head(value, limit) if isinstance(value, list) else value
+            for key, value in result.items()
+        }
+    return result
+
+
+def shape_latest(result, limit: int):
+    """Keep the most recent entries of a chronological list"""
+    if isinstance(result, list):
+        return _head(result, limit, latest=True)
+    return result
+
+
+def shape_amounts(result, limit: int):
+    """Denom -> amount maps, zero balances are dropped first"""
+    if not isinstance(result, dict) or len(result) <= limit:
+        return result
+    nonzero = {
+        denom: amount
+        for denom, amount in result.items()
+        if str(amount).strip("0.") != ""
+    }
+    shown = dict(list(nonzero.items())[:limit])
+    return {
+        "denoms": len(result),
+        "nonzero": len(nonzero),
+        "amounts": shown,
+        "omitted": len(result) - len(shown),
+    }
+
+
+def shape_orderbook(result, limit: int):
+    """Best levels of both sides plus the spread and the depth of each side"""
+    if not isinstance(result, dict) or not (
+        "buysPriceLevel" in result or "sellsPriceLevel" in result
+    ):
+        return shape_lists(result, limit)
+    snapshot = OrderbookSnapshot.from_chain("", result)
+
+    def side(levels: List) -> Dict:
+        return {
+            "levels": len(levels),
+            "depth": _number(sum((quantity for _, quantity in levels), Decimal(0))),
+            "top": [
+                {"p": _number(price), "q": _number(quantity)}
+                for price, quantity in levels[:limit]
+            ],
+        }
+
+    best_bid = snapshot.bids[0][0] if snapshot.bids else None
+    best_ask = snapshot.asks[0][0] if snapshot.asks else None
+    mid_price = snapshot.mid_price
+    return {
+        "best_bid": _number(best_bid) if best_bid is not None else None,
+        "best_ask": _number(best_ask) if best_ask is not None else None,
+        "mid_price": _number(mid_price) if mid_price is not None else None,
+        "spread": (
+            _number(best_ask - best_bid)
+            if best_bid is not None and best_ask is not None
+            else None
+        ),
+        "bids": side(snapshot.bids),
+        "asks": side(snapshot.asks),
+    }
+
+
+def shape_trade_records(result, limit: int):
+    """Per market trade count, volume, price range and VWAP plus the latest trades"""
+    records = result.get("tradeRecords") if isinstance(result, dict) else None
+    if not isinstance(records, list):
+        return shape_lists(result, limit)
+    markets = []
+    for market in records:
+        trades = market.get("latestTradeRecords") or []
+        prices = [Decimal(trade["price"]) for trade in trades]
+        quantities = [Decimal(trade["quantity"]) for trade in trades]
+        volume = sum(quantities, Decimal(0))
+        latest = sorted(
+            trades, key=lambda trade: int(trade.get("timestamp", 0)), reverse=True
+        )
+        markets.append(
+            {
+                "market_id": market.get("marketId"),
+                "trades": len(trades),
+                "volume": _number(volume),
+                "min_price": _number(min(prices)) if prices else None,
+                "max_price": _number(max(prices)) if prices else None,
+                "vwap": (
+                    _number(
+                        sum((p * q for p, q in zip(prices, quantities)), Decimal(0))
+                        / volume
+                    )
+                    if volume
+                    else None
+                ),
+                "latest": latest[:limit],
+            }
+        )
+    return {"markets": markets}
+
+
+SHAPERS: Dict[str, Shaper] = {
+    "get_derivatives_orderbook": shape_orderbook,
+    "get_spot_orderbook": shape_orderbook,
+    "get_historical_orders": shape_trade_records,
+    "get_subaccount_orders": shape_lists,
+    "trader_derivative_orders": shape_lists,
+    "trader_spot_orders": shape_lists,
+    "trader_derivative_orders_by_hash": shape_lists,
+    "trader_spot_orders_by_hash": shape_lists,
+    "get_aggregate_market_volumes": shape_lists,
+    "get_aggregate_account_volumes": shape_lists,
+    "fetch_auctions": shape_latest,
+    "fetch_auction_bids": shape_lists,
+    "fetch_grants": shape_lists,
+    "query_balances": shape_amounts,
+    "query_spendable_balances": shape_amounts,
+    "query_total_supply": shape_amounts,
+}
+
+
+class ResultShapers:
+    """
+    Turns function results into the content of tool messages.
+
+    Results of functions with a shaper are replaced by a compact view that
+    fits max_tokens, trying fewer entries per list until it does. The HTTP
+    client still receives the full result, only the model sees the view.
+    """
+
+    def __init__(
+        self, max_tokens: int = 800, enabled: Optional[Iterable[str]] = None
+    ) -> None:
+        """
+        Args:
+            max_tokens (int): Token budget of one shaped result
+            enabled (Iterable[str]): Functions whose results are shaped, every
+                shaper is enabled when not set
+        """
+        self.max_tokens = max_tokens
+        self.enabled = set(SHAPERS) if enabled is None else set(enabled) & set(SHAPERS)
+        self.shaped = 0
+        self.over_budget = 0
+        self.failures = 0
+        self.chars_out = 0
+
+    @classmethod
+    def from_setting(cls, setting: Optional[str], max_tokens: int) -> "ResultShapers":
+        """Build from a comma separated list of functions, "all" or "none" """
+        if setting is None or setting.strip().lower() == "all":
+            return cls(max_tokens)
+        if setting.strip().lower() == "none":
+            return cls(max_tokens, enabled=())
+        return cls(
+            max_tokens,
+            enabled=[name.strip() for name in setting.split(",") if name.strip()],
+        )
+
+    def content(self, function_name: str, result) -> str:
+        """JSON content of the tool message answering a call"""
+        if (
+            function_name not in self.enabled
+            or not isinstance(result, dict)
+            or not result.get("success")
+            or "result" not in result
+        ):
+            return json_codec.dumps(result)
+        shaper = SHAPERS[function_name]
+        try:
+            for limit in LIMITS:
+                view = dict(
+                    result, result=shaper(result["result"], limit), compact=True
+                )
+                content = json_codec.dumps(view)
+                if count_tokens(content) <= self.max_tokens:
+                    break
+            else:
+                # left to the history's digest and hard cap
+                self.over_budget += 1
+        except (ArithmeticError, KeyError, TypeError, ValueError) as e:
+            print(f"Shaping the result of {function_name} failed: {str(e)}")
+            self.failures += 1
+            return json_codec.dumps(result)
+        self.shaped += 1
+        self.chars_out += len(content)
+        return content
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": sorted(self.enabled),
+            "max_tokens": self.max_tokens,
+            "shaped": self.shaped,
+            "over_budget": self.over_budget,
+            "failures": self.failures,
+            "avg_chars": self.chars_out / self.shaped if self.shaped else None,
+        }
@@ -0,0 +1,345 @@
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Set
+from app.history import ConversationHistory
+from injective_functions.utils import json_codec
+
+"""Session history backends: bounded in-memory LRU/TTL and SQLite with write-behind"""
+
+
+class SessionStore(ABC):
+    """Interface of the stores holding ConversationHistory objects by session_id"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[ConversationHistory]:
+        pass
+
+    @abstractmethod
+    def put(self, session_id: str, history: ConversationHistory) -> None:
+        """Insert a session, or mark it modified after it was changed in place"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def __contains__(self, session_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def values(self) -> Iterator[ConversationHistory]:
+        """Sessions currently resident in memory"""
+
+    async def load(self, session_id: str) -> None:
+        """Bring a persisted session into memory, awaited before the session is read"""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict:
+        return {"resident_sessions": len(self)}
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU bounded store with an idle TTL, nothing survives a restart"""
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 24 * 3600) -> None:
+        """
+        Args:
+            max_sessions (int): Sessions kept before the least recently used one is evicted
+            ttl (float): Seconds of inactivity after which a session is evicted
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # session_id -> (history, last access), least recently used first
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self.evictions = 0
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl is not None and now - last_access > self.ttl
+
+    def _evict(self, session_id: str, history: ConversationHistory) -> None:
+        """Hook called for every session leaving memory"""
+        self.evictions += 1
+
+    def _trim(self, now: float) -> None:
+        # the front of the LRU is also the longest idle entry, so expired
+        # sessions are always found there
+        while self._sessions:
+            session_id, (history, last_access) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and not self._expired(
+                last_access, now
+            ):
+                break
+            del self._sessions[session_id]
+            self._evict(session_id, history)
+
+    def get(self, session_id: str) -> Optional[ConversationHistory]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if self._expired(entry[1], now):
+            del self._sessions[session_id]
+            self._evict(session_id, entry[0])
+            return None
+        self._sessions[session_id] = (entry[0], now)
+        self._sessions.move_to_end(session_id)
+        return entry[0]
+
+    def put(self, session_id: str, history: ConversationHistory) -> None:
+        now = time.monotonic()
+        self._sessions[session_id] = (history, now)
+        self._sessions.move_to_end(session_id)
+        self._trim(now)
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def values(self) -> Iterator[ConversationHistory]:
+        return (history for history, _ in self._sessions.values())
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "resident_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteSessionStore(InMemorySessionStore):
+    """
+    SQLite (WAL) backed store with an in-memory LRU in front of it.
+
+    Modified sessions and deletions are written behind in batches by a
+    background task. Sessions missing from memory are read by load() in a
+    worker thread, through their own connection: with WAL the read never
+    waits for the writer's transaction.
+    """
+
+    def __init__(
+        self,
+        path: str = "sessions.db",
+        max_sessions: int = 10000,
+        ttl: float = 24 * 3600,
+        flush_interval: float = 1.0,
+        retention: Optional[float] = 30 * 24 * 3600,
+    ) -> None:
+        """
+        Args:
+            path (str): Database file
+            max_sessions (int): Sessions kept in memory
+            ttl (float): Seconds of inactivity after which a session leaves memory
+            flush_interval (float): Seconds between two write-behind batches
+            retention (float): Sessions not updated for this long are deleted from disk
+        """
+        super().__init__(max_sessions=max_sessions, ttl=ttl)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._dirty: Dict[str, ConversationHistory] = {}
+        # sessions deleted since the last flush
+        self._deleted: Set[str] = set()
+        self._lock = threading.Lock()
+        self._task = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.disk_loads = 0
+        # get() of a session that was not load()ed first, read on the event loop
+        self.blocking_loads = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        # used by loads, the writer connection is used by flushes
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._reader_lock = threading.Lock()
+
+    @staticmethod
+    def _serialize(history: ConversationHistory) -> str:
+        return json_codec.dumps(
+            {
+                "messages": history.messages,
+                "token_counts": history.token_counts,
+                "summary": history.summary,
+            }
+        )
+
+    @staticmethod
+    def _deserialize(data: str) -> ConversationHistory:
+        state = json_codec.loads(data)
+        history = ConversationHistory()
+        history.messages = state["messages"]
+        history.token_counts = state["token_counts"]
+        history.total_tokens = sum(history.token_counts)
+        history.set_summary(state.get("summary"))
+        return history
+
+    def _read(self, session_id: str) -> Optional[ConversationHistory]:
+        with self._reader_lock:
+            row = self._reader.execute(
+                "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return None if row is None else self._deserialize(row[0])
+
+    def _resident(self, session_id: str) -> Optional[ConversationHistory]:
+        """The session if it is in memory or waiting to be written"""
+        history = super().get(session_id)
+        if history is None:
+            history = self._dirty.get(session_id)
+            if history is not None:
+                super().put(session_id, history)
+        return history
+
+    async def load(self, session_id: str) -> None:
+        if self._resident(session_id) is not None or session_id in self._deleted:
+            return
+        history = await asyncio.to_thread(self._read, session_id)
+        # the session may have been created or deleted during the read
+        if history is None or session_id in self._deleted:
+            return
+        if self._resident(session_id) is None:
+            super().put(session_id, history)
+            self.disk_loads += 1
+
+    def get(self, session_id: str) -> Optional[ConversationHistory]:
+        history = self._resident(session_id)
+        if history is not None or session_id in self._deleted:
+            return history
+        # callers are expected to load() first, this read blocks the loop
+        history = self._read(session_id)
+        if history is None:
+            return None
+        self.blocking_loads += 1
+        super().put(session_id, history)
+        return history
+
+    def put(self, session_id: str, history: ConversationHistory) -> None:
+        super().put(session_id, history)
+        self._dirty[session_id] = history
+        self._deleted.discard(session_id)
+
+    def delete(self, session_id: str) -> None:
+        super().delete(session_id)
+        self._dirty.pop(session_id, None)
+        self._deleted.add(session_id)
+
+    def _write(self, rows, deleted, cutoff: Optional[float]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM sessions WHERE session_id = ?",
+                [(session_id,) for session_id in deleted],
+            )
+            self._db.executemany(
+                "INSERT INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, "
+                "updated_at = excluded.updated_at",
+                rows,
+            )
+            if cutoff is not None:
+                self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+            self._db.commit()
+
+    async def flush(self) -> int:
+        """Write every modified and deleted session in one transaction"""
+        if not self._dirty and not self._deleted:
+            return 0
+        dirty, self._dirty = self._dirty, {}
+        deleted, self._deleted = self._deleted, set()
+        now = time.time()
+        try:
+            # serialize on the loop so the snapshot is consistent with the histories
+            rows = [
+                (session_id, self._serialize(history), now)
+                for session_id, history in dirty.items()
+            ]
+            cutoff = now - self.retention if self.retention else None
+            await asyncio.to_thread(self._write, rows, deleted, cutoff)
+        except BaseException:
+            # retried by the next flush, sessions modified or deleted
+            # meanwhile keep their newer state
+            for session_id, history in dirty.items():
+                if session_id not in self._deleted:
+                    self._dirty.setdefault(session_id, history)
+            for session_id in deleted:
+                if session_id not in self._dirty:
+                    self._deleted.add(session_id)
+            raise
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Session flush failed: {str(e)}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._reader.close()
+        self._db.close()
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update(
+            {
+                "backend": "sqlite",
+                "path": self.path,
+                "dirty_sessions": len(self._dirty),
+                "pending_deletes": len(self._deleted),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "disk_loads": self.disk_loads,
+                "blocking_loads": self.blocking_loads,
+            }
+        )
+        return stats
+
+
+def create_session_store(backend: str = "memory", **kwargs) -> SessionStore:
+    """Build a session store from its backend name ("memory" or "sqlite")"""
+    if backend == "memory":
+        kwargs.pop("path", None)
+        return InMemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    raise ValueError(f"Unknown session store backend: {backend}")
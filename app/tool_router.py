@@ -0,0 +1,202 @@
+import json
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+from app.history import count_tokens
+
+"""Per-turn selection of the function schemas relevant to the conversation"""
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Domain words users say that do not appear in the schema descriptions
+SYNONYMS = {
+    "price": ["mid", "tob", "orderbook"],
+    "quote": ["mid", "tob"],
+    "book": ["orderbook"],
+    "depth": ["orderbook"],
+    "buy": ["order", "place", "market", "limit"],
+    "sell": ["order", "place", "market", "limit"],
+    "long": ["order", "derivative", "place"],
+    "short": ["order", "derivative", "place"],
+    "perp": ["derivative", "derivatives"],
+    "perpetual": ["derivative", "derivatives"],
+    "futures": ["derivative", "derivatives"],
+    "balance": ["balances", "deposits"],
+    "wallet": ["balances"],
+    "send": ["transfer"],
+    "pay": ["transfer"],
+    "delegate": ["stake", "staking"],
+    "bid": ["auction"],
+    "stop": ["trigger"],
+    "loss": ["trigger"],
+    "profit": ["trigger"],
+    "if": ["trigger"],
+    "when": ["trigger"],
+    "crosses": ["trigger"],
+    "history": ["historical"],
+    "trades": ["historical", "orders"],
+    "volume": ["volumes", "aggregate"],
+    "token": ["denom"],
+    "supply": ["total", "supply"],
+}
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so 'balances'/'balance' and 'staking'/'stake' meet"""
+    for suffix in ("ing", "es", "s", "e"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(word) for word in _WORD.findall(text.lower().replace("_", " "))]
+
+
+_STEMMED_SYNONYMS = {
+    _stem(word): [_stem(synonym) for synonym in synonyms]
+    for word, synonyms in SYNONYMS.items()
+}
+
+
+def _expand(words: Iterable[str]) -> List[str]:
+    expanded = []
+    for word in words:
+        expanded.append(word)
+        expanded.extend(_STEMMED_SYNONYMS.get(word, []))
+    return expanded
+
+
+class ToolRouter:
+    """Indexes function schemas once and picks the top-k for each turn"""
+
+    def __init__(
+        self,
+        schemas: List[dict],
+        top_k: int = 8,
+        min_score: float = 0.2,
+        context_messages: int = 4,
+    ) -> None:
+        """
+        Args:
+            schemas (List[dict]): Function schemas as sent to the model
+            top_k (int): Number of schemas sent per turn, 0 sends the full set
+            min_score (float): Below this best score the full set is sent
+            context_messages (int): Recent history messages taken into account
+        """
+        self.schemas = schemas
+        self.top_k = top_k
+        self.min_score = min_score
+        self.context_messages = context_messages
+        self.by_name = {schema["name"]: schema for schema in schemas}
+        self.full_size = len(json.dumps(schemas))
+
+        # keyword index: function name parts, weighted above description words
+        self.name_words: Dict[str, Set[str]] = {
+            schema["name"]: set(tokenize(schema["name"])) for schema in schemas
+        }
+
+        # tf-idf vectors over name, description and parameter docs
+        documents = {schema["name"]: self._document(schema) for schema in schemas}
+        document_frequency = Counter()
+        for words in documents.values():
+            document_frequency.update(set(words))
+        total = len(documents)
+        self.idf = {
+            word: math.log((1 + total) / (1 + count)) + 1
+            for word, count in document_frequency.items()
+        }
+        self.vectors = {
+            name: self._vector(words) for name, words in documents.items()
+        }
+
+        self.turns = 0
+        self.fallbacks = 0
+        self.bytes_sent = 0
+        self.bytes_full = 0
+
+    @staticmethod
+    def _document(schema: dict) -> List[str]:
+        words = tokenize(schema["name"]) * 2 + tokenize(schema.get("description", ""))
+        properties = schema.get("parameters", {}).get("properties", {})
+        for name, spec in properties.items():
+            words += tokenize(name)
+            if isinstance(spec, dict):
+                words += tokenize(spec.get("description", ""))
+        return words
+
+    def _vector(self, words: List[str]) -> Dict[str, float]:
+        counts = Counter(word for word in words if word in self.idf)
+        vector = {word: count * self.idf[word] for word, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        return {word: value / norm for word, value in vector.items()}
+
+    def score(self, text: str) -> Dict[str, float]:
+        words = _expand(tokenize(text))
+        query = self._vector(words)
+        word_set = set(words)
+        scores = {}
+        for name, vector in self.vectors.items():
+            similarity = sum(
+                weight * vector.get(word, 0.0) for word, weight in query.items()
+            )
+            keyword_hits = len(self.name_words[name] & word_set)
+            scores[name] = similarity + 0.05 * keyword_hits
+        return scores
+
+    def select(self, message: str, history: Optional[List[dict]] = None) -> List[dict]:
+        """Return the schemas to send for this turn"""
+        self.turns += 1
+        recent = (history or [])[-self.context_messages :]
+        if not self.top_k or self.top_k >= len(self.schemas):
+            return self._record(self.schemas, fallback=True)
+
+        # functions used in the recent turns stay available for follow-ups
+        # and confirmations
+        called = [
+            tool_call["function"]["name"]
+            for item in recent
+            for tool_call in item.get("tool_calls") or []
+        ] + [
+            item["function_call"]["name"] for item in recent if item.get("function_call")
+        ]
+        pinned = [name for name in called if name in self.by_name]
+        context = " ".join(
+            item.get("content") or ""
+            for item in recent
+            if item.get("role") in ("user", "assistant")
+        )
+        # the current message weighs more than the context
+        scores = self.score(f"{message} {message} {context}")
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        if not pinned and scores[ranked[0]] < self.min_score:
+            return self._record(self.schemas, fallback=True)
+
+        names = list(dict.fromkeys(pinned + ranked[: self.top_k]))
+        return self._record([self.by_name[name] for name in names], fallback=False)
+
+    def _record(self, selected: List[dict], fallback: bool) -> List[dict]:
+        if fallback:
+            self.fallbacks += 1
+            self.bytes_sent += self.full_size
+        else:
+            self.bytes_sent += len(json.dumps(selected))
+        self.bytes_full += self.full_size
+        return selected
+
+    def stats(self) -> Dict:
+        saved_bytes = self.bytes_full - self.bytes_sent
+        return {
+            "turns": self.turns,
+            "fallbacks": self.fallbacks,
+            "top_k": self.top_k,
+            "full_schema_bytes": self.full_size,
+            "full_schema_tokens": count_tokens(json.dumps(self.schemas)),
+            "schema_bytes_saved": saved_bytes,
+            "schema_bytes_saved_ratio": (
+                saved_bytes / self.bytes_full if self.bytes_full else 0.0
+            ),
+            # ~4 bytes per token for JSON schemas
+            "estimated_prompt_tokens_saved": saved_bytes // 4,
+        }
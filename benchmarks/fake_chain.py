@@ -0,0 +1,181 @@
+"""
+Local stand-in for the Injective chain clients, for offline load tests.
+
+Start agent_server with INJECTIVE_CLIENT_FACTORY=benchmarks.fake_chain:create_all
+and every agent gets these clients instead of the pyinjective backed
+modules. Reads and broadcasts answer with the result shapes of the real
+modules after FAKE_CHAIN_LATENCY / FAKE_CHAIN_TX_LATENCY seconds, so the
+server's templates, caches and confirmation flow behave as in production.
+Signing, protobuf encoding and registry downloads are not exercised.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import os
+from typing import Dict, List, Optional
+
+READ_LATENCY = float(os.getenv("FAKE_CHAIN_LATENCY", "0.02"))
+TX_LATENCY = float(os.getenv("FAKE_CHAIN_TX_LATENCY", "0.05"))
+# denoms held by every fake account
+DENOMS = int(os.getenv("FAKE_CHAIN_DENOMS", "5"))
+
+
+def _price(market_id: str) -> float:
+    # stable per market, so runs are reproducible
+    digest = hashlib.sha256(str(market_id).lower().encode()).digest()
+    return 1 + int.from_bytes(digest[:4], "big") % 100000
+
+
+class FakeAddress:
+    def __init__(self, private_key: str) -> None:
+        self._bech32 = "inj1" + hashlib.sha256(private_key.encode()).hexdigest()[:38]
+
+    def to_acc_bech32(self) -> str:
+        return self._bech32
+
+    def get_subaccount_id(self, index: int) -> str:
+        return "0x" + self._bech32.encode().hex()[:40] + f"{index:024x}"
+
+
+class FakeChainClient:
+    """Stands in for ChainInteractor, shared by the modules of one agent"""
+
+    def __init__(self, network_type: str, private_key: str) -> None:
+        self.network_type = network_type
+        self.address = FakeAddress(private_key)
+        self._sequence = itertools.count()
+        self.closed = False
+
+    async def read(self) -> None:
+        await asyncio.sleep(READ_LATENCY)
+
+    async def build_and_broadcast_tx(self, *msgs) -> Dict:
+        await asyncio.sleep(TX_LATENCY)
+        sequence = next(self._sequence)
+        txhash = hashlib.sha256(
+            f"{self.address.to_acc_bech32()}:{sequence}".encode()
+        ).hexdigest()
+        return {
+            "success": True,
+            "result": {"txResponse": {"txhash": txhash.upper(), "code": 0}},
+            "gas_wanted": 150000,
+            "gas_fee": "0.00007500 INJ",
+        }
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeModule:
+    def __init__(self, chain_client: FakeChainClient) -> None:
+        self.chain_client = chain_client
+
+
+class FakeBank(FakeModule):
+    def _balances(self) -> Dict[str, str]:
+        balances = {
+            "inj": "12.345678901234567891",
+            "peggy0xdAC17F958D2ee523a2206206994597C13D831ec7": "1500.25",
+        }
+        for index in range(max(0, DENOMS - len(balances))):
+            balances[f"factory/inj1fake/token{index}"] = f"{index}.5"
+        return balances
+
+    async def query_balances(self, denom_list: Optional[List[str]] = None) -> Dict:
+        await self.chain_client.read()
+        balances = self._balances()
+        if denom_list is not None:
+            balances = {
+                denom: balances.get(denom, "The token is not on mainnet!")
+                for denom in denom_list
+            }
+        return {"success": True, "result": balances}
+
+    async def query_spendable_balances(
+        self, denom_list: Optional[List[str]] = None
+    ) -> Dict:
+        return await self.query_balances(denom_list)
+
+
+class FakeExchange(FakeModule):
+    async def _mid_price_and_tob(self, market_id: str) -> Dict:
+        await self.chain_client.read()
+        price = _price(market_id)
+        return {
+            "success": True,
+            "result": {
+                "midPrice": f"{price:.2f}",
+                "bestBuyPrice": f"{price * 0.9995:.2f}",
+                "bestSellPrice": f"{price * 1.0005:.2f}",
+            },
+        }
+
+    async def get_mid_price_and_tob_derivatives_market(self, market_id: str) -> Dict:
+        return await self._mid_price_and_tob(market_id)
+
+    async def get_mid_price_and_tob_spot_market(self, market_id: str) -> Dict:
+        return await self._mid_price_and_tob(market_id)
+
+    async def get_derivatives_orderbook(self, market_id: str, limit: int = None) -> Dict:
+        await self.chain_client.read()
+        price = _price(market_id)
+        levels = range(1, (limit or 20) + 1)
+        return {
+            "success": True,
+            "result": {
+                "buysPriceLevel": [
+                    {"p": f"{price - level:.2f}", "q": f"{level * 0.5:.3f}"}
+                    for level in levels
+                ],
+                "sellsPriceLevel": [
+                    {"p": f"{price + level:.2f}", "q": f"{level * 0.5:.3f}"}
+                    for level in levels
+                ],
+            },
+        }
+
+    async def get_subaccount_deposits(
+        self, subaccount_idx: int = 0, denoms: Optional[List[str]] = None
+    ) -> Dict:
+        await self.chain_client.read()
+        return {
+            "success": True,
+            "result": {
+                "inj": {"available_balance": "3.5", "total_balance": "4"},
+                "peggy0xdAC17F958D2ee523a2206206994597C13D831ec7": {
+                    "available_balance": "250",
+                    "total_balance": "400",
+                },
+            },
+        }
+
+
+class FakeTrader(FakeModule):
+    async def place_derivative_limit_order(self, **order) -> Dict:
+        return await self.chain_client.build_and_broadcast_tx(order)
+
+    async def place_derivative_market_order(self, **order) -> Dict:
+        return await self.chain_client.build_and_broadcast_tx(order)
+
+    async def place_spot_limit_order(self, **order) -> Dict:
+        return await self.chain_client.build_and_broadcast_tx(order)
+
+    async def place_spot_market_order(self, **order) -> Dict:
+        return await self.chain_client.build_and_broadcast_tx(order)
+
+    async def cancel_derivative_limit_order(self, **order) -> Dict:
+        return await self.chain_client.build_and_broadcast_tx(order)
+
+    async def cancel_spot_limit_order(self, **order) -> Dict:
+        return await self.chain_client.build_and_broadcast_tx(order)
+
+
+async def create_all(private_key: str, network_type: str = "mainnet") -> Dict:
+    """Drop-in replacement for InjectiveClientFactory.create_all"""
+    chain_client = FakeChainClient(network_type, private_key)
+    return {
+        "bank": FakeBank(chain_client),
+        "exchange": FakeExchange(chain_client),
+        "trader": FakeTrader(chain_client),
+    }
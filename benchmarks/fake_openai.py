@@ -0,0 +1,209 @@
+"""
+Minimal OpenAI compatible chat completions server for benchmarks.
+
+Point the agent at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1. It
+answers every request with a fixed reply after a configurable delay, so
+benchmarks measure the agent and not the model. A responder can script
+replies and function calls from the request messages instead.
+"""
+
+import argparse
+import asyncio
+import json
+import itertools
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# messages of a request -> (reply text, [{"name": ..., "arguments": {...}}])
+Responder = Callable[[List[dict]], Tuple[Optional[str], List[dict]]]
+
+
+class FakeOpenAI:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        reply_tokens: int = 20,
+        token_interval: float = 0.0,
+        responder: Optional[Responder] = None,
+    ) -> None:
+        """
+        Args:
+            latency (float): Seconds before the first token
+            reply_tokens (int): Words in every reply
+            token_interval (float): Seconds between two streamed tokens
+            responder (Responder): Scripts the reply and function calls of every request
+        """
+        self.latency = latency
+        self.reply_tokens = reply_tokens
+        self.token_interval = token_interval
+        self.responder = responder
+        self.requests = 0
+        self._call_ids = itertools.count()
+        self.server: Optional[asyncio.base_events.Server] = None
+        # open keep-alive connections, closed by stop()
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    def _tokens(self):
+        return [f"token{index} " for index in range(self.reply_tokens)]
+
+    def _reply(self, request: dict) -> Tuple[List[str], List[dict]]:
+        """Tokens and tool calls answering a request"""
+        if self.responder is None:
+            return self._tokens(), []
+        content, calls = self.responder(request.get("messages", []))
+        tokens = [f"{word} " for word in (content or "").split()]
+        tool_calls = [
+            {
+                "id": f"call_fake_{next(self._call_ids)}",
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": (
+                        call["arguments"]
+                        if isinstance(call["arguments"], str)
+                        else json.dumps(call["arguments"])
+                    ),
+                },
+            }
+            for call in calls
+        ]
+        return tokens, tool_calls
+
+    @staticmethod
+    def _chunk(model: str, delta: dict, finish_reason=None) -> bytes:
+        body = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body)}\n\n".encode()
+
+    async def _completion(self, writer: asyncio.StreamWriter, request: dict) -> None:
+        model = request.get("model", "fake")
+        await asyncio.sleep(self.latency)
+        tokens, tool_calls = self._reply(request)
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        if not request.get("stream"):
+            content = "".join(tokens).strip() or None
+            message = {"role": "assistant", "content": content}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            body = json.dumps(
+                {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": message,
+                            "finish_reason": finish_reason,
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 0,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": len(tokens),
+                    },
+                }
+            ).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+
+        def send(data: bytes) -> None:
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        send(self._chunk(model, {"role": "assistant", "content": ""}))
+        for token in tokens:
+            if self.token_interval:
+                await asyncio.sleep(self.token_interval)
+            send(self._chunk(model, {"content": token}))
+        for index, call in enumerate(tool_calls):
+            # the name arrives first and the arguments in a later chunk, as
+            # with the real API
+            head = dict(
+                call, index=index, function=dict(call["function"], arguments="")
+            )
+            send(self._chunk(model, {"tool_calls": [head]}))
+            arguments = {
+                "index": index,
+                "function": {"arguments": call["function"]["arguments"]},
+            }
+            send(self._chunk(model, {"tool_calls": [arguments]}))
+        send(self._chunk(model, {}, finish_reason))
+        send(b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            # keep-alive: serve requests until the client closes the connection
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode().split("\r\n")
+                headers = {
+                    key.strip().lower(): value.strip()
+                    for key, value in (
+                        line.split(":", 1) for line in lines[1:] if ":" in line
+                    )
+                }
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                if "/chat/completions" in lines[0]:
+                    await self._completion(writer, json.loads(body or b"{}"))
+                else:
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving and return the bound port"""
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            # idle connections end their handler with an incomplete read
+            handlers = list(self._connections)
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self.server.wait_closed()
+
+
+async def _main(args) -> None:
+    fake = FakeOpenAI(args.latency, args.reply_tokens, args.token_interval)
+    port = await fake.start(args.host, args.port)
+    print(f"Fake OpenAI listening on http://{args.host}:{port}/v1")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--reply-tokens", type=int, default=20)
+    parser.add_argument("--token-interval", type=float, default=0.0)
+    asyncio.run(_main(parser.parse_args()))
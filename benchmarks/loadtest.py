@@ -0,0 +1,378 @@
+"""
+Offline end-to-end load test of agent_server.
+
+The server runs against the scripted model of this file (served by
+benchmarks/fake_openai.py) and the local chain stand-in of
+benchmarks/fake_chain.py, so no network access or keys are needed. Virtual
+sessions play a weighted mix of scenarios: local intents, model-driven
+reads with and without templates, small talk and trades that are proposed
+and then confirmed or declined. Every response is checked, so behaviour
+regressions count as errors too.
+
+The load runs for --rounds rounds of --sessions sessions. Throughput,
+latency percentiles, the server's memory after each round and its event
+loop lag are reported. Thresholds make the run fail, for CI:
+
+    python benchmarks/loadtest.py --sessions 2000 --concurrency 200 \\
+        --max-p99-ms 500 --max-error-rate 0 --max-memory-growth-mb 50
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_openai import FakeOpenAI  # noqa: E402
+from injective_functions.utils.metrics import percentile  # noqa: E402
+
+BTC_PERP = "BTC/USDT PERP"
+ETH_PERP = "ETH/USDT PERP"
+LIMIT_ORDER = {
+    "price": 65000,
+    "quantity": 0.01,
+    "side": "buy",
+    "market_id": BTC_PERP,
+    "subaccount_idx": 0,
+    "leverage": "5",
+}
+
+
+def mid_price(market_id: str) -> Dict:
+    return {
+        "name": "get_mid_price_and_tob_derivatives_market",
+        "arguments": {"market_id": market_id},
+    }
+
+
+# keyword of the user message -> function calls the scripted model makes
+SCRIPT: List[Tuple[str, List[Dict]]] = [
+    ("perpetual market doing", [mid_price(BTC_PERP)]),
+    ("compare", [mid_price(BTC_PERP), mid_price(ETH_PERP)]),
+    (
+        "orderbook",
+        [
+            {
+                "name": "get_derivatives_orderbook",
+                "arguments": {"market_id": BTC_PERP, "limit": 10},
+            }
+        ],
+    ),
+    (
+        "open a long",
+        [{"name": "place_derivative_limit_order", "arguments": LIMIT_ORDER}],
+    ),
+]
+
+
+def scripted_model(messages: List[dict]) -> Tuple[Optional[str], List[dict]]:
+    """Deterministic stand-in for the model"""
+    last = messages[-1] if messages else {}
+    if last.get("role") == "tool":
+        return "Here is a summary of the data you asked for.", []
+    text = (last.get("content") or "").lower()
+    for keyword, calls in SCRIPT:
+        if keyword in text:
+            return None, calls
+    return "Injective is a layer one blockchain built for finance.", []
+
+
+def answered(response: Dict) -> bool:
+    text = response.get("response") or ""
+    return (
+        bool(text)
+        and "error" not in response
+        and not text.startswith("I apologize")
+    )
+
+
+def succeeded(response: Dict) -> bool:
+    calls = response.get("function_calls") or []
+    return answered(response) and bool(calls) and all(
+        isinstance(call["result"], dict) and call["result"].get("success")
+        for call in calls
+    )
+
+
+def proposed(response: Dict) -> bool:
+    return answered(response) and bool(response.get("pending_action"))
+
+
+def declined(response: Dict) -> bool:
+    return answered(response) and not response.get("function_calls")
+
+
+TRADE = "Open a long on the BTC perpetual, 0.01 at 65000 with 5x leverage"
+
+# scenario -> [(message, check of the response)]
+SCENARIOS: Dict[str, List[Tuple[str, Callable[[Dict], bool]]]] = {
+    "intent_read": [("balance", succeeded)],
+    "llm_read": [("How is the BTC perpetual market doing?", succeeded)],
+    "multi_read": [("Compare the BTC and ETH perpetual prices", succeeded)],
+    "followup_read": [("Show me the BTC perp orderbook", succeeded)],
+    "chat": [("What is Injective?", answered)],
+    "trade": [(TRADE, proposed), ("yes", succeeded)],
+    "trade_declined": [(TRADE, proposed), ("no", declined)],
+}
+DEFAULT_MIX = (
+    "intent_read=20,llm_read=25,multi_read=10,followup_read=5,"
+    "chat=15,trade=20,trade_declined=5"
+)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name.strip()}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process and its children, None off Linux"""
+    total = 0
+    pids = [pid]
+    try:
+        while pids:
+            current = pids.pop()
+            with open(f"/proc/{current}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as file:
+                pids.extend(int(child) for child in file.read().split())
+    except OSError:
+        return None if not total else total / 1024
+    return total / 1024
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ping")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("agent_server did not become ready")
+
+
+async def run_round(
+    client: httpx.AsyncClient,
+    plan: List[Tuple[str, str]],
+    agents: int,
+    concurrency: int,
+) -> Dict:
+    """Play every (session, scenario) of plan with concurrency clients"""
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    sessions = iter(enumerate(plan))
+
+    async def user():
+        for index, (session_id, scenario) in sessions:
+            agent = index % agents
+            for step, (message, check) in enumerate(SCENARIOS[scenario]):
+                payload = {
+                    "message": message,
+                    # sessions are reused across rounds, so memory should
+                    # stop growing once histories reach their token budget
+                    "session_id": session_id,
+                    "agent_id": f"load-agent-{agent}",
+                    "agent_key": hashlib.sha256(f"agent-{agent}".encode()).hexdigest(),
+                    "environment": "testnet",
+                }
+                label = f"{scenario}.{step}"
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/chat", json=payload)
+                    ok = response.status_code == 200 and check(response.json())
+                except (httpx.HTTPError, ValueError):
+                    ok = False
+                latencies.setdefault(label, []).append(time.perf_counter() - start)
+                if not ok:
+                    errors[label] = errors.get(label, 0) + 1
+                    break
+
+    start = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    samples = [latency for values in latencies.values() for latency in values]
+    return {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "errors_by_step": errors,
+        "seconds": elapsed,
+        "throughput": len(samples) / elapsed,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "p99_ms_by_step": {
+            label: percentile(values, 99) * 1000
+            for label, values in sorted(latencies.items())
+        },
+    }
+
+
+async def load_test(args) -> Dict:
+    fake = FakeOpenAI(latency=args.llm_latency, responder=scripted_model)
+    fake_port = await fake.start()
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    plan = [
+        (f"load-{index}", scenario)
+        for index, scenario in enumerate(
+            rng.choices(list(weights), list(weights.values()), k=args.sessions)
+        )
+    ]
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="loadtest",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{fake_port}/v1",
+        INJECTIVE_CLIENT_FACTORY="benchmarks.fake_chain:create_all",
+        FAKE_CHAIN_LATENCY=str(args.chain_latency),
+        FAKE_CHAIN_TX_LATENCY=str(args.tx_latency),
+        SESSION_STORE="memory",
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(ROOT, "agent_server.py"),
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    report = {"config": vars(args), "rounds": []}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", timeout=120, limits=limits
+        ) as client:
+            await wait_ready(client, args.startup_timeout)
+            # one session of every scenario per agent initializes the agents
+            warmup = [
+                (f"warmup-{agent}-{scenario}", scenario)
+                for agent in range(args.agents)
+                for scenario in weights
+            ]
+            await run_round(client, warmup, args.agents, args.concurrency)
+            report["rss_mb_after_warmup"] = rss_mb(server.pid)
+            for round_index in range(1, args.rounds + 1):
+                result = await run_round(client, plan, args.agents, args.concurrency)
+                result["rss_mb"] = rss_mb(server.pid)
+                report["rounds"].append(result)
+                print(
+                    f"round {round_index}: {result['requests']} requests "
+                    f"{result['throughput']:8.1f} req/s p50={result['p50_ms']:.1f}ms "
+                    f"p99={result['p99_ms']:.1f}ms errors={result['errors']} "
+                    f"rss={result['rss_mb']}MB"
+                )
+            stats = (await client.get("/stats")).json()
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+        await fake.stop()
+
+    # multi-worker stats are keyed by worker
+    workers = stats.get("workers", {"server": stats})
+    report["event_loop"] = {
+        url: worker.get("event_loop") for url, worker in workers.items()
+    }
+    report["result_cache_hit_rate"] = {
+        url: worker.get("result_cache", {}).get("hit_rate")
+        for url, worker in workers.items()
+    }
+    rounds = report["rounds"]
+    requests = sum(result["requests"] for result in rounds)
+    report["summary"] = {
+        "requests": requests,
+        "error_rate": sum(result["errors"] for result in rounds) / requests,
+        "throughput": requests / sum(result["seconds"] for result in rounds),
+        "p99_ms": max(result["p99_ms"] for result in rounds),
+        "memory_growth_mb": (
+            rounds[-1]["rss_mb"] - rounds[0]["rss_mb"]
+            if rounds[0]["rss_mb"] is not None
+            else None
+        ),
+        "loop_stalls": sum(
+            (loop or {}).get("stalls", 0) for loop in report["event_loop"].values()
+        ),
+    }
+    return report
+
+
+def check_thresholds(summary: Dict, args) -> List[str]:
+    failures = []
+    if args.max_p99_ms is not None and summary["p99_ms"] > args.max_p99_ms:
+        failures.append(f"p99 {summary['p99_ms']:.1f}ms > {args.max_p99_ms}ms")
+    error_rate = summary["error_rate"]
+    if args.max_error_rate is not None and error_rate > args.max_error_rate:
+        failures.append(f"error rate {error_rate:.4f} > {args.max_error_rate}")
+    growth = summary["memory_growth_mb"]
+    if args.max_memory_growth_mb is not None and growth is not None:
+        if growth > args.max_memory_growth_mb:
+            failures.append(
+                f"memory growth {growth:.1f}MB > {args.max_memory_growth_mb}MB"
+            )
+    stalls = summary["loop_stalls"]
+    if args.max_loop_stalls is not None and stalls > args.max_loop_stalls:
+        failures.append(f"{stalls} event loop stalls > {args.max_loop_stalls}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline agent_server load test")
+    parser.add_argument("--sessions", type=int, default=2000, help="Sessions per round")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--agents", type=int, default=50, help="Distinct agents (keys)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=5700)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--chain-latency", type=float, default=0.02)
+    parser.add_argument("--tx-latency", type=float, default=0.05)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float)
+    parser.add_argument("--max-memory-growth-mb", type=float)
+    parser.add_argument("--max-loop-stalls", type=int)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(load_test(args))
+    summary = report["summary"]
+    print(
+        f"total: {summary['requests']} requests {summary['throughput']:.1f} req/s "
+        f"p99={summary['p99_ms']:.1f}ms error_rate={summary['error_rate']:.4f} "
+        f"memory_growth={summary['memory_growth_mb']}MB stalls={summary['loop_stalls']}"
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2, default=str)
+    failures = check_thresholds(summary, args)
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    sys.exit(1 if failures else 0)
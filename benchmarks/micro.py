@@ -0,0 +1,295 @@
+"""
+Microbenchmarks of the pure-Python helpers on the request path.
+
+Every benchmark calls one helper with fixed inputs. Like pyperf, the number
+of calls per sample is calibrated so a sample takes at least --min-time
+seconds, and the median over --samples samples is reported per call.
+Results can be stored as a baseline and later runs compared against it:
+
+    python benchmarks/micro.py --save benchmarks/micro_baseline.json
+    python benchmarks/micro.py --compare benchmarks/micro_baseline.json
+
+A comparison fails when a benchmark got slower than the baseline by more
+than --max-regression. Timings depend on the machine, so regenerate the
+baseline on the machine the comparison runs on.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from injective_functions.bank import InjectiveBank  # noqa: E402
+from injective_functions.utils import indexer_requests, json_codec  # noqa: E402
+from injective_functions.utils.amounts import AmountCodec  # noqa: E402
+from injective_functions.utils.function_helper import FunctionExecutor  # noqa: E402
+from injective_functions.utils.helpers import (  # noqa: E402
+    base64convert,
+    detailed_exception_info,
+    validate_market_id,
+)
+from injective_functions.utils.indexer_requests import (  # noqa: E402
+    extract_market_info,
+    normalize_ticker,
+)
+
+MARKET_ID = "0x4ca0f92fc28be0c9761326016b5a1a2177dd6375558365116b5bdda9abc229ce"
+ORDER_HASH_BASE64 = "TKD5L8KL4Ml2EyYBa1oaIXfdY3VVg2URa1vdqavCKc4="
+# denoms held by the accounts of the balance benchmarks
+BALANCE_DENOMS = 50
+LARGE_ACCOUNT_DENOMS = 5000
+# price levels per side of the orderbook encoding benchmarks
+ORDERBOOK_LEVELS = 2000
+
+
+def _exception() -> Exception:
+    try:
+        try:
+            {}["market_id"]
+        except KeyError as e:
+            raise ValueError("Invalid base currency format: X") from e
+    except ValueError as e:
+        return e
+
+
+class _Address:
+    def to_acc_bech32(self) -> str:
+        return "inj1qy09gsfx3gxqjahumq97elwxqf7qu5xrwvtzm7"
+
+
+class _Indexer:
+    def __init__(self, balances: List[Dict]) -> None:
+        self.balances = balances
+
+    async def fetch_bank_balances(self, address: str) -> Dict:
+        return {"balances": self.balances}
+
+
+class _ChainClient:
+    network_type = "mainnet"
+
+    def __init__(self, balances: List[Dict]) -> None:
+        self.address = _Address()
+        self.client = _Indexer(balances)
+
+
+class _Exchange:
+    def __init__(self) -> None:
+        self.chain_client = _ChainClient([])
+
+    async def get_mid_price_and_tob_derivatives_market(self, market_id: str) -> Dict:
+        return {"success": True, "result": {"midPrice": "65000.5"}}
+
+
+def _balances(count: int) -> List[Dict]:
+    return [
+        {
+            "denom": f"factory/inj1bench/token{index}",
+            "amount": str(123456789012345678 * index),
+        }
+        for index in range(count)
+    ]
+
+
+def _orderbook(levels: int) -> Dict:
+    return {
+        "success": True,
+        "result": {
+            "buysPriceLevel": [
+                {"p": f"{65000 - index}000000000000000000", "q": "1.500000000000000000"}
+                for index in range(levels)
+            ],
+            "sellsPriceLevel": [
+                {"p": f"{65001 + index}000000000000000000", "q": "2.000000000000000000"}
+                for index in range(levels)
+            ],
+        },
+    }
+
+
+def _registry(count: int) -> Dict[str, int]:
+    decimals = {
+        f"factory/inj1bench/token{index}": (6, 8, 18)[index % 3]
+        for index in range(count)
+    }
+    # warm registry, as after the first request of a worker
+    indexer_requests._metadata_cache[("denoms", True)] = (time.monotonic(), decimals)
+    return decimals
+
+
+def benchmarks() -> Dict[str, Callable]:
+    """Benchmark name -> callable, coroutine functions run on one event loop"""
+    exception = _exception()
+    codec = AmountCodec(_registry(LARGE_ACCOUNT_DENOMS))
+    large_balances = _balances(LARGE_ACCOUNT_DENOMS)
+    bank = InjectiveBank(_ChainClient(_balances(BALANCE_DENOMS)))
+    large_bank = InjectiveBank(_ChainClient(large_balances))
+    orderbook = _orderbook(ORDERBOOK_LEVELS)
+    clients = {"exchange": _Exchange()}
+    arguments = {"market_id": MARKET_ID}
+
+    async def dispatch():
+        return await FunctionExecutor.execute_function(
+            clients, "get_mid_price_and_tob_derivatives_market", arguments
+        )
+
+    return {
+        "extract_market_info[concatenated]": lambda: extract_market_info("btcusdt"),
+        "extract_market_info[perp]": lambda: extract_market_info("btc-perp"),
+        "extract_market_info[slash]": lambda: extract_market_info("eth/usdt"),
+        "normalize_ticker[perp]": lambda: normalize_ticker("BTC/USDT PERP"),
+        "validate_market_id[hex]": lambda: validate_market_id(MARKET_ID),
+        "validate_market_id[ticker]": lambda: validate_market_id("btc-perp"),
+        "base64convert[hex]": lambda: base64convert(MARKET_ID[2:]),
+        "base64convert[base64]": lambda: base64convert(ORDER_HASH_BASE64),
+        "detailed_exception_info": lambda: detailed_exception_info(exception),
+        f"query_balances[{BALANCE_DENOMS}_denoms]": bank.query_balances,
+        f"query_balances[{LARGE_ACCOUNT_DENOMS}_denoms]": large_bank.query_balances,
+        f"AmountCodec.humanize[{LARGE_ACCOUNT_DENOMS}_denoms]": lambda: codec.humanize(
+            large_balances
+        ),
+        "AmountCodec.to_chain[18_decimals]": lambda: codec.to_chain(
+            "1234.567890123456789", "factory/inj1bench/token2"
+        ),
+        "execute_function[dispatch]": dispatch,
+        # the json module as reference for the codec
+        f"json.dumps[orderbook_{ORDERBOOK_LEVELS}_levels]": (
+            lambda: json.dumps(orderbook)
+        ),
+        f"json_codec.dumps[orderbook_{ORDERBOOK_LEVELS}_levels]": (
+            lambda: json_codec.dumps(orderbook)
+        ),
+    }
+
+
+def _timer(function: Callable, loop: asyncio.AbstractEventLoop) -> Callable:
+    """Seconds taken by `loops` calls of function"""
+    if asyncio.iscoroutinefunction(function):
+
+        async def repeat(loops: int) -> float:
+            started = time.perf_counter()
+            for _ in range(loops):
+                await function()
+            return time.perf_counter() - started
+
+        return lambda loops: loop.run_until_complete(repeat(loops))
+
+    def run(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        return time.perf_counter() - started
+
+    return run
+
+
+def measure(
+    function: Callable,
+    loop: asyncio.AbstractEventLoop,
+    samples: int = 20,
+    min_time: float = 0.05,
+) -> Dict:
+    """Calibrate the calls per sample, then time samples of them"""
+    timer = _timer(function, loop)
+    loops = 1
+    while timer(loops) < min_time:
+        loops *= 2
+    # warm-up sample, discarded
+    timer(loops)
+    timings = [timer(loops) / loops * 1e9 for _ in range(samples)]
+    return {
+        "median_ns": statistics.median(timings),
+        "mean_ns": statistics.mean(timings),
+        "stdev_ns": statistics.stdev(timings) if samples > 1 else 0.0,
+        "loops": loops,
+        "samples": samples,
+    }
+
+
+def run(
+    names: Optional[List[str]] = None, samples: int = 20, min_time: float = 0.05
+) -> Dict[str, Dict]:
+    loop = asyncio.new_event_loop()
+    try:
+        results = {}
+        for name, function in benchmarks().items():
+            if names and not any(selected in name for selected in names):
+                continue
+            results[name] = measure(function, loop, samples, min_time)
+            print(f"{name:45s} {format_ns(results[name]['median_ns']):>10s}")
+        return results
+    finally:
+        loop.close()
+
+
+def format_ns(value: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f}{unit}"
+    return f"{value:.0f}ns"
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Print the change against the baseline, return the regressions"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline["benchmarks"].get(name)
+        if reference is None:
+            print(f"{name:45s} not in baseline")
+            continue
+        change = result["median_ns"] / reference["median_ns"] - 1
+        print(
+            f"{name:45s} {format_ns(reference['median_ns']):>10s} -> "
+            f"{format_ns(result['median_ns']):>10s} {change:+.1%}"
+        )
+        if change > max_regression:
+            regressions.append(f"{name} is {change:.1%} slower than the baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Helper microbenchmarks")
+    parser.add_argument("names", nargs="*", help="Only run benchmarks matching these")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument(
+        "--min-time", type=float, default=0.05, help="Seconds per sample"
+    )
+    parser.add_argument("--save", help="Store the results as a baseline in this file")
+    parser.add_argument("--compare", help="Baseline file to compare the results with")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown against the baseline, 0.25 = 25%%",
+    )
+    args = parser.parse_args()
+
+    results = run(args.names, args.samples, args.min_time)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "implementation": platform.python_implementation(),
+                    "machine": platform.machine(),
+                    "benchmarks": results,
+                },
+                file,
+                indent=2,
+            )
+            file.write("\n")
+    regressions = []
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.max_regression)
+    for regression in regressions:
+        print(f"FAILED: {regression}")
+    sys.exit(1 if regressions else 0)
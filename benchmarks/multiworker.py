@@ -0,0 +1,179 @@
+"""
+Throughput of agent_server for an increasing number of workers.
+
+Every run starts `agent_server.py --workers N` against the fake OpenAI
+server in benchmarks/fake_openai.py, warms the agent up in each worker and
+then sends --requests /chat turns from --concurrency clients spread over
+--sessions sessions. The agent is the first one of agents_config.yaml, its
+clients are created once per worker against the configured network before
+the timed phase.
+
+    python benchmarks/multiworker.py --workers 1 2 4 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+import httpx
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_openai import FakeOpenAI  # noqa: E402
+from injective_functions.utils.metrics import percentile  # noqa: E402
+
+
+def load_agent(path: str) -> Dict:
+    with open(path) as file:
+        agents = yaml.safe_load(file)
+    agent_id, agent = next(iter(agents.items()))
+    return {
+        "agent_id": agent_id,
+        "agent_key": agent["private_key"],
+        "environment": agent.get("network", "testnet"),
+    }
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ping")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("agent_server did not become ready")
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    agent: Dict,
+    requests: int,
+    concurrency: int,
+    sessions: int,
+) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def user():
+        nonlocal errors
+        for index in counter:
+            payload = dict(
+                agent,
+                message="What can you help me with on Injective?",
+                session_id=f"bench-{index % sessions}",
+            )
+            start = time.perf_counter()
+            response = await client.post("/chat", json=payload)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200 or "error" in response.json():
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def benchmark(args) -> List[Dict]:
+    fake = FakeOpenAI(latency=args.llm_latency, reply_tokens=args.reply_tokens)
+    fake_port = await fake.start()
+    agent = load_agent(args.agents)
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="benchmark",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{fake_port}/v1",
+        SESSION_STORE="memory",
+        # keep history growth from dominating long runs
+        HISTORY_MAX_TOKENS="2000",
+    )
+    results = []
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                os.path.join(ROOT, "agent_server.py"),
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(args.port),
+                "--workers",
+                str(workers),
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            # the router and its workers are stopped together
+            start_new_session=True,
+        )
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{args.port}", timeout=120, limits=limits
+            ) as client:
+                await wait_ready(client, args.startup_timeout)
+                # initializes the agent in every worker
+                await run_load(
+                    client, agent, args.sessions, args.concurrency, args.sessions
+                )
+                result = await run_load(
+                    client, agent, args.requests, args.concurrency, args.sessions
+                )
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait()
+        result["workers"] = workers
+        results.append(result)
+        print(
+            f"workers={workers:<3} throughput={result['throughput']:8.1f} req/s "
+            f"p50={result['p50_ms']:7.1f}ms p99={result['p99_ms']:7.1f}ms "
+            f"errors={result['errors']}"
+        )
+    await fake.stop()
+
+    base = results[0]["throughput"] / results[0]["workers"]
+    for result in results:
+        result["scaling_efficiency"] = result["throughput"] / (base * result["workers"])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="agent_server multi-worker scaling")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--sessions", type=int, default=256)
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--reply-tokens", type=int, default=20)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--agents", default=os.path.join(ROOT, "agents_config.yaml"))
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(args))
+    for result in results:
+        print(
+            f"workers={result['workers']:<3} "
+            f"efficiency={result['scaling_efficiency']:.2f}"
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
@@ -1,3 +1,4 @@
+import asyncio
 from decimal import Decimal
 from injective_functions.base import InjectiveBase
 from injective_functions.utils.helpers import get_bridge_fee, detailed_exception_info
@@ -52,7 +53,8 @@ class InjectiveAccounts(InjectiveBase):
 
     async def send_to_eth(self, denom: str, eth_dest: str, amount: str):
 
-        bridge_fee = get_bridge_fee()
+        # the fee lookup is a blocking HTTP request, keep it off the event loop
+        bridge_fee = await asyncio.to_thread(get_bridge_fee)
         # prepare tx msg
         msg = self.chain_client.composer.MsgSendToEth(
             sender=self.chain_client.address.to_acc_bech32(),
@@ -16,7 +16,6 @@ class InjectiveAuction(InjectiveBase):
         super().__init__(chain_client)
 
     async def send_bid_auction(self, round: int, amount: str) -> Dict:
-        await self.chain_client.init_client()
         msg = self.chain_client.composer.MsgBid(
             sender=self.chain_client.address.to_acc_bech32(),
             round=round,
@@ -1,7 +1,8 @@
 from decimal import Decimal
 from injective_functions.base import InjectiveBase
 from typing import Dict, List
-from injective_functions.utils.indexer_requests import fetch_decimal_denoms
+from pyinjective.proto.cosmos.bank.v1beta1 import tx_pb2 as bank_tx_pb
+from injective_functions.utils.amounts import fetch_amount_codec
 from injective_functions.utils.helpers import detailed_exception_info
 
 
@@ -14,31 +15,38 @@ class InjectiveBank(InjectiveBase):
         self, amount: Decimal, denom: str = None, to_address: str = None
     ) -> Dict:
 
-        msg = self.chain_client.composer.MsgSend(
-            from_address=self.chain_client.address.to_acc_bech32(),
-            to_address=str(to_address),
-            amount=float(amount),
-            denom=denom,
-        )
+        codec = await fetch_amount_codec(self.chain_client.network_type == "mainnet")
+        if denom in codec:
+            # exact chain amount, floats lose digits on 18 decimal tokens
+            coin = self.chain_client.composer.coin(
+                amount=codec.to_chain(amount, denom), denom=denom
+            )
+            msg = bank_tx_pb.MsgSend(
+                from_address=self.chain_client.address.to_acc_bech32(),
+                to_address=str(to_address),
+                amount=[coin],
+            )
+        else:
+            # denoms missing from the registry are scaled by the composer
+            msg = self.chain_client.composer.MsgSend(
+                from_address=self.chain_client.address.to_acc_bech32(),
+                to_address=str(to_address),
+                amount=Decimal(str(amount)),
+                denom=denom,
+            )
         return await self.chain_client.build_and_broadcast_tx(msg)
 
     async def query_balances(self, denom_list: List[str] = None) -> Dict:
         try:
 
-            denoms: Dict[str, int] = await fetch_decimal_denoms(
-                self.chain_client.network_type
+            codec = await fetch_amount_codec(
+                self.chain_client.network_type == "mainnet"
             )
             bank_balances = await self.chain_client.client.fetch_bank_balances(
                 address=self.chain_client.address.to_acc_bech32()
             )
-            bank_balances = bank_balances["balances"]
             # hash the bank balances as a kv pair
-            human_readable_balances = {}
-            for token in bank_balances:
-                if token["denom"] in denoms:
-                    human_readable_balances[token["denom"]] = str(
-                        int(token["amount"]) / 10 ** int(denoms[token["denom"]])
-                    )
+            human_readable_balances = codec.humanize(bank_balances["balances"])
             # check if denom is an arg fron the openai func calling
             filtered_balances = dict()
             if denom_list != None:
@@ -58,21 +66,14 @@ class InjectiveBank(InjectiveBase):
 
     async def query_spendable_balances(self, denom_list: List[str] = None) -> Dict:
         try:
-            denoms: Dict[str, int] = await fetch_decimal_denoms(
-                self.chain_client.network_type
+            codec = await fetch_amount_codec(
+                self.chain_client.network_type == "mainnet"
             )
             bank_balances = await self.chain_client.client.fetch_spendable_balances(
                 address=self.chain_client.address.to_acc_bech32()
             )
-            bank_balances = bank_balances["balances"]
             # hash the bank balances as a kv pair
-            human_readable_balances = {
-                token["denom"]: str(
-                    int(token["amount"]) / 10 ** int(denoms[token["denom"]])
-                )
-                for token in bank_balances
-                if token["denom"] in denoms
-            }
+            human_readable_balances = codec.humanize(bank_balances["balances"])
 
             # check if denom is an arg fron the openai func calling
             filtered_balances = dict()
@@ -95,18 +96,11 @@ class InjectiveBank(InjectiveBase):
     async def query_total_supply(self, denom_list: List[str] = None) -> Dict:
         try:
             # we request this over and over again because new tokens can be added
-            denoms: Dict[str, int] = await fetch_decimal_denoms(
-                self.chain_client.network
+            codec = await fetch_amount_codec(
+                self.chain_client.network_type == "mainnet"
             )
             total_supply = await self.chain_client.client.fetch_total_supply()
-            total_supply = total_supply["supply"]
-            human_readable_supply = {
-                token["denom"]: str(
-                    int(token["amount"]) / 10 ** int(denoms[token["denom"]])
-                )
-                for token in total_supply
-                if token["denom"] in denoms
-            }
+            human_readable_supply = codec.humanize(total_supply["supply"])
 
             # check if denom is an arg fron the openai func calling
             filtered_supply = dict()
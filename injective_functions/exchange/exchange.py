@@ -1,6 +1,11 @@
 from decimal import Decimal
 from injective_functions.base import InjectiveBase
-from injective_functions.utils.indexer_requests import fetch_decimal_denoms
+from injective_functions.exchange.pricing import (
+    OrderbookSnapshot,
+    market_cache,
+    orderbook_cache,
+)
+from injective_functions.utils.amounts import fetch_amount_codec
 from injective_functions.utils.helpers import (
     impute_market_id,
     impute_market_ids,
@@ -27,22 +32,22 @@ class InjectiveExchange(InjectiveBase):
                 )
             )
             deposits = deposits_response["deposits"]
-            denom_decimals = await fetch_decimal_denoms(self.chain_client.network_type)
+            codec = await fetch_amount_codec(
+                self.chain_client.network_type == "mainnet"
+            )
             human_readable_deposits = {}
             # checks if the denoms are specified
             if denoms:
                 # iterate through the specified denoms
                 for denom in denoms:
                     # Corner case 1: denom might not be in deposits found in chain data a case when gpt function calling parses wrong args
-                    if denom in deposits and denom in denom_decimals:
+                    if denom in deposits and denom in codec:
                         human_readable_deposits[denom] = {
-                            "available_balance": str(
-                                int(deposits[denom]["availableBalance"])
-                                / 10 ** int(denom_decimals[denom])
+                            "available_balance": codec.to_human(
+                                deposits[denom]["availableBalance"], denom
                             ),
-                            "total_balance": str(
-                                int(deposits[denom]["totalBalance"])
-                                / 10 ** int(denom_decimals[denom])
+                            "total_balance": codec.to_human(
+                                deposits[denom]["totalBalance"], denom
                             ),
                         }
                     else:
@@ -53,23 +58,24 @@ class InjectiveExchange(InjectiveBase):
             # Otherwise we iterate through all the denoms
             else:
                 for denom, deposit in deposits.items():
-                    if denom in denom_decimals:
-                        human_readable_deposits[denom] = {}
-                        human_readable_deposits[denom]["available_balance"] = str(
-                            int(deposit["availableBalance"])
-                            / 10 ** denom_decimals[denom]
-                        )
-
-                        human_readable_deposits[denom]["total_balance"] = str(
-                            int(deposit["totalBalance"]) / 10 ** denom_decimals[denom]
-                        )
+                    if denom in codec:
+                        human_readable_deposits[denom] = {
+                            "available_balance": codec.to_human(
+                                deposit["availableBalance"], denom
+                            ),
+                            "total_balance": codec.to_human(
+                                deposit["totalBalance"], denom
+                            ),
+                        }
             return {"success": True, "result": human_readable_deposits}
         except Exception as e:
             return {"success": False, "error": detailed_exception_info(e)}
 
     async def get_aggregate_market_volumes(self, market_ids=List[str]) -> Dict:
         try:
-            market_ids = await impute_market_ids(market_ids)
+            market_ids = await impute_market_ids(
+                market_ids, self.chain_client.network_type
+            )
             res = await self.chain_client.client.fetch_aggregate_market_volumes(
                 market_ids=market_ids
             )
@@ -81,7 +87,9 @@ class InjectiveExchange(InjectiveBase):
         self, market_ids: List[str], addresses: List[str]
     ) -> Dict:
         try:
-            market_ids = await impute_market_ids(market_ids)
+            market_ids = await impute_market_ids(
+                market_ids, self.chain_client.network_type
+            )
             res = await self.chain_client.client.fetch_aggregate_volumes(
                 accounts=addresses,
                 market_ids=market_ids,
@@ -92,7 +100,9 @@ class InjectiveExchange(InjectiveBase):
 
     async def get_subaccount_orders(self, subaccount_idx: int, market_id: str) -> Dict:
         try:
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
             orders = await self.chain_client.client.fetch_chain_subaccount_orders(
@@ -106,7 +116,9 @@ class InjectiveExchange(InjectiveBase):
     async def get_historical_orders(self, market_id: str) -> Dict:
 
         try:
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             res = await self.chain_client.client.fetch_historical_trade_records(
                 market_id=market_id
@@ -117,7 +129,9 @@ class InjectiveExchange(InjectiveBase):
 
     async def get_mid_price_and_tob_derivatives_market(self, market_id: str) -> Dict:
         try:
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             res = await self.chain_client.client.fetch_derivative_mid_price_and_tob(
                 market_id=market_id,
@@ -128,7 +142,9 @@ class InjectiveExchange(InjectiveBase):
 
     async def get_mid_price_and_tob_spot_market(self, market_id: str) -> Dict:
         try:
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             res = await self.chain_client.client.fetch_spot_mid_price_and_tob(
                 market_id=market_id,
@@ -141,24 +157,50 @@ class InjectiveExchange(InjectiveBase):
         self, market_id: str, limit: int = None
     ) -> Dict:
         try:
-            market_id = await impute_market_id(market_id)
-            pagination = PaginationOption(limit)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
+            pagination = PaginationOption(limit=limit)
             orderbook = await self.chain_client.client.fetch_chain_derivative_orderbook(
                 market_id=market_id,
                 pagination=pagination,
             )
+            # keep the depth around so a following market order can be priced locally
+            market = await market_cache.get(
+                self.chain_client.client,
+                self.chain_client.network_type,
+                market_id,
+                is_derivative=True,
+            )
+            orderbook_cache.put(
+                self.chain_client.network_type,
+                OrderbookSnapshot.from_chain(market_id, orderbook, market),
+            )
             return {"success": True, "result": orderbook}
         except Exception as e:
             return {"success": False, "error": detailed_exception_info(e)}
 
     async def get_spot_orderbook(self, market_id: str, limit: int = None) -> Dict:
         try:
-            market_id = await impute_market_id(market_id)
-            pagination = PaginationOption(limit)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
+            pagination = PaginationOption(limit=limit)
             orderbook = await self.chain_client.client.fetch_chain_spot_orderbook(
                 market_id=market_id,
                 pagination=pagination,
             )
+            # keep the depth around so a following market order can be priced locally
+            market = await market_cache.get(
+                self.chain_client.client,
+                self.chain_client.network_type,
+                market_id,
+                is_derivative=False,
+            )
+            orderbook_cache.put(
+                self.chain_client.network_type,
+                OrderbookSnapshot.from_chain(market_id, orderbook, market),
+            )
             return {"success": True, "result": orderbook}
         except Exception as e:
             return {"success": False, "error": detailed_exception_info(e)}
@@ -166,7 +208,9 @@ class InjectiveExchange(InjectiveBase):
     async def trader_derivative_orders(self, market_id: str, subaccount_idx: int):
         try:
 
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
             orders = (
@@ -181,7 +225,9 @@ class InjectiveExchange(InjectiveBase):
 
     async def trader_spot_orders(self, market_id: str, subaccount_idx: int):
         try:
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
             orders = await self.chain_client.client.fetch_chain_trader_spot_orders(
@@ -196,7 +242,9 @@ class InjectiveExchange(InjectiveBase):
         self, market_id: str, subaccount_idx: int, order_hashes: List[str]
     ) -> Dict:
         try:
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
             orders = (
@@ -214,7 +262,9 @@ class InjectiveExchange(InjectiveBase):
         self, market_id: str, subaccount_idx: int, order_hashes: List[str]
     ) -> Dict:
         try:
-            market_id = await impute_market_id(market_id)
+            market_id = await impute_market_id(
+                market_id, self.chain_client.network_type
+            )
 
             subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
             orders = await self.chain_client.client.fetch_chain_spot_orders_by_hashes(
@@ -228,7 +278,9 @@ class InjectiveExchange(InjectiveBase):
 
     async def get_subaccount_positions_in_markets(self, market_ids: List[str]) -> Dict:
         try:
-            market_ids = await impute_market_ids(market_ids)
+            market_ids = await impute_market_ids(
+                market_ids, self.chain_client.network_type
+            )
 
             subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_id)
             positions = await self.chain_client.client.fetch_chain_subaccount_positions(
@@ -257,7 +309,6 @@ class InjectiveExchange(InjectiveBase):
         min_notional: str,
     ) -> Dict:
         try:
-            await self.chain_client.init_client()
             msg = self.chain_client.composer.msg_instant_spot_market_launch(
                 sender=self.chain_client.address.to_acc_bech32(),
                 ticker=ticker,
@@ -290,7 +341,6 @@ class InjectiveExchange(InjectiveBase):
     ) -> Dict:
         try:
 
-            await self.chain_client.init_client()
             msg = self.chain_client.composer.msg_instant_perpetual_market_launch(
                 sender=self.chain_client.address.to_acc_bech32(),
                 ticker=ticker,
@@ -0,0 +1,201 @@
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+"""Depth-aware pricing for market orders using cached orderbook snapshots"""
+
+# Default slippage tolerance applied on top of the worst consumed level (1%)
+DEFAULT_SLIPPAGE = Decimal("0.01")
+# Snapshots younger than this are reused without another orderbook RPC
+DEFAULT_BOOK_MAX_AGE = 2.0
+# Number of levels requested per side when the cache has to be refreshed
+DEFAULT_BOOK_DEPTH = 50
+
+PriceLevel = Tuple[Decimal, Decimal]
+
+
+class InsufficientLiquidityError(ValueError):
+    """The book side holds less than the order quantity"""
+
+
+def _identity(value: Decimal) -> Decimal:
+    return value
+
+
+class OrderbookSnapshot:
+    """Human-readable orderbook levels for a single market at a point in time"""
+
+    def __init__(
+        self,
+        market_id: str,
+        bids: List[PriceLevel],
+        asks: List[PriceLevel],
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        self.market_id = market_id
+        # best bid first, best ask first
+        self.bids = sorted(bids, key=lambda level: level[0], reverse=True)
+        self.asks = sorted(asks, key=lambda level: level[0])
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+
+    @classmethod
+    def from_chain(cls, market_id: str, orderbook: Dict, market=None):
+        """
+        Build a snapshot from a chain orderbook response.
+
+        Args:
+            market_id (str): Market the orderbook belongs to
+            orderbook (Dict): Response of fetch_chain_spot_orderbook / fetch_chain_derivative_orderbook
+            market: Optional pyinjective market used to convert chain values to human format
+
+        Returns:
+            OrderbookSnapshot: Snapshot with human-readable price levels
+        """
+        to_price = getattr(market, "price_from_extended_chain_format", _identity)
+        to_quantity = getattr(market, "quantity_from_extended_chain_format", _identity)
+
+        def convert(levels):
+            return [
+                (to_price(Decimal(level["p"])), to_quantity(Decimal(level["q"])))
+                for level in levels or []
+            ]
+
+        return cls(
+            market_id=market_id,
+            bids=convert(orderbook.get("buysPriceLevel")),
+            asks=convert(orderbook.get("sellsPriceLevel")),
+        )
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    @property
+    def mid_price(self) -> Optional[Decimal]:
+        if not self.bids or not self.asks:
+            return None
+        return (self.bids[0][0] + self.asks[0][0]) / 2
+
+
+class MarketCache:
+    """
+    Market objects per network, they convert chain prices and quantities.
+
+    all_spot_markets / all_derivative_markets copy every market of the
+    network, so the map is kept and only asked again for an unknown market.
+    """
+
+    def __init__(self) -> None:
+        self._markets: Dict[Tuple[str, bool], Dict[str, object]] = {}
+
+    async def get(self, client, network: str, market_id: str, is_derivative: bool):
+        """Return the pyinjective market of market_id, None if the chain has none"""
+        key = (network, is_derivative)
+        markets = self._markets.get(key)
+        if markets is None or market_id not in markets:
+            markets = await (
+                client.all_derivative_markets()
+                if is_derivative
+                else client.all_spot_markets()
+            )
+            self._markets[key] = markets
+        return markets.get(market_id)
+
+
+class OrderbookCache:
+    """Keeps the latest orderbook snapshot per (network, market_id)"""
+
+    def __init__(self) -> None:
+        self._snapshots: Dict[Tuple[str, str], OrderbookSnapshot] = {}
+
+    def get(
+        self, network: str, market_id: str, max_age: float = DEFAULT_BOOK_MAX_AGE
+    ) -> Optional[OrderbookSnapshot]:
+        """Return the cached snapshot if it is younger than max_age seconds"""
+        snapshot = self._snapshots.get((network, market_id))
+        if snapshot is None or snapshot.age > max_age:
+            return None
+        return snapshot
+
+    def put(self, network: str, snapshot: OrderbookSnapshot) -> None:
+        self._snapshots[(network, snapshot.market_id)] = snapshot
+
+    def invalidate(self, network: str, market_id: str) -> None:
+        self._snapshots.pop((network, market_id), None)
+
+
+def estimate_market_fill(
+    snapshot: OrderbookSnapshot,
+    side: str,
+    quantity: Decimal,
+    slippage: Decimal = DEFAULT_SLIPPAGE,
+) -> Dict:
+    """
+    Walk the opposite side of the book to estimate the fill of a market order.
+
+    Args:
+        snapshot (OrderbookSnapshot): Orderbook to walk
+        side (str): "BUY" consumes asks, "SELL" consumes bids
+        quantity (Decimal): Quantity to fill
+        slippage (Decimal): Fractional tolerance applied on top of the worst consumed level
+
+    Returns:
+        Dict: Expected average fill, worst consumed level and the resulting limit price
+    """
+    side = side.upper()
+    if side not in ("BUY", "SELL"):
+        raise ValueError(f"Invalid order side: {side}")
+    if quantity <= 0:
+        raise ValueError("Order quantity must be positive")
+    if slippage < 0:
+        raise ValueError("Slippage tolerance cannot be negative")
+
+    levels = snapshot.asks if side == "BUY" else snapshot.bids
+    remaining = quantity
+    notional = Decimal(0)
+    worst_price = None
+    levels_consumed = 0
+    for price, size in levels:
+        if remaining <= 0:
+            break
+        take = min(size, remaining)
+        notional += take * price
+        remaining -= take
+        worst_price = price
+        levels_consumed += 1
+
+    filled = quantity - remaining
+    if worst_price is None or remaining > 0:
+        raise InsufficientLiquidityError(
+            f"Insufficient liquidity in market {snapshot.market_id}: "
+            f"{filled} of {quantity} available on the {'ask' if side == 'BUY' else 'bid'} side"
+        )
+
+    if side == "BUY":
+        limit_price = worst_price * (1 + slippage)
+    else:
+        limit_price = worst_price * (1 - slippage)
+
+    return {
+        "side": side,
+        "quantity": quantity,
+        "average_price": notional / filled,
+        "worst_price": worst_price,
+        "limit_price": limit_price,
+        "mid_price": snapshot.mid_price,
+        "levels_consumed": levels_consumed,
+        "slippage": slippage,
+        "book_age": snapshot.age,
+    }
+
+
+def format_fill_estimate(estimate: Dict) -> Dict:
+    """Render a fill estimate with string values so it can be JSON encoded"""
+    return {
+        key: str(value) if isinstance(value, Decimal) else value
+        for key, value in estimate.items()
+    }
+
+
+orderbook_cache = OrderbookCache()
+market_cache = MarketCache()
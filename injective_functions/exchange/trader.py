@@ -1,19 +1,39 @@
 import uuid
 from decimal import Decimal
+from pyinjective.client.model.pagination import PaginationOption
 from injective_functions.base import InjectiveBase
+from injective_functions.exchange.pricing import (
+    DEFAULT_BOOK_DEPTH,
+    DEFAULT_SLIPPAGE,
+    InsufficientLiquidityError,
+    OrderbookSnapshot,
+    estimate_market_fill,
+    format_fill_estimate,
+    market_cache,
+    orderbook_cache,
+)
 from injective_functions.utils.helpers import impute_market_id, base64convert
+from typing import Dict, List, Optional, Tuple
 
 # TODO: serve endpoints of trader functions via an api
 # to isolate functions as much as possible
 # app = Flask(__name__)
 
+# Order placing functions that can be combined by place_orders_batch
+ORDER_MSG_BUILDERS = {
+    "place_derivative_limit_order": "_derivative_limit_order_msg",
+    "place_derivative_market_order": "_derivative_market_order_msg",
+    "place_spot_limit_order": "_spot_limit_order_msg",
+    "place_spot_market_order": "_spot_market_order_msg",
+}
+
 
 class InjectiveTrading(InjectiveBase):
     def __init__(self, chain_client) -> None:
         # Initializes the network and the composer
         super().__init__(chain_client)
 
-    async def place_derivative_limit_order(
+    async def _derivative_limit_order_msg(
         self,
         price: float,
         quantity: float,
@@ -22,12 +42,11 @@ class InjectiveTrading(InjectiveBase):
         subaccount_idx: int,
         leverage: str,
     ):
-        """Place a limit order"""
-        market_id = await impute_market_id(market_id)
+        market_id = await impute_market_id(market_id, self.chain_client.network_type)
         self.subaccount_id = self.chain_client.address.get_subaccount_id(
             index=subaccount_idx
         )
-        msg = self.chain_client.composer.msg_create_derivative_limit_order(
+        return self.chain_client.composer.msg_create_derivative_limit_order(
             sender=self.chain_client.address.to_acc_bech32(),
             fee_recipient=self.chain_client.address.to_acc_bech32(),
             market_id=market_id,
@@ -44,26 +63,80 @@ class InjectiveTrading(InjectiveBase):
             cid=str(uuid.uuid4()),
         )
 
+    async def place_derivative_limit_order(
+        self,
+        price: float,
+        quantity: float,
+        side: str,
+        market_id: str,
+        subaccount_idx: int,
+        leverage: str,
+    ):
+        """Place a limit order"""
+        msg = await self._derivative_limit_order_msg(
+            price, quantity, side, market_id, subaccount_idx, leverage
+        )
         return await self.chain_client.build_and_broadcast_tx(msg)
 
-    async def place_derivative_market_order(
+    async def _load_orderbook(
+        self, market_id: str, is_derivative: bool, refresh: bool = False
+    ) -> OrderbookSnapshot:
+        """Return a fresh orderbook snapshot, hitting the chain only if the cache is stale"""
+        network = self.chain_client.network_type
+        snapshot = None if refresh else orderbook_cache.get(network, market_id)
+        if snapshot is not None:
+            return snapshot
+
+        client = self.chain_client.client
+        pagination = PaginationOption(limit=DEFAULT_BOOK_DEPTH)
+        if is_derivative:
+            orderbook = await client.fetch_chain_derivative_orderbook(
+                market_id=market_id, pagination=pagination
+            )
+        else:
+            orderbook = await client.fetch_chain_spot_orderbook(
+                market_id=market_id, pagination=pagination
+            )
+        market = await market_cache.get(client, network, market_id, is_derivative)
+        snapshot = OrderbookSnapshot.from_chain(market_id, orderbook, market)
+        orderbook_cache.put(network, snapshot)
+        return snapshot
+
+    async def _quote_market_order(
+        self,
+        market_id: str,
+        quantity: float,
+        side: str,
+        slippage: str,
+        is_derivative: bool,
+    ) -> dict:
+        quantity = Decimal(str(quantity))
+        slippage = DEFAULT_SLIPPAGE if slippage is None else Decimal(str(slippage))
+        snapshot = await self._load_orderbook(market_id, is_derivative)
+        try:
+            return estimate_market_fill(snapshot, side, quantity, slippage)
+        except InsufficientLiquidityError:
+            # a cached book may be shallower than the order, retry on a fresh fetch
+            snapshot = await self._load_orderbook(
+                market_id, is_derivative, refresh=True
+            )
+            return estimate_market_fill(snapshot, side, quantity, slippage)
+
+    async def _derivative_market_order_msg(
         self,
         quantity: float,
         side: str,
         market_id: str,
         subaccount_idx: int,
         leverage: str,
+        slippage: str = None,
     ):
-        """Place a market order"""
-
-        market_id = await impute_market_id(market_id)
+        market_id = await impute_market_id(market_id, self.chain_client.network_type)
         self.subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
-        # For market orders, we'll use the current price as an estimate
-        # this gets bbo and mid from composer.
-        estimated_price = (
-            await self.chain_client.client.fetch_derivative_mid_price_and_tob(
-                market_id=market_id
-            )["midPrice"]
+        # The worst price is derived from the depth needed to fill the quantity
+        # plus the slippage tolerance, not from the mid price.
+        quote = await self._quote_market_order(
+            market_id, quantity, side, slippage, is_derivative=True
         )
 
         msg = self.chain_client.composer.msg_create_derivative_market_order(
@@ -71,24 +144,40 @@ class InjectiveTrading(InjectiveBase):
             fee_recipient=self.chain_client.address.to_acc_bech32(),
             market_id=market_id,
             subaccount_id=self.subaccount_id,
-            price=Decimal(estimated_price),
+            price=quote["limit_price"],
             quantity=Decimal(str(quantity)),
             margin=self.chain_client.composer.calculate_margin(
                 quantity=Decimal(str(quantity)),
-                price=Decimal(estimated_price),
+                price=quote["limit_price"],
                 leverage=Decimal(leverage),
                 is_reduce_only=False,
             ),
             order_type=side,
             cid=str(uuid.uuid4()),
         )
+        return msg, quote
 
-        return await self.chain_client.build_and_broadcast_tx(msg)
+    async def place_derivative_market_order(
+        self,
+        quantity: float,
+        side: str,
+        market_id: str,
+        subaccount_idx: int,
+        leverage: str,
+        slippage: str = None,
+    ):
+        """Place a market order"""
+        msg, quote = await self._derivative_market_order_msg(
+            quantity, side, market_id, subaccount_idx, leverage, slippage
+        )
+        res = await self.chain_client.build_and_broadcast_tx(msg)
+        res["pricing"] = format_fill_estimate(quote)
+        return res
 
     async def cancel_derivative_limit_order(
         self, market_id: str, subaccount_idx: int, order_hash: str
     ):
-        market_id = await impute_market_id(market_id)
+        market_id = await impute_market_id(market_id, self.chain_client.network_type)
         converted_order_hash = base64convert(order_hash)
         subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
         msg = self.chain_client.composer.msg_cancel_derivative_order(
@@ -99,7 +188,7 @@ class InjectiveTrading(InjectiveBase):
         )
         return await self.chain_client.build_and_broadcast_tx(msg)
 
-    async def place_spot_limit_order(
+    async def _spot_limit_order_msg(
         self,
         price: float,
         quantity: float,
@@ -107,13 +196,11 @@ class InjectiveTrading(InjectiveBase):
         market_id: str,
         subaccount_idx: int,
     ):
-        """Place a limit order"""
-
-        market_id = await impute_market_id(market_id)
+        market_id = await impute_market_id(market_id, self.chain_client.network_type)
         self.subaccount_id = self.chain_client.address.get_subaccount_id(
             index=subaccount_idx
         )
-        msg = self.chain_client.composer.msg_create_spot_limit_order(
+        return self.chain_client.composer.msg_create_spot_limit_order(
             sender=self.chain_client.address.to_acc_bech32(),
             fee_recipient=self.chain_client.address.to_acc_bech32(),
             market_id=market_id,
@@ -124,21 +211,34 @@ class InjectiveTrading(InjectiveBase):
             cid=str(uuid.uuid4()),
         )
 
+    async def place_spot_limit_order(
+        self,
+        price: float,
+        quantity: float,
+        side: str,
+        market_id: str,
+        subaccount_idx: int,
+    ):
+        """Place a limit order"""
+        msg = await self._spot_limit_order_msg(
+            price, quantity, side, market_id, subaccount_idx
+        )
         return await self.chain_client.build_and_broadcast_tx(msg)
 
-    async def place_spot_market_order(
-        self, quantity: float, side: str, market_id: str, subaccount_idx: int
+    async def _spot_market_order_msg(
+        self,
+        quantity: float,
+        side: str,
+        market_id: str,
+        subaccount_idx: int,
+        slippage: str = None,
     ):
-        """Place a market order"""
-
-        market_id = await impute_market_id(market_id)
+        market_id = await impute_market_id(market_id, self.chain_client.network_type)
         self.subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
-        # For market orders, we'll use the current price as an estimate
-        # this gets bbo and mid from composer.
-        estimated_price = (
-            await self.chain_client.client.fetch_derivative_mid_price_and_tob(
-                market_id=market_id
-            )["midPrice"]
+        # The worst price is derived from the depth needed to fill the quantity
+        # plus the slippage tolerance, not from the mid price.
+        quote = await self._quote_market_order(
+            market_id, quantity, side, slippage, is_derivative=False
         )
 
         msg = self.chain_client.composer.msg_create_spot_market_order(
@@ -146,19 +246,72 @@ class InjectiveTrading(InjectiveBase):
             fee_recipient=self.chain_client.address.to_acc_bech32(),
             market_id=market_id,
             subaccount_id=self.subaccount_id,
-            price=Decimal(estimated_price),
+            price=quote["limit_price"],
             quantity=Decimal(str(quantity)),
             order_type=side,
             cid=str(uuid.uuid4()),
         )
+        return msg, quote
 
-        return await self.chain_client.build_and_broadcast_tx(msg)
+    async def place_spot_market_order(
+        self,
+        quantity: float,
+        side: str,
+        market_id: str,
+        subaccount_idx: int,
+        slippage: str = None,
+    ):
+        """Place a market order"""
+        msg, quote = await self._spot_market_order_msg(
+            quantity, side, market_id, subaccount_idx, slippage
+        )
+        res = await self.chain_client.build_and_broadcast_tx(msg)
+        res["pricing"] = format_fill_estimate(quote)
+        return res
+
+    async def build_order_msg(self, order: Dict) -> Tuple[object, Optional[Dict]]:
+        """
+        Build the message of one order without broadcasting it.
+
+        Args:
+            order (Dict): Item of the form {"function": <place_* function name>, "arguments": {...}}
+
+        Returns:
+            Tuple: The message and the fill estimate of market orders, None for limit orders
+        """
+        builder = getattr(self, ORDER_MSG_BUILDERS[order["function"]])
+        built = await builder(**order["arguments"])
+        if isinstance(built, tuple):
+            msg, quote = built
+            return msg, format_fill_estimate(quote)
+        return built, None
+
+    async def broadcast_order_msgs(
+        self, built: List[Tuple[object, Optional[Dict]]]
+    ) -> Dict:
+        """Broadcast messages of build_order_msg in a single transaction"""
+        res = await self.chain_client.build_and_broadcast_tx(*[msg for msg, _ in built])
+        res["pricing"] = [pricing for _, pricing in built]
+        return res
+
+    async def place_orders_batch(self, orders: List[Dict]) -> Dict:
+        """
+        Place several orders in a single transaction.
+
+        Args:
+            orders (List[Dict]): Items of the form {"function": <place_* function name>, "arguments": {...}}
+
+        Returns:
+            Dict: Broadcast result of the combined transaction
+        """
+        built = [await self.build_order_msg(order) for order in orders]
+        return await self.broadcast_order_msgs(built)
 
     async def cancel_spot_limit_order(
         self, market_id: str, subaccount_idx: int, order_hash: str
     ):
         converted_order_hash = base64convert(order_hash)
-        market_id = await impute_market_id(market_id)
+        market_id = await impute_market_id(market_id, self.chain_client.network_type)
         subaccount_id = self.chain_client.address.get_subaccount_id(subaccount_idx)
         msg = self.chain_client.composer.msg_cancel_spot_order(
             sender=self.chain_client.address.to_acc_bech32(),
@@ -0,0 +1,112 @@
+import inspect
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Tuple
+from injective_functions.base import InjectiveBase
+from injective_functions.exchange.trader import ORDER_MSG_BUILDERS, InjectiveTrading
+from injective_functions.triggers.engine import DIRECTIONS, PriceTriggerEngine
+from injective_functions.utils.helpers import impute_market_id, detailed_exception_info
+
+
+"""This class exposes the conditional order engine to a single agent"""
+
+
+class InjectiveTriggers(InjectiveBase):
+    def __init__(self, chain_client, engine: PriceTriggerEngine, agent_id: str) -> None:
+        # The engine is shared by every agent of the server
+        super().__init__(chain_client)
+        self.engine = engine
+        self.agent_id = agent_id
+
+    async def set_price_trigger(
+        self,
+        market_id: str,
+        direction: str,
+        trigger_price: str,
+        order_function: str,
+        order_arguments: Dict,
+    ) -> Dict:
+        try:
+            if order_function not in ORDER_MSG_BUILDERS:
+                raise ValueError(
+                    f"Order function must be one of {sorted(ORDER_MSG_BUILDERS)}"
+                )
+            if direction not in DIRECTIONS:
+                raise ValueError(f"Direction must be one of {DIRECTIONS}")
+            try:
+                price = Decimal(str(trigger_price))
+            except InvalidOperation:
+                raise ValueError(f"Invalid trigger price: {trigger_price}")
+
+            watched = await impute_market_id(market_id, self.chain_client.network_type)
+            if watched is None:
+                raise ValueError(f"Unknown market: {market_id}")
+            arguments = dict(order_arguments)
+            order_market = arguments.get("market_id", watched)
+            arguments["market_id"] = await impute_market_id(
+                order_market, self.chain_client.network_type
+            )
+            if arguments["market_id"] is None:
+                raise ValueError(f"Unknown market: {order_market}")
+            # an order that cannot be built would only fail once the trigger fires
+            self._validate_order(order_function, arguments)
+            market_type, market = await self._find_market(watched)
+            order_market_type = (
+                market_type
+                if arguments["market_id"] == watched
+                else (await self._find_market(arguments["market_id"]))[0]
+            )
+            if not order_function.startswith(f"place_{order_market_type}_"):
+                raise ValueError(
+                    f"{order_function} cannot place orders on the "
+                    f"{order_market_type} market {arguments['market_id']}"
+                )
+            trigger = self.engine.add_trigger(
+                agent_id=self.agent_id,
+                network=self.chain_client.network_type,
+                market_id=watched,
+                market_type=market_type,
+                direction=direction,
+                trigger_price=price,
+                order={"function": order_function, "arguments": arguments},
+                market=market,
+            )
+            return {"success": True, "result": trigger.to_dict()}
+        except Exception as e:
+            return {"success": False, "error": detailed_exception_info(e)}
+
+    @staticmethod
+    def _validate_order(order_function: str, arguments: Dict) -> None:
+        """Check the arguments against the message builder the order fires with"""
+        builder = getattr(InjectiveTrading, ORDER_MSG_BUILDERS[order_function])
+        try:
+            inspect.signature(builder).bind(None, **arguments)
+        except TypeError as e:
+            raise ValueError(f"Invalid arguments for {order_function}: {str(e)}")
+        for name in ("price", "quantity", "leverage"):
+            if arguments.get(name) is None:
+                continue
+            try:
+                value = Decimal(str(arguments[name]))
+            except InvalidOperation:
+                value = None
+            if value is None or not value.is_finite() or value <= 0:
+                raise ValueError(f"Invalid {name}: {arguments[name]}")
+
+    async def _find_market(self, market_id: str) -> Tuple[str, object]:
+        """The type, derivative or spot, and the market object of market_id"""
+        client = self.chain_client.client
+        derivative_markets = await client.all_derivative_markets()
+        if market_id in derivative_markets:
+            return "derivative", derivative_markets[market_id]
+        spot_markets = await client.all_spot_markets()
+        if market_id in spot_markets:
+            return "spot", spot_markets[market_id]
+        raise ValueError(f"Unknown market: {market_id}")
+
+    async def list_price_triggers(self) -> Dict:
+        return {"success": True, "result": self.engine.list_triggers(self.agent_id)}
+
+    async def cancel_price_trigger(self, trigger_id: str) -> Dict:
+        if self.engine.cancel_trigger(self.agent_id, trigger_id):
+            return {"success": True, "result": {"trigger_id": trigger_id}}
+        return {"success": False, "error": f"No active trigger {trigger_id}"}
@@ -0,0 +1,442 @@
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from collections import deque
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+from pyinjective.async_client import AsyncClient
+from pyinjective.core.network import Network
+from injective_functions.utils.initializers import ChainInteractor
+from injective_functions.utils.metrics import percentile
+
+"""Price-triggered conditional orders evaluated against a shared mid-price feed"""
+
+DIRECTIONS = ("above", "below")
+
+
+class PriceTrigger:
+    """A single condition and the order it fires"""
+
+    def __init__(
+        self,
+        agent_id: str,
+        network: str,
+        market_id: str,
+        market_type: str,
+        direction: str,
+        trigger_price: Decimal,
+        order: Dict,
+    ) -> None:
+        self.trigger_id = uuid.uuid4().hex
+        self.agent_id = agent_id
+        self.network = network
+        self.market_id = market_id
+        self.market_type = market_type
+        self.direction = direction
+        self.trigger_price = trigger_price
+        self.order = order
+        self.created_at = time.time()
+        self.status = "active"
+        # orders that could not be built, the trigger is re-armed after each
+        self.attempts = 0
+        self.fired_at = None
+        self.fired_price = None
+        self.result = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "trigger_id": self.trigger_id,
+            "market_id": self.market_id,
+            "direction": self.direction,
+            "trigger_price": str(self.trigger_price),
+            "order": self.order,
+            "status": self.status,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "fired_at": self.fired_at,
+            "fired_price": None if self.fired_price is None else str(self.fired_price),
+            "result": self.result,
+        }
+
+
+class MarketTriggerIndex:
+    """
+    Price heaps of the active triggers of one market.
+
+    "above" triggers sit in a min-heap of their price and "below" triggers
+    in a max-heap, so the next trigger to cross is always at the top. Adding
+    and firing a trigger cost O(log n). A cancelled trigger is only dropped
+    from the lookup and its heap entry is skipped when it reaches the top;
+    the heaps are rebuilt once stale entries outnumber the live ones.
+    """
+
+    def __init__(self) -> None:
+        # (trigger_price, seq, trigger_id), the price is negated in "below"
+        self.above: List[Tuple[Decimal, int, str]] = []
+        self.below: List[Tuple[Decimal, int, str]] = []
+        self._keys: Dict[str, Tuple[str, Tuple[Decimal, int, str]]] = {}
+        self._seq = itertools.count()
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, trigger: PriceTrigger) -> None:
+        price = trigger.trigger_price
+        key = (
+            price if trigger.direction == "above" else -price,
+            next(self._seq),
+            trigger.trigger_id,
+        )
+        heapq.heappush(getattr(self, trigger.direction), key)
+        self._keys[trigger.trigger_id] = (trigger.direction, key)
+
+    def remove(self, trigger_id: str) -> bool:
+        if self._keys.pop(trigger_id, None) is None:
+            return False
+        self._stale += 1
+        if self._stale > len(self._keys):
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        for direction in DIRECTIONS:
+            heap = [
+                key
+                for key in getattr(self, direction)
+                if self._keys.get(key[2], (None, None))[1] == key
+            ]
+            heapq.heapify(heap)
+            setattr(self, direction, heap)
+        self._stale = 0
+
+    def _pop_while(self, heap: List, crossed: Callable[[Decimal], bool]) -> List[str]:
+        fired = []
+        while heap and crossed(heap[0][0]):
+            key = heapq.heappop(heap)
+            entry = self._keys.get(key[2])
+            if entry is None or entry[1] != key:
+                # cancelled earlier
+                self._stale -= 1
+                continue
+            del self._keys[key[2]]
+            fired.append(key[2])
+        return fired
+
+    def pop_crossed(self, price: Decimal) -> List[str]:
+        """Remove and return the ids of every trigger crossed by price"""
+        # "above" fires when price >= trigger_price, "below" when price <= it
+        fired = self._pop_while(
+            self.above, lambda trigger_price: trigger_price <= price
+        ) + self._pop_while(self.below, lambda negated: -negated >= price)
+        if fired and self._stale > len(self._keys):
+            self._compact()
+        return fired
+
+
+class PriceTriggerEngine:
+    """Stores conditions per market and fires orders when the mid price crosses them"""
+
+    def __init__(
+        self,
+        get_clients: Callable[[str], Optional[Dict]],
+        poll_interval: float = 0.5,
+        history_size: int = 1000,
+        latency_samples: int = 1000,
+        max_attempts: int = 5,
+    ) -> None:
+        """
+        Args:
+            get_clients (Callable): Returns the client dictionary of an agent, or None if it is not initialized
+            poll_interval (float): Seconds between two rounds of the mid-price feed
+            history_size (int): Number of fired/failed triggers kept for listing
+            latency_samples (int): Number of tick-to-broadcast samples kept for stats
+            max_attempts (int): Crossings after which a trigger whose order cannot be built fails
+        """
+        self.get_clients = get_clients
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._indexes: Dict[Tuple[str, str], MarketTriggerIndex] = {}
+        self._market_types: Dict[Tuple[str, str], str] = {}
+        # market objects of the watched markets, they convert chain prices
+        self._markets: Dict[Tuple[str, str], object] = {}
+        self._triggers: Dict[str, PriceTrigger] = {}
+        self._history: deque = deque(maxlen=history_size)
+        self._latencies: deque = deque(maxlen=latency_samples)
+        self._last_prices: Dict[Tuple[str, str], Decimal] = {}
+        self._feed_clients: Dict[str, AsyncClient] = {}
+        self._agent_locks: Dict[str, asyncio.Lock] = {}
+        # agent_id -> batches of its triggers being placed
+        self._firing: Dict[str, int] = {}
+        self._pending = set()
+        self._task = None
+        self.ticks = 0
+        self.fired = 0
+        self.failed = 0
+        self.rearmed = 0
+
+    # Trigger management
+
+    def add_trigger(
+        self,
+        agent_id: str,
+        network: str,
+        market_id: str,
+        market_type: str,
+        direction: str,
+        trigger_price: Decimal,
+        order: Dict,
+        market: object = None,
+    ) -> PriceTrigger:
+        """
+        Args:
+            market (object): pyinjective market of market_id, fetched by the feed when omitted
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Direction must be one of {DIRECTIONS}")
+        if market_type not in ("spot", "derivative"):
+            raise ValueError("Market type must be either 'spot' or 'derivative'")
+        trigger = PriceTrigger(
+            agent_id, network, market_id, market_type, direction, trigger_price, order
+        )
+        key = (network, market_id)
+        self._indexes.setdefault(key, MarketTriggerIndex()).add(trigger)
+        self._market_types[key] = market_type
+        if market is not None:
+            self._markets[key] = market
+        self._triggers[trigger.trigger_id] = trigger
+        return trigger
+
+    def cancel_trigger(self, agent_id: str, trigger_id: str) -> bool:
+        trigger = self._triggers.get(trigger_id)
+        if trigger is None or trigger.agent_id != agent_id:
+            return False
+        self._indexes[(trigger.network, trigger.market_id)].remove(trigger_id)
+        del self._triggers[trigger_id]
+        trigger.status = "cancelled"
+        self._history.append(trigger)
+        return True
+
+    def list_triggers(self, agent_id: str) -> List[Dict]:
+        active = [t for t in self._triggers.values() if t.agent_id == agent_id]
+        done = [t for t in self._history if t.agent_id == agent_id]
+        return [t.to_dict() for t in active + done]
+
+    def active_agents(self) -> set:
+        """Agents with triggers that are still waiting or being placed"""
+        agents = {trigger.agent_id for trigger in self._triggers.values()}
+        return agents | set(self._firing)
+
+    # Evaluation
+
+    def process_ticks(
+        self, ticks: List[Tuple[str, str, Decimal]], tick_time: float = None
+    ) -> int:
+        """
+        Evaluate a round of prices and fire the crossed triggers, batched per agent.
+
+        Args:
+            ticks (List[Tuple]): (network, market_id, price) items
+            tick_time (float): time.monotonic() at which the prices were received
+
+        Returns:
+            int: Number of triggers fired
+        """
+        tick_time = time.monotonic() if tick_time is None else tick_time
+        per_agent: Dict[str, List[PriceTrigger]] = {}
+        for network, market_id, price in ticks:
+            self.ticks += 1
+            self._last_prices[(network, market_id)] = price
+            index = self._indexes.get((network, market_id))
+            if not index:
+                continue
+            for trigger_id in index.pop_crossed(price):
+                trigger = self._triggers.pop(trigger_id)
+                trigger.status = "firing"
+                trigger.fired_price = price
+                per_agent.setdefault(trigger.agent_id, []).append(trigger)
+
+        for agent_id, triggers in per_agent.items():
+            # keeps the agent's clients resident until the batch is placed
+            self._firing[agent_id] = self._firing.get(agent_id, 0) + 1
+            task = asyncio.ensure_future(self._fire(agent_id, triggers, tick_time))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+        return sum(len(triggers) for triggers in per_agent.values())
+
+    async def _fire(
+        self, agent_id: str, triggers: List[PriceTrigger], tick_time: float
+    ) -> None:
+        try:
+            await self._place(agent_id, triggers, tick_time)
+        finally:
+            self._firing[agent_id] -= 1
+            if not self._firing[agent_id]:
+                del self._firing[agent_id]
+
+    async def _place(
+        self, agent_id: str, triggers: List[PriceTrigger], tick_time: float
+    ) -> None:
+        lock = self._agent_locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            clients = self.get_clients(agent_id)
+            if not clients:
+                result = {"success": False, "error": "Agent not initialized"}
+                self._finish(triggers, result)
+                return
+            trader = clients["trader"]
+            # one order that cannot be built, e.g. on a book too thin to fill it,
+            # must not hold back the other orders of the tick
+            built, unbuilt = [], []
+            for trigger in triggers:
+                try:
+                    built.append((trigger, await trader.build_order_msg(trigger.order)))
+                except Exception as e:
+                    unbuilt.append((trigger, str(e)))
+            if built:
+                try:
+                    result = await trader.broadcast_order_msgs(
+                        [item for _, item in built]
+                    )
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                self._latencies.append(time.monotonic() - tick_time)
+                self._finish([trigger for trigger, _ in built], result)
+        for trigger, error in unbuilt:
+            self._rearm(trigger, error)
+
+    def _rearm(self, trigger: PriceTrigger, error: str) -> None:
+        """Put a trigger whose order could not be built back in its market"""
+        trigger.attempts += 1
+        if trigger.attempts >= self.max_attempts:
+            self._finish([trigger], {"success": False, "error": error})
+            return
+        trigger.status = "active"
+        trigger.fired_price = None
+        trigger.result = {"error": error}
+        self._indexes[(trigger.network, trigger.market_id)].add(trigger)
+        self._triggers[trigger.trigger_id] = trigger
+        self.rearmed += 1
+
+    def _finish(self, triggers: List[PriceTrigger], result: Dict) -> None:
+        error = _broadcast_error(result)
+        for trigger in triggers:
+            trigger.status = "failed" if error else "fired"
+            trigger.fired_at = time.time()
+            trigger.result = {"error": error} if error else result
+            self._history.append(trigger)
+        if error:
+            self.failed += len(triggers)
+        else:
+            self.fired += len(triggers)
+
+    # Shared price feed
+
+    def _feed_client(self, network: str) -> AsyncClient:
+        if network not in self._feed_clients:
+            self._feed_clients[network] = AsyncClient(
+                Network.testnet() if network == "testnet" else Network.mainnet()
+            )
+        return self._feed_clients[network]
+
+    async def _fetch_mid_price(
+        self, network: str, market_id: str, market_type: str
+    ) -> Optional[Decimal]:
+        client = self._feed_client(network)
+        key = (network, market_id)
+        if key not in self._markets:
+            # all_*_markets copies every market, so it is only asked once
+            markets = await (
+                client.all_derivative_markets()
+                if market_type == "derivative"
+                else client.all_spot_markets()
+            )
+            self._markets[key] = markets.get(market_id)
+        if market_type == "derivative":
+            tob = await client.fetch_derivative_mid_price_and_tob(market_id=market_id)
+        else:
+            tob = await client.fetch_spot_mid_price_and_tob(market_id=market_id)
+        if not tob.get("midPrice"):
+            return None
+        market = self._markets[key]
+        convert = getattr(market, "price_from_extended_chain_format", None)
+        price = Decimal(tob["midPrice"])
+        return convert(price) if convert else price
+
+    async def poll_once(self) -> int:
+        keys = [key for key, index in self._indexes.items() if len(index)]
+        if not keys:
+            return 0
+        prices = await asyncio.gather(
+            *[
+                self._fetch_mid_price(
+                    network, market_id, self._market_types[(network, market_id)]
+                )
+                for network, market_id in keys
+            ],
+            return_exceptions=True,
+        )
+        tick_time = time.monotonic()
+        ticks = [
+            (network, market_id, price)
+            for (network, market_id), price in zip(keys, prices)
+            if isinstance(price, Decimal)
+        ]
+        return self.process_ticks(ticks, tick_time)
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Trigger feed error: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        clients, self._feed_clients = self._feed_clients, {}
+        for client in clients.values():
+            await ChainInteractor._close_channels(client)
+
+    def stats(self) -> Dict:
+        latencies = list(self._latencies)
+        return {
+            "active_triggers": len(self._triggers),
+            "markets": sum(1 for index in self._indexes.values() if len(index)),
+            "ticks": self.ticks,
+            "fired": self.fired,
+            "failed": self.failed,
+            "rearmed": self.rearmed,
+            "tick_to_broadcast_seconds": {
+                "samples": len(latencies),
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies) if latencies else None,
+            },
+        }
+
+
+def _broadcast_error(result: Dict) -> Optional[str]:
+    """Error of a broadcast result, including transactions rejected with a code"""
+    if not result.get("success"):
+        return result.get("error") or "Broadcast failed"
+    tx_response = (result.get("result") or {}).get("txResponse") or {}
+    code = int(tx_response.get("code") or 0)
+    if code:
+        return tx_response.get("rawLog") or f"Transaction failed with code {code}"
+    return None
@@ -0,0 +1,136 @@
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Mapping, Optional, Union
+from injective_functions.utils.indexer_requests import fetch_decimal_denoms
+
+"""
+Exact conversion between chain amounts and human readable amounts.
+
+Chain amounts are integers in the smallest unit of a denom, e.g. 10**18 inj
+for 1 INJ. Going through floats loses digits on 18 decimal tokens, so both
+directions here use integer arithmetic only.
+"""
+
+Number = Union[Decimal, int, float, str]
+
+
+class AmountCodec:
+    """
+    Converts amounts of the denoms of one decimals registry.
+
+    The powers of ten of every denom are computed once, when the codec is
+    built from the registry.
+    """
+
+    def __init__(self, decimals: Mapping[str, int]) -> None:
+        """
+        Args:
+            decimals (Mapping[str, int]): Denom -> decimals, as returned by fetch_decimal_denoms
+        """
+        self.source = decimals
+        self._decimals: Dict[str, int] = {}
+        self._scales: Dict[str, int] = {}
+        powers: Dict[int, int] = {}
+        for denom, places in decimals.items():
+            places = int(places)
+            self._decimals[denom] = places
+            if places not in powers:
+                powers[places] = 10**places
+            self._scales[denom] = powers[places]
+
+    def __contains__(self, denom: str) -> bool:
+        return denom in self._scales
+
+    def __len__(self) -> int:
+        return len(self._scales)
+
+    def decimals(self, denom: str) -> int:
+        return self._decimals[denom]
+
+    def to_human(self, amount: Union[int, str], denom: str) -> str:
+        """
+        Chain amount to an exact decimal string without trailing zeros.
+
+        Args:
+            amount (int | str): Integer amount in the smallest unit of denom
+            denom (str): Denom of the amount, must be in the registry
+        """
+        return _format(int(amount), self._decimals[denom], self._scales[denom])
+
+    def to_chain(self, value: Number, denom: str) -> int:
+        """
+        Human amount to the integer chain amount.
+
+        Args:
+            value (Decimal | int | float | str): Amount in whole tokens, floats are
+                read through their shortest repr, e.g. 0.1 as "0.1"
+            denom (str): Denom of the amount, must be in the registry
+
+        Raises:
+            ValueError: If the amount has more decimals than the denom
+        """
+        try:
+            amount = (
+                value if isinstance(value, Decimal) else Decimal(str(value).strip())
+            )
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {value}")
+        if not amount.is_finite():
+            raise ValueError(f"Invalid amount: {value}")
+        sign, digits, exponent = amount.as_tuple()
+        units = int("".join(map(str, digits))) if digits else 0
+        shift = exponent + self._decimals[denom]
+        if shift >= 0:
+            units *= 10**shift
+        else:
+            units, remainder = divmod(units, 10**-shift)
+            if remainder:
+                raise ValueError(
+                    f"{value} {denom} has more than {self._decimals[denom]} decimals"
+                )
+        return -units if sign else units
+
+    def humanize(
+        self,
+        entries: Iterable[Mapping[str, str]],
+        denom_key: str = "denom",
+        amount_key: str = "amount",
+    ) -> Dict[str, str]:
+        """
+        Human amounts of a list of coins in one pass, unknown denoms are skipped.
+
+        Args:
+            entries (Iterable[Mapping]): Coins like {"denom": ..., "amount": ...}
+            denom_key (str): Key of the denom in an entry
+            amount_key (str): Key of the chain amount in an entry
+        """
+        decimals = self._decimals
+        scales = self._scales
+        result = {}
+        for entry in entries:
+            denom = entry[denom_key]
+            scale = scales.get(denom)
+            if scale is not None:
+                result[denom] = _format(int(entry[amount_key]), decimals[denom], scale)
+        return result
+
+
+def _format(units: int, places: int, scale: int) -> str:
+    whole, fraction = divmod(abs(units), scale)
+    sign = "-" if units < 0 else ""
+    if not fraction:
+        return f"{sign}{whole}"
+    return f"{sign}{whole}.{fraction:0{places}d}".rstrip("0")
+
+
+# is_mainnet -> codec of the current decimals registry
+_codecs: Dict[bool, AmountCodec] = {}
+
+
+async def fetch_amount_codec(is_mainnet: bool) -> AmountCodec:
+    """Codec of the cached decimals registry, rebuilt when the registry is refreshed"""
+    decimals = await fetch_decimal_denoms(is_mainnet)
+    codec: Optional[AmountCodec] = _codecs.get(is_mainnet)
+    if codec is None or codec.source is not decimals:
+        codec = AmountCodec(decimals)
+        _codecs[is_mainnet] = codec
+    return codec
@@ -3,6 +3,8 @@
 from typing import Dict, Tuple, Any, Optional
 import json
 from pathlib import Path
+import time
+from injective_functions.utils.metrics import FUNCTION_SECONDS, FUNCTIONS_IN_FLIGHT
 
 
 class InjectiveFunctionMapper:
@@ -59,13 +61,49 @@ class InjectiveFunctionMapper:
         "mint": ("token_factory", "mint"),
         "burn": ("token_factory", "burn"),
         "set_denom_metadata": ("token_factory", "set_denom_metadata"),
+        # Conditional order functions
+        "set_price_trigger": ("triggers", "set_price_trigger"),
+        "list_price_triggers": ("triggers", "list_price_triggers"),
+        "cancel_price_trigger": ("triggers", "cancel_price_trigger"),
     }
 
+    # Functions that only read chain state and can safely run concurrently
+    READ_ONLY_FUNCTIONS = frozenset(
+        {
+            "get_subaccount_deposits",
+            "get_aggregate_market_volumes",
+            "get_aggregate_account_volumes",
+            "get_subaccount_orders",
+            "get_historical_orders",
+            "get_mid_price_and_tob_derivatives_market",
+            "get_mid_price_and_tob_spot_market",
+            "get_derivatives_orderbook",
+            "get_spot_orderbook",
+            "trader_derivative_orders",
+            "trader_derivative_orders_by_hash",
+            "trader_spot_orders",
+            "trader_spot_orders_by_hash",
+            "query_balances",
+            "query_spendable_balances",
+            "query_total_supply",
+            "fetch_auctions",
+            "fetch_latest_auction",
+            "fetch_auction_bids",
+            "fetch_grants",
+            "list_price_triggers",
+        }
+    )
+
     @classmethod
     def get_function_mapping(cls, function_name: str) -> Optional[Tuple[str, str]]:
         """Get the client type and method name for a given function"""
         return cls.FUNCTION_MAP.get(function_name)
 
+    @classmethod
+    def is_read_only(cls, function_name: str) -> bool:
+        """Check if a function only reads state"""
+        return function_name in cls.READ_ONLY_FUNCTIONS
+
     @classmethod
     def validate_function(cls, function_name: str) -> bool:
         """Check if a function name is valid"""
@@ -141,7 +179,28 @@ class FunctionExecutor:
                     "error": f"Method {method_name} not found in {client_type} client"
                 }
 
-            return await method(**arguments)
+            network = getattr(
+                getattr(client, "chain_client", None), "network_type", "unknown"
+            )
+            status = "error"
+            started = time.perf_counter()
+            FUNCTIONS_IN_FLIGHT.inc()
+            try:
+                result = await method(**arguments)
+                if not (
+                    isinstance(result, dict)
+                    and ("error" in result or result.get("success") is False)
+                ):
+                    status = "success"
+                return result
+            finally:
+                FUNCTIONS_IN_FLIGHT.dec()
+                FUNCTION_SECONDS.observe(
+                    time.perf_counter() - started,
+                    function=function_name,
+                    network=network,
+                    status=status,
+                )
 
         except Exception as e:
             return {
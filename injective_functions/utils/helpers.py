@@ -58,21 +58,21 @@ def combine_function_schemas(input_files: List[str]) -> Dict:
     return combined_data
 
 
-async def impute_market_ids(market_ids):
+async def impute_market_ids(market_ids, network_type: str = "mainnet"):
     lst = []
     for market_id in market_ids:
         if validate_market_id(market_id):
             lst.append(market_id)
         else:
-            lst.append(await get_market_id(market_id))
+            lst.append(await get_market_id(market_id, network_type))
     return lst
 
 
-async def impute_market_id(market_id):
+async def impute_market_id(market_id, network_type: str = "mainnet"):
     if validate_market_id(market_id):
         return market_id
     else:
-        return await get_market_id(market_id)
+        return await get_market_id(market_id, network_type)
 
 
 def detailed_exception_info(e) -> Dict:
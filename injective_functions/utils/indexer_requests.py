@@ -1,8 +1,12 @@
 import aiohttp
-from typing import Dict, Tuple
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
 import re
 import json
 import logging
+from injective_functions.utils.metrics import METADATA_REQUESTS, METADATA_SECONDS
+from injective_functions.utils.tracing import span
 
 
 # Set up logging
@@ -10,8 +14,53 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Denom decimals and market lists barely change, they are downloaded once per
+# network and refreshed after METADATA_TTL seconds
+METADATA_TTL = 3600.0
+# (kind, is_mainnet) -> (fetched_at, data)
+_metadata_cache: Dict[Tuple[str, bool], Tuple[float, Dict]] = {}
+_metadata_locks: Dict[Tuple[str, bool], asyncio.Lock] = {}
+
+
+async def _cached_metadata(kind: str, is_mainnet: bool, fetch) -> Dict:
+    key = (kind, is_mainnet)
+    network = "mainnet" if is_mainnet else "testnet"
+    cached = _metadata_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < METADATA_TTL:
+        METADATA_REQUESTS.inc(kind=kind, network=network, result="hit")
+        return cached[1]
+    # concurrent cold requests download the data once
+    async with _metadata_locks.setdefault(key, asyncio.Lock()):
+        cached = _metadata_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < METADATA_TTL:
+            METADATA_REQUESTS.inc(kind=kind, network=network, result="hit")
+            return cached[1]
+        METADATA_REQUESTS.inc(kind=kind, network=network, result="miss")
+        with METADATA_SECONDS.time(kind=kind, network=network), span(
+            "metadata.fetch", kind=kind, network=network
+        ):
+            data = await fetch(is_mainnet)
+        # failed downloads return {} and are retried on the next call
+        if data:
+            _metadata_cache[key] = (time.monotonic(), data)
+        return data
+
+
+async def prefetch_metadata(network_type: str) -> Dict[str, int]:
+    """Download the registries of a network ahead of the first request"""
+    is_mainnet = network_type == "mainnet"
+    denoms, tickers = await asyncio.gather(
+        fetch_decimal_denoms(is_mainnet), fetch_derivative_tickers(network_type)
+    )
+    return {"denoms": len(denoms), "derivative_markets": len(tickers)}
+
+
 # This is expected to return a (kv) pair
 async def fetch_decimal_denoms(is_mainnet: bool) -> Dict[str, int]:
+    return await _cached_metadata("denoms", is_mainnet, _fetch_decimal_denoms)
+
+
+async def _fetch_decimal_denoms(is_mainnet: bool) -> Dict[str, int]:
     # default url
     request_url = (
         "https://sentry.lcd.injective.network/injective/exchange/v1beta1/exchange/denom_decimals"
@@ -30,7 +79,6 @@ async def fetch_decimal_denoms(is_mainnet: bool) -> Dict[str, int]:
                     return {}
 
                 raw_data = await response.text()
-                logger.info(f"Raw response: {raw_data}")
 
                 denom_data = json.loads(raw_data)
 
@@ -45,9 +93,6 @@ async def fetch_decimal_denoms(is_mainnet: bool) -> Dict[str, int]:
                 response_dic: Dict[str, int] = {}
                 for denom in denom_data:
                     response_dic[denom["denom"]] = int(denom["decimals"])
-                    logger.info(
-                        f"Added denom: {denom['denom']} with decimals: {denom['decimals']}"
-                    )
 
                 return response_dic
 
@@ -140,20 +185,46 @@ async def get_market_id(ticker_symbol: str, network_type: str = "mainnet"):
     """
     # Normalize the ticker symbol to match the API format
     normalized_ticker = normalize_ticker(ticker_symbol)
-    request_url = ""
+    with METADATA_SECONDS.time(kind="market_id", network=network_type), span(
+        "market_id.resolve", ticker=normalized_ticker, network=network_type
+    ) as resolve:
+        ticker_to_market_id = await fetch_derivative_tickers(network_type)
+        market_id = ticker_to_market_id.get(normalized_ticker)
+        resolve.set(found=market_id is not None)
+    if market_id:
+        return market_id
+    print(f"No market ID found for ticker: {normalized_ticker}")
+    return None
+
+
+async def fetch_derivative_tickers(network_type: str = "mainnet") -> Dict[str, str]:
+    """Mapping of derivative tickers (e.g. 'BTC/USDT PERP') to market ids"""
+    return await _cached_metadata(
+        "derivative_tickers", network_type == "mainnet", _fetch_derivative_tickers
+    )
+
+
+def cached_derivative_tickers(
+    network_type: str = "mainnet",
+) -> Optional[Dict[str, str]]:
+    """The derivative ticker map if it was already downloaded, without fetching it"""
+    cached = _metadata_cache.get(("derivative_tickers", network_type == "mainnet"))
+    return cached[1] if cached is not None else None
+
+
+async def _fetch_derivative_tickers(is_mainnet: bool) -> Dict[str, str]:
     # API endpoint for derivative markets
-    if network_type == "mainnet":
+    if is_mainnet:
         request_url = "https://sentry.lcd.injective.network/injective/exchange/v1beta1/derivative/markets"
     else:
         request_url = "https://testnet.sentry.lcd.injective.network/injective/exchange/v1beta1/derivative/markets"
+    # Initialize a mapping of tickers to market IDs
+    ticker_to_market_id = {}
     async with aiohttp.ClientSession() as session:
         try:
             async with session.get(request_url) as response:
                 data = await response.json()
 
-                # Initialize a mapping of tickers to market IDs
-                ticker_to_market_id = {}
-
                 # Check if 'markets' key exists in the response
                 if "markets" in data:
                     for market_info in data["markets"]:
@@ -167,17 +238,10 @@ async def get_market_id(ticker_symbol: str, network_type: str = "mainnet"):
 
                         if ticker and market_id:
                             ticker_to_market_id[ticker] = market_id
-
-                    # Get the market_id for the normalized ticker
-                    market_id = ticker_to_market_id.get(normalized_ticker)
-                    if market_id:
-                        return market_id
-                    else:
-                        print(f"No market ID found for ticker: {normalized_ticker}")
                 else:
                     print("No market data found in the response.")
         except aiohttp.ClientError as e:
             print(f"HTTP request failed: {e}")
         except Exception as e:
             print(f"An error occurred: {e}")
-    return None
+    return ticker_to_market_id
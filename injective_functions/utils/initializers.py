@@ -6,9 +6,15 @@ from pyinjective.core.broadcaster import MsgBroadcasterWithPk
 from pyinjective.transaction import Transaction
 from pyinjective.wallet import PrivateKey
 from injective_functions.utils.helpers import detailed_exception_info
+from injective_functions.utils.metrics import TX_STAGE_SECONDS
+from injective_functions.utils.tracing import span
 
 
 class ChainInteractor:
+    # Composers only depend on the network and load its denoms and markets on
+    # creation, so every agent of a network shares one
+    _composers = {}
+
     def __init__(self, network_type: str = "mainnet", private_key: str = None) -> None:
         self.private_key = private_key
         self.network_type = network_type
@@ -29,21 +35,60 @@ class ChainInteractor:
 
     async def init_client(self):
         """Initialize the Injective client and required components"""
+        if self.client is not None:
+            await self._close_channels(self.client)
         self.client = AsyncClient(self.network)
-        self.composer = await self.client.composer()
+        self.composer = self._composers.get(self.network_type)
+        if self.composer is None:
+            self.composer = await self.client.composer()
+            self._composers[self.network_type] = self.composer
+        await self.refresh_account()
+        if self.message_broadcaster is None:
+            self.message_broadcaster = MsgBroadcasterWithPk.new_using_simulation(
+                network=self.network, private_key=self.private_key
+            )
+
+    async def refresh_account(self):
+        """Sync the timeout height and the account sequence before a transaction"""
         await self.client.sync_timeout_height()
         await self.client.fetch_account(self.address.to_acc_bech32())
-        self.message_broadcaster = MsgBroadcasterWithPk.new_using_simulation(
-            network=self.network, private_key=self.private_key
-        )
 
-    async def build_and_broadcast_tx(self, msg):
+    @staticmethod
+    async def _close_channels(client):
+        for name in (
+            "chain_channel",
+            "exchange_channel",
+            "explorer_channel",
+            "chain_stream_channel",
+        ):
+            channel = getattr(client, name, None)
+            if channel is not None:
+                await channel.close()
+
+    async def close(self):
+        """Close the gRPC channels of the client and of the message broadcaster"""
+        client, self.client = self.client, None
+        if client is not None:
+            await self._close_channels(client)
+        broadcaster, self.message_broadcaster = self.message_broadcaster, None
+        broadcaster_client = getattr(broadcaster, "_client", None)
+        if broadcaster_client is not None:
+            await self._close_channels(broadcaster_client)
+
+    async def build_and_broadcast_tx(self, *msgs):
         """Common function to build and broadcast transactions"""
         try:
-            await self.init_client()
+            # reuse the channels, only the account sequence has to be fresh
+            with TX_STAGE_SECONDS.time(
+                stage="prepare", network=self.network_type
+            ), span("tx.prepare", network=self.network_type):
+                if self.client is None:
+                    await self.init_client()
+                else:
+                    await self.refresh_account()
             tx = (
                 Transaction()
-                .with_messages(msg)
+                .with_messages(*msgs)
                 .with_sequence(self.client.get_sequence())
                 .with_account_num(self.client.get_number())
                 .with_chain_id(self.network.chain_id)
@@ -54,7 +99,10 @@ class ChainInteractor:
             sim_tx_raw_bytes = tx.get_tx_data(sim_sig, self.pub_key)
 
             try:
-                sim_res = await self.client.simulate(sim_tx_raw_bytes)
+                with TX_STAGE_SECONDS.time(
+                    stage="simulate", network=self.network_type
+                ), span("tx.simulate", network=self.network_type):
+                    sim_res = await self.client.simulate(sim_tx_raw_bytes)
             except RpcError as ex:
                 return {"error": str(ex)}
 
@@ -83,7 +131,10 @@ class ChainInteractor:
             sig = self.priv_key.sign(sign_doc.SerializeToString())
             tx_raw_bytes = tx.get_tx_data(sig, self.pub_key)
 
-            res = await self.client.broadcast_tx_sync_mode(tx_raw_bytes)
+            with TX_STAGE_SECONDS.time(
+                stage="broadcast", network=self.network_type
+            ), span("tx.broadcast", network=self.network_type, gas_limit=gas_limit):
+                res = await self.client.broadcast_tx_sync_mode(tx_raw_bytes)
             # standardized return arguments
             return {
                 "success": True,
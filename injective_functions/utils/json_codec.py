@@ -0,0 +1,55 @@
+import json
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library is used without it
+    orjson = None
+
+"""
+JSON encoding of function results, histories and HTTP payloads.
+
+orjson encodes the nested dicts of chain responses several times faster
+than the json module. Both produce compact UTF-8 output. Values orjson
+rejects, such as integers beyond 64 bits, are encoded by the json module
+instead.
+"""
+
+Default = Callable[[Any], Any]
+
+
+def dumps_bytes(value: Any, default: Default = str) -> bytes:
+    """
+    Encode value as UTF-8 JSON.
+
+    Args:
+        value: Value to encode, dict keys that are not strings are converted
+        default (Callable): Called for values JSON has no type for, str by default
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(
+        value, default=default, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+def dumps(value: Any, default: Default = str) -> str:
+    """Encode value as a JSON string, see dumps_bytes"""
+    return dumps_bytes(value, default).decode()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # NaN and Infinity are only accepted by the json module
+            pass
+    return json.loads(data)
+
+
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
@@ -0,0 +1,248 @@
+import contextvars
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from injective_functions.utils import json_codec
+
+"""
+Request tracing with spans propagated through contextvars.
+
+Spans opened while a trace is active become its children, also inside
+tasks the request spawns since asyncio copies the context into them.
+Spans outside a trace (background jobs, warm-up) cost a context lookup.
+"""
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "name",
+        "span_id",
+        "parent_id",
+        "start",
+        "duration",
+        "attributes",
+        "error",
+    )
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": (
+                round(self.duration * 1000, 3) if self.duration is not None else None
+            ),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, trace_id: str, name: str) -> None:
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+
+    def summary(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.root.to_dict()["duration_ms"] if self.root else None,
+            "spans": len(self.spans),
+            "attributes": self.root.attributes if self.root else {},
+            "error": self.root.error if self.root else None,
+        }
+
+    def to_dict(self) -> Dict:
+        return dict(self.summary(), spans=[span.to_dict() for span in self.spans])
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Tracer:
+    """
+    Keeps the last traces in memory and optionally appends them to a file.
+
+    Finished traces are written as JSON lines by a background thread, so
+    exporting never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 200,
+        sample_rate: float = 1.0,
+        path: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            capacity (int): Traces kept in memory, the oldest are dropped
+            sample_rate (float): Share of requests traced, between 0 and 1
+            path (str): JSON lines file receiving every finished trace
+        """
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.path = path
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._exports: Optional[queue.Queue] = None
+        self.started = 0
+        self.dropped_exports = 0
+
+    def sample(self) -> Optional[str]:
+        """Id for the trace of a new request, None if it is not sampled"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return uuid.uuid4().hex
+
+    @contextmanager
+    def trace(self, name: str, trace_id: Optional[str], **attributes):
+        """Open the root span of a trace, a no-op when trace_id is None"""
+        if trace_id is None:
+            yield _NOOP
+            return
+        trace = Trace(trace_id, name)
+        self.started += 1
+        self._traces[trace_id] = trace
+        while len(self._traces) > self.capacity:
+            self._traces.popitem(last=False)
+        try:
+            with self._span(trace, name, None, attributes) as root:
+                trace.root = root
+                yield root
+        finally:
+            self._export(trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Open a child of the current span, a no-op outside a trace"""
+        parent = _current_span.get()
+        if parent is None:
+            yield _NOOP
+            return
+        with self._span(parent.trace, name, parent.span_id, attributes) as span:
+            yield span
+
+    @contextmanager
+    def _span(self, trace: Trace, name: str, parent_id, attributes):
+        span = Span(trace, name, parent_id, attributes)
+        trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # an async generator resumed in another context
+                _current_span.set(None)
+
+    def _export(self, trace: Trace) -> None:
+        if not self.path:
+            return
+        if self._exports is None:
+            self._exports = queue.Queue(maxsize=1000)
+            threading.Thread(
+                target=self._write, name="trace-exporter", daemon=True
+            ).start()
+        try:
+            self._exports.put_nowait(trace)
+        except queue.Full:
+            self.dropped_exports += 1
+
+    def _write(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        while True:
+            traces = [self._exports.get()]
+            while not self._exports.empty():
+                traces.append(self._exports.get_nowait())
+            try:
+                with open(self.path, "a") as file:
+                    for trace in traces:
+                        file.write(json_codec.dumps(trace.to_dict()) + "\n")
+            except OSError as e:
+                print(f"Writing traces to {self.path} failed: {str(e)}")
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        trace = self._traces.get(trace_id)
+        return trace.to_dict() if trace else None
+
+    def recent(self, limit: int = 50, min_duration_ms: float = 0.0) -> List[Dict]:
+        """Summaries of the most recent finished traces, newest first"""
+        summaries = []
+        for trace in reversed(self._traces.values()):
+            summary = trace.summary()
+            if summary["duration_ms"] is None:
+                continue
+            if summary["duration_ms"] >= min_duration_ms:
+                summaries.append(summary)
+            if len(summaries) >= limit:
+                break
+        return summaries
+
+    def stats(self) -> Dict:
+        return {
+            "traces_started": self.started,
+            "traces_kept": len(self._traces),
+            "capacity": self.capacity,
+            "sample_rate": self.sample_rate,
+            "export_path": self.path,
+            "dropped_exports": self.dropped_exports,
+        }
+
+
+TRACER = Tracer(
+    capacity=int(os.getenv("TRACE_BUFFER", "200")),
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+    path=os.getenv("TRACE_FILE") or None,
+)
+
+
+def span(name: str, **attributes):
+    """Child span of the current trace, see Tracer.span"""
+    return TRACER.span(name, **attributes)
+
+
+def current_span():
+    """Innermost open span, or a no-op span outside a trace"""
+    return _current_span.get() or _NOOP
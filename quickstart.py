@@ -308,6 +308,65 @@ class InjectiveCLI:
         except requests.exceptions.RequestException as e:
             raise Exception(f"API request failed: {str(e)}")
 
+    def stream_request(self, endpoint: str, data: dict):
+        """Make a streaming API request and yield (event, data) server-sent events"""
+        try:
+            url = f"{self.api_url.rstrip('/')}/{endpoint.lstrip('/')}"
+            headers = {
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream",
+            }
+            with requests.post(
+                url, json=data, headers=headers, stream=True, timeout=120
+            ) as response:
+                response.raise_for_status()
+                event = "message"
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[len("event:") :].strip()
+                    elif line.startswith("data:"):
+                        yield event, json.loads(line[len("data:") :].strip())
+
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"API request failed: {str(e)}")
+
+    def display_stream(self, events):
+        """Print streamed tokens as they arrive and return the final payload."""
+        result = None
+        streaming = False
+        for event, data in events:
+            self.stop_animation()
+            if event == "token":
+                if not streaming:
+                    sys.stdout.write(f"{Fore.BLUE}Response: ")
+                    streaming = True
+                sys.stdout.write(data["content"])
+                sys.stdout.flush()
+            elif event == "function_call":
+                if streaming:
+                    print(Style.RESET_ALL)
+                    streaming = False
+                print(f"{Fore.YELLOW}Calling function {data['name']}...{Style.RESET_ALL}")
+                self.start_animation()
+            elif event == "function_result":
+                if self.debug:
+                    print(
+                        f"{Fore.YELLOW}Debug: {json.dumps(data, indent=2)}{Style.RESET_ALL}"
+                    )
+            elif event == "error":
+                print(f"{Fore.RED}Error: {data['error']}{Style.RESET_ALL}")
+                result = data
+            elif event == "done":
+                result = data
+
+        if streaming:
+            print(Style.RESET_ALL)
+        elif result and result.get("response"):
+            # nothing was streamed, e.g. an error turn
+            self.display_response(result["response"])
+        print()
+        return result
+
     def run(self):
         """Run the enhanced CLI interface"""
         self.display_banner()
@@ -348,8 +407,8 @@ class InjectiveCLI:
 
                 try:
                     agent = self.agent_manager.get_current_agent()
-                    result = self.make_request(
-                        "/chat",
+                    events = self.stream_request(
+                        "/chat/stream",
                         {
                             "message": user_input,
                             "session_id": self.session_id,
@@ -359,11 +418,9 @@ class InjectiveCLI:
                         },
                     )
 
-                    # Stop animation before displaying response
+                    # Tokens are printed as they arrive, the animation stops on the first event
+                    self.display_stream(events)
                     self.stop_animation()
-                    self.display_response(
-                        result.get("response"), result if self.debug else None
-                    )
 
                 except Exception as e:
                     self.stop_animation()
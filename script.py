@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from typing import Optional
 import threading
 import time
@@ -154,6 +154,24 @@ class InjectiveAPI:
                 print("Request failed:", str(e))  # Debugging
                 raise Exception(f"API request failed: {str(e)}")
 
+    def stream_request(self, endpoint: str, data: dict):
+        """Forward a request to a streaming endpoint and yield the raw server-sent event lines"""
+        url = f"{self.api_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+
+        current_agent = self.agent_manager.get_current_agent()
+        if current_agent and data:
+            data["agent_key"] = current_agent["private_key"]
+            data["environment"] = self.agent_manager.get_current_network()
+            data["agent_id"] = current_agent["address"]
+
+        with requests.post(
+            url, json=data, headers=headers, stream=True, timeout=120
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                yield line + "\n"
+
 # Initialize the InjectiveAPI instance
 injective_api = InjectiveAPI(api_url="http://localhost:8000")
 
@@ -192,6 +210,43 @@ def chat():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat requests, relaying the agent's server-sent events as they arrive"""
+    data = request.json
+    user_input = data.get('message')
+
+    if not user_input:
+        return jsonify({"error": "Message is required"}), 400
+
+    agent = injective_api.agent_manager.get_current_agent()
+    if not agent:
+        return jsonify({"error": "No agent selected"}), 400
+
+    # Generate session_id on the backend unless the client keeps one
+    session_id = data.get('session_id') or datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    def relay():
+        try:
+            yield from injective_api.stream_request(
+                "/chat/stream",
+                {
+                    "message": user_input,
+                    "session_id": session_id,
+                    "agent_id": agent["address"],
+                    "agent_key": agent["private_key"],
+                    "environment": injective_api.agent_manager.get_current_network(),
+                },
+            )
+        except requests.exceptions.RequestException as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(relay()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.route('/switch_network', methods=['POST'])
 def switch_network():
     """Handle network switching"""
@@ -0,0 +1,120 @@
+import asyncio
+import random
+import time
+from decimal import Context, Decimal
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from injective_functions.utils import indexer_requests  # noqa: E402
+from injective_functions.utils.amounts import (  # noqa: E402
+    AmountCodec,
+    fetch_amount_codec,
+)
+
+INJ = "inj"
+USDT = "peggy0xdAC17F958D2ee523a2206206994597C13D831ec7"
+REGISTRY = {INJ: 18, USDT: 6, "factory/inj1/whole": 0}
+
+
+@pytest.fixture
+def codec():
+    return AmountCodec(REGISTRY)
+
+
+@pytest.mark.parametrize(
+    "amount, denom, human",
+    [
+        ("1000000000000000000", INJ, "1"),
+        (1234567890123456789, INJ, "1.234567890123456789"),
+        ("1", INJ, "0.000000000000000001"),
+        ("1500000", USDT, "1.5"),
+        ("0", USDT, "0"),
+        ("-2500000", USDT, "-2.5"),
+        ("42", "factory/inj1/whole", "42"),
+    ],
+)
+def test_to_human(codec, amount, denom, human):
+    assert codec.to_human(amount, denom) == human
+
+
+@pytest.mark.parametrize(
+    "value, denom, units",
+    [
+        ("1.234567890123456789", INJ, 1234567890123456789),
+        (Decimal("0.000000000000000001"), INJ, 1),
+        (2, USDT, 2000000),
+        (0.1, USDT, 100000),
+        ("1e-6", USDT, 1),
+        (" 3.50 ", USDT, 3500000),
+        ("-1.25", USDT, -1250000),
+        ("7", "factory/inj1/whole", 7),
+    ],
+)
+def test_to_chain(codec, value, denom, units):
+    assert codec.to_chain(value, denom) == units
+
+
+@pytest.mark.parametrize(
+    "value, denom",
+    [
+        ("0.0000001", USDT),
+        ("1.5", "factory/inj1/whole"),
+        ("0.0000000000000000001", INJ),
+    ],
+)
+def test_to_chain_rejects_excess_decimals(codec, value, denom):
+    with pytest.raises(ValueError, match="decimals"):
+        codec.to_chain(value, denom)
+
+
+@pytest.mark.parametrize("value", ["abc", "", "NaN", "Infinity", float("inf")])
+def test_to_chain_rejects_invalid_amounts(codec, value):
+    with pytest.raises(ValueError, match="Invalid amount"):
+        codec.to_chain(value, USDT)
+
+
+def test_unknown_denom(codec):
+    assert "unknown" not in codec
+    with pytest.raises(KeyError):
+        codec.to_human("1", "unknown")
+
+
+def test_round_trip(codec):
+    generator = random.Random(7)
+    for _ in range(1000):
+        denom = generator.choice(list(REGISTRY))
+        units = generator.randrange(-(10**30), 10**30)
+        human = codec.to_human(units, denom)
+        assert codec.to_chain(human, denom) == units
+        # the default context would round the 30 digits of the reference
+        exact = Decimal(units).scaleb(-REGISTRY[denom], Context(prec=64))
+        assert Decimal(human) == exact
+
+
+def test_humanize_skips_unknown_denoms(codec):
+    balances = [
+        {"denom": INJ, "amount": "2000000000000000000"},
+        {"denom": "unknown", "amount": "5"},
+        {"denom": USDT, "amount": "10"},
+    ]
+
+    assert codec.humanize(balances) == {INJ: "2", USDT: "0.00001"}
+    assert len(codec) == 3
+    assert codec.decimals(USDT) == 6
+
+
+def test_fetch_amount_codec_follows_the_registry(monkeypatch):
+    cache = {}
+    monkeypatch.setattr(indexer_requests, "_metadata_cache", cache)
+    cache[("denoms", False)] = (time.monotonic(), dict(REGISTRY))
+
+    first = asyncio.run(fetch_amount_codec(False))
+    assert asyncio.run(fetch_amount_codec(False)) is first
+
+    # a refreshed registry is a new dict and gets a new codec
+    cache[("denoms", False)] = (time.monotonic(), {INJ: 18})
+    refreshed = asyncio.run(fetch_amount_codec(False))
+    assert refreshed is not first
+    assert USDT not in refreshed
@@ -0,0 +1,65 @@
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("pyinjective")
+
+from pyinjective.composer import Composer  # noqa: E402
+
+from injective_functions.bank import InjectiveBank  # noqa: E402
+from injective_functions.utils import amounts, indexer_requests  # noqa: E402
+
+USDT = "peggy0xdAC17F958D2ee523a2206206994597C13D831ec7"
+SENDER = "inj1sender"
+RECIPIENT = "inj1recipient"
+
+
+class Address:
+    def to_acc_bech32(self):
+        return SENDER
+
+
+class ChainClient:
+    network_type = "testnet"
+
+    def __init__(self):
+        self.composer = Composer(network="testnet")
+        self.address = Address()
+        self.messages = []
+
+    async def build_and_broadcast_tx(self, msg):
+        self.messages.append(msg)
+        return {"success": True}
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    cache = {("denoms", False): (time.monotonic(), {"inj": 18, USDT: 6})}
+    monkeypatch.setattr(indexer_requests, "_metadata_cache", cache)
+    monkeypatch.setattr(amounts, "_codecs", {})
+
+
+def test_transfer_of_a_registry_denom_sends_the_exact_chain_amount():
+    chain_client = ChainClient()
+    bank = InjectiveBank(chain_client)
+
+    result = asyncio.run(
+        bank.transfer_funds(Decimal("1.234567890123456789"), "inj", RECIPIENT)
+    )
+
+    assert result["success"]
+    [msg] = chain_client.messages
+    assert msg.from_address == SENDER
+    assert msg.to_address == RECIPIENT
+    assert [(coin.denom, coin.amount) for coin in msg.amount] == [
+        ("inj", "1234567890123456789")
+    ]
+
+
+def test_transfer_rejects_amounts_finer_than_the_denom():
+    bank = InjectiveBank(ChainClient())
+
+    with pytest.raises(ValueError, match="decimals"):
+        asyncio.run(bank.transfer_funds("0.0000001", USDT, RECIPIENT))
@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+from app.history import HistoryManager, count_tokens, message_tokens
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def assistant(text):
+    return {"role": "assistant", "content": text}
+
+
+def turn(index, words=40):
+    """A user message and its answer, each about words tokens"""
+    return [
+        user(f"question {index} " + "lorem " * words),
+        assistant(f"answer {index} " + "ipsum " * words),
+    ]
+
+
+def add_turns(manager, session_id, count, words=40):
+    for index in range(count):
+        for message in turn(index, words):
+            manager.append(session_id, message)
+
+
+def test_history_within_budget_is_kept():
+    manager = HistoryManager(max_tokens=10_000)
+    add_turns(manager, "s", 5)
+
+    history = manager.get("s")
+    assert len(history) == 10
+    assert history.total_tokens == sum(
+        message_tokens(message) for message in history.messages
+    )
+
+
+def test_oldest_turns_are_evicted_whole():
+    turn_tokens = sum(message_tokens(message) for message in turn(0))
+    manager = HistoryManager(max_tokens=turn_tokens * 4)
+    add_turns(manager, "s", 10)
+
+    history = manager.get("s")
+    assert history.total_tokens <= manager.max_tokens
+    assert history.total_tokens == sum(history.token_counts)
+    # eviction stops once the history is back under three quarters of the budget
+    assert history.total_tokens <= manager.max_tokens * 3 // 4 + turn_tokens
+    assert history.messages[0]["role"] == "user"
+    assert len(history) % 2 == 0
+    assert history.messages[-1]["content"].startswith("answer 9 ")
+
+
+def test_current_turn_is_never_evicted():
+    manager = HistoryManager(max_tokens=50)
+    manager.append("s", user("hello"))
+    manager.append("s", assistant("word " * 500))
+
+    history = manager.get("s")
+    assert len(history) == 2
+    assert history.total_tokens > manager.max_tokens
+
+
+def test_tool_call_stays_with_its_result():
+    manager = HistoryManager(max_tokens=150)
+    for index in range(6):
+        manager.append("s", user(f"price {index} " + "lorem " * 20))
+        manager.append(
+            "s",
+            {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call{index}",
+                        "type": "function",
+                        "function": {"name": "get_price", "arguments": "{}"},
+                    }
+                ],
+            },
+        )
+        manager.append(
+            "s", {"role": "tool", "tool_call_id": f"call{index}", "content": "{}"}
+        )
+
+    messages = manager.get("s").messages
+    call_ids = {
+        call["id"] for message in messages for call in message.get("tool_calls") or []
+    }
+    result_ids = {
+        message["tool_call_id"] for message in messages if message["role"] == "tool"
+    }
+    assert len(messages) < 18
+    assert call_ids == result_ids
+
+
+def test_large_function_results_are_digested():
+    manager = HistoryManager(max_tokens=100_000, max_function_tokens=200)
+    payload = {"orders": [{"price": str(i), "id": "x" * 50} for i in range(500)]}
+
+    stored = manager.append(
+        "s", {"role": "tool", "tool_call_id": "1", "content": json.dumps(payload)}
+    )
+
+    assert count_tokens(stored["content"]) <= 200
+    digest = json.loads(stored["content"])
+    assert digest["orders"][-1] == "<495 more items>"
+    assert manager.get("s").messages[0] is stored
+
+
+def test_small_function_results_are_kept_verbatim():
+    manager = HistoryManager(max_function_tokens=200)
+    content = json.dumps({"success": True, "result": {"inj": "1"}})
+
+    stored = manager.append(
+        "s", {"role": "tool", "tool_call_id": "1", "content": content}
+    )
+
+    assert stored["content"] == content
+
+
+def test_evicted_turns_are_folded_into_the_summary():
+    summarized = []
+
+    async def summarizer(summary, messages):
+        summarized.extend(messages)
+        return "short summary"
+
+    async def scenario():
+        turn_tokens = sum(message_tokens(message) for message in turn(0))
+        manager = HistoryManager(max_tokens=turn_tokens * 4, summarizer=summarizer)
+        add_turns(manager, "s", 10)
+        await asyncio.gather(*manager._tasks)
+        return manager
+
+    manager = asyncio.run(scenario())
+    history = manager.get("s")
+
+    assert history.summary == "short summary"
+    assert history.summary_tokens == count_tokens("short summary")
+    assert len(summarized) + len(history) == 20
+    assert history.request_messages()[0]["role"] == "system"
+    assert history.total_tokens + history.summary_tokens <= manager.max_tokens
+
+
+def test_rollback_restores_the_token_count():
+    manager = HistoryManager()
+    add_turns(manager, "s", 2)
+    before = manager.get("s").total_tokens
+
+    start = manager.append("s", user("buy 1 btc"))
+    manager.append("s", assistant("done"))
+    manager.rollback_to("s", start)
+
+    history = manager.get("s")
+    assert len(history) == 4
+    assert history.total_tokens == before
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from app.intent_parser import IntentParser
+
+TICKERS = {"mainnet": {"BTC/USDT PERP": "0x1", "ETH/USDC PERP": "0x2"}}
+
+
+@pytest.fixture
+def parser():
+    return IntentParser(markets=TICKERS.get)
+
+
+def parsed(parser, message, network="mainnet"):
+    intent = parser.parse(message, network)
+    return intent and (intent.function_name, intent.arguments)
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("Show my balances", ("query_balances", {})),
+        (
+            "price of btc perp",
+            (
+                "get_mid_price_and_tob_derivatives_market",
+                {"market_id": "BTC/USDT PERP"},
+            ),
+        ),
+        (
+            "long 1 eth/usdc perp at 10 3x",
+            (
+                "place_derivative_limit_order",
+                {
+                    "market_id": "ETH/USDC PERP",
+                    "side": "BUY",
+                    "quantity": "1",
+                    "subaccount_idx": 0,
+                    "leverage": "3",
+                    "price": "10",
+                },
+            ),
+        ),
+        (
+            "sell 0.5 btcusdt perp 2x",
+            (
+                "place_derivative_market_order",
+                {
+                    "market_id": "BTC/USDT PERP",
+                    "side": "SELL",
+                    "quantity": "0.5",
+                    "subaccount_idx": 0,
+                    "leverage": "2",
+                },
+            ),
+        ),
+    ],
+)
+def test_unambiguous_commands_are_parsed(parser, message, expected):
+    assert parsed(parser, message) == expected
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        # spot and unqualified markets are left to the model
+        "buy 1 inj/usdt",
+        "price of inj/usdt",
+        "buy 0.01 btc 5x",
+        # leverage is never guessed
+        "buy 0.01 btc perp",
+        "buy 0 btc perp 5x",
+    ],
+)
+def test_ambiguous_commands_go_to_the_model(parser, message):
+    assert parser.parse(message) is None
+    assert parser.stats()["unknown_markets"] == 0
+
+
+def test_unknown_markets_go_to_the_model(parser):
+    assert parser.parse("buy 1 sol perp 2x") is None
+    assert parser.parse("buy 1 btc perp 2x", "testnet") is None
+    assert IntentParser().parse("buy 1 btc perp 2x") is None
+    assert parser.stats()["unknown_markets"] == 2
+
+
+def test_intents_become_tool_calls(parser):
+    call = parser.parse("price of btc perp").to_tool_call()
+
+    assert call["id"].startswith("call_local_")
+    assert json.loads(call["arguments"]) == {"market_id": "BTC/USDT PERP"}
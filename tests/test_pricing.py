@@ -0,0 +1,136 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from injective_functions.exchange.pricing import (
+    InsufficientLiquidityError,
+    MarketCache,
+    OrderbookSnapshot,
+    estimate_market_fill,
+    format_fill_estimate,
+)
+
+
+def levels(*pairs):
+    return [(Decimal(price), Decimal(quantity)) for price, quantity in pairs]
+
+
+@pytest.fixture
+def snapshot():
+    # given unsorted, the snapshot orders bids best first and asks best first
+    return OrderbookSnapshot(
+        "btc",
+        bids=levels(("98", "2"), ("99", "1"), ("97", "5")),
+        asks=levels(("102", "2"), ("101", "1"), ("103", "5")),
+    )
+
+
+def test_buy_within_best_level(snapshot):
+    estimate = estimate_market_fill(snapshot, "buy", Decimal("0.5"), Decimal(0))
+
+    assert estimate["side"] == "BUY"
+    assert estimate["average_price"] == Decimal("101")
+    assert estimate["worst_price"] == Decimal("101")
+    assert estimate["limit_price"] == Decimal("101")
+    assert estimate["levels_consumed"] == 1
+    assert estimate["mid_price"] == Decimal("100")
+
+
+def test_buy_walks_the_asks(snapshot):
+    estimate = estimate_market_fill(snapshot, "BUY", Decimal("4"), Decimal("0.01"))
+
+    # 1 @ 101 + 2 @ 102 + 1 @ 103
+    assert estimate["average_price"] == Decimal("408") / 4
+    assert estimate["worst_price"] == Decimal("103")
+    assert estimate["limit_price"] == Decimal("103") * Decimal("1.01")
+    assert estimate["levels_consumed"] == 3
+
+
+def test_sell_walks_the_bids(snapshot):
+    estimate = estimate_market_fill(snapshot, "SELL", Decimal("3"), Decimal("0.02"))
+
+    # 1 @ 99 + 2 @ 98
+    assert estimate["average_price"] == Decimal("295") / 3
+    assert estimate["worst_price"] == Decimal("98")
+    assert estimate["limit_price"] == Decimal("98") * Decimal("0.98")
+    assert estimate["levels_consumed"] == 2
+
+
+def test_exact_depth_fills(snapshot):
+    estimate = estimate_market_fill(snapshot, "SELL", Decimal("8"), Decimal(0))
+
+    assert estimate["worst_price"] == Decimal("97")
+    assert estimate["levels_consumed"] == 3
+
+
+def test_insufficient_liquidity(snapshot):
+    with pytest.raises(
+        InsufficientLiquidityError, match="8 of 9 available on the ask side"
+    ):
+        estimate_market_fill(snapshot, "BUY", Decimal("9"))
+
+
+def test_empty_side():
+    snapshot = OrderbookSnapshot("btc", bids=levels(("99", "1")), asks=[])
+
+    with pytest.raises(ValueError, match="Insufficient liquidity"):
+        estimate_market_fill(snapshot, "BUY", Decimal("1"))
+    assert snapshot.mid_price is None
+
+
+@pytest.mark.parametrize(
+    "side, quantity, slippage, message",
+    [
+        ("HOLD", "1", "0", "Invalid order side"),
+        ("BUY", "0", "0", "must be positive"),
+        ("BUY", "1", "-0.01", "cannot be negative"),
+    ],
+)
+def test_invalid_orders(snapshot, side, quantity, slippage, message):
+    with pytest.raises(ValueError, match=message):
+        estimate_market_fill(snapshot, side, Decimal(quantity), Decimal(slippage))
+
+
+def test_from_chain_converts_levels():
+    class Market:
+        def price_from_extended_chain_format(self, value):
+            return value / 10**18
+
+        def quantity_from_extended_chain_format(self, value):
+            return value / 10**6
+
+    snapshot = OrderbookSnapshot.from_chain(
+        "btc",
+        {
+            "buysPriceLevel": [{"p": "99" + "0" * 18, "q": "1000000"}],
+            "sellsPriceLevel": [{"p": "101" + "0" * 18, "q": "2000000"}],
+        },
+        Market(),
+    )
+
+    assert snapshot.bids == levels(("99", "1"))
+    assert snapshot.asks == levels(("101", "2"))
+    estimate = estimate_market_fill(snapshot, "BUY", Decimal("2"), Decimal(0))
+    assert format_fill_estimate(estimate)["average_price"] == "101"
+
+
+def test_market_cache_fetches_the_markets_once():
+    class Client:
+        requests = 0
+
+        async def all_spot_markets(self):
+            self.requests += 1
+            return {"btc": "btc market"}
+
+    async def scenario():
+        cache, client = MarketCache(), Client()
+        first = [
+            await cache.get(client, "testnet", "btc", is_derivative=False)
+            for _ in range(3)
+        ]
+        # unknown markets ask the chain again, they may have been listed since
+        missing = await cache.get(client, "testnet", "eth", is_derivative=False)
+        return first, missing, client.requests
+
+    assert asyncio.run(scenario()) == (["btc market"] * 3, None, 2)
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.history import HistoryManager
+from app.session_store import SessionStore, SQLiteSessionStore
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def persisted_session(path):
+    async def write():
+        store = SQLiteSessionStore(str(path))
+        manager = HistoryManager(store=store)
+        manager.append("s", {"role": "user", "content": "hello"})
+        await store.close()
+
+    asyncio.run(write())
+    return SQLiteSessionStore(str(path))
+
+
+def test_load_reads_a_cold_session_off_the_event_loop(tmp_path):
+    store = persisted_session(tmp_path / "sessions.db")
+    manager = HistoryManager(store=store)
+
+    async def scenario():
+        await manager.load("s")
+        await manager.load("missing")
+        return manager.get("s")
+
+    history = asyncio.run(scenario())
+
+    assert history.messages == [{"role": "user", "content": "hello"}]
+    stats = store.stats()
+    assert (stats["disk_loads"], stats["blocking_loads"]) == (1, 0)
+    asyncio.run(store.close())
+
+
+def test_get_without_load_still_finds_the_session(tmp_path):
+    store = persisted_session(tmp_path / "sessions.db")
+
+    assert store.get("s").messages[0]["content"] == "hello"
+    assert store.stats()["blocking_loads"] == 1
+    asyncio.run(store.close())
+
+
+def test_load_keeps_deleted_sessions_deleted(tmp_path):
+    store = persisted_session(tmp_path / "sessions.db")
+    store.delete("s")
+
+    asyncio.run(store.load("s"))
+
+    assert store.get("s") is None
+    assert store.stats()["disk_loads"] == 0
+    asyncio.run(store.close())
@@ -0,0 +1,84 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("pyinjective")
+
+from injective_functions.exchange import trader as trader_module  # noqa: E402
+from injective_functions.exchange.pricing import (  # noqa: E402
+    DEFAULT_BOOK_DEPTH,
+    MarketCache,
+    OrderbookCache,
+)
+
+MARKET = "0x" + "5" * 64
+
+
+class Client:
+    def __init__(self, books):
+        self.books = list(books)
+        self.limits = []
+        self.market_requests = 0
+
+    async def all_spot_markets(self):
+        self.market_requests += 1
+        return {MARKET: object()}
+
+    async def fetch_chain_spot_orderbook(self, market_id, pagination):
+        self.limits.append(pagination.limit)
+        asks = self.books.pop(0)
+        return {
+            "buysPriceLevel": [{"p": "99", "q": "10"}],
+            "sellsPriceLevel": [{"p": p, "q": q} for p, q in asks],
+        }
+
+
+class ChainClient:
+    network_type = "testnet"
+
+    def __init__(self, client):
+        self.client = client
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    monkeypatch.setattr(trader_module, "orderbook_cache", OrderbookCache())
+    monkeypatch.setattr(trader_module, "market_cache", MarketCache())
+
+
+def quote(client, side, quantity):
+    trader = trader_module.InjectiveTrading(ChainClient(client))
+    return asyncio.run(
+        trader._quote_market_order(MARKET, quantity, side, "0", is_derivative=False)
+    )
+
+
+def test_quote_fetches_a_capped_book_and_reuses_the_markets():
+    client = Client([[("101", "1")], [("101", "1")]])
+
+    quote(client, "BUY", "1")
+    trader_module.orderbook_cache.invalidate("testnet", MARKET)
+    estimate = quote(client, "BUY", "1")
+
+    assert estimate["limit_price"] == Decimal("101")
+    assert client.limits == [DEFAULT_BOOK_DEPTH, DEFAULT_BOOK_DEPTH]
+    assert client.market_requests == 1
+
+
+def test_quote_refetches_a_book_too_thin_for_the_order():
+    client = Client([[("101", "1")], [("101", "1"), ("102", "5")]])
+
+    quote(client, "BUY", "1")
+    estimate = quote(client, "BUY", "3")
+
+    assert estimate["worst_price"] == Decimal("102")
+    assert len(client.limits) == 2
+
+
+def test_quote_does_not_refetch_for_invalid_orders():
+    client = Client([[("101", "1")]])
+
+    with pytest.raises(ValueError, match="Invalid order side"):
+        quote(client, "HOLD", "1")
+    assert len(client.limits) == 1
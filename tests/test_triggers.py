@@ -0,0 +1,343 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("pyinjective")
+
+from injective_functions.triggers import InjectiveTriggers  # noqa: E402
+from injective_functions.triggers.engine import (  # noqa: E402
+    MarketTriggerIndex,
+    PriceTrigger,
+    PriceTriggerEngine,
+)
+
+SPOT_MARKET = "0x" + "5" * 64
+DERIVATIVE_MARKET = "0x" + "d" * 64
+
+
+def trigger(direction, price, agent_id="agent"):
+    return PriceTrigger(
+        agent_id, "testnet", "market", "spot", direction, Decimal(price), {}
+    )
+
+
+def test_index_pops_crossed_triggers_only():
+    index = MarketTriggerIndex()
+    above_low, above_high = trigger("above", "110"), trigger("above", "120")
+    below_high, below_low = trigger("below", "90"), trigger("below", "80")
+    for item in (above_high, below_low, above_low, below_high):
+        index.add(item)
+
+    assert index.pop_crossed(Decimal("100")) == []
+    assert index.pop_crossed(Decimal("110")) == [above_low.trigger_id]
+    assert index.pop_crossed(Decimal("85")) == [below_high.trigger_id]
+    assert len(index) == 2
+    assert sorted(index.pop_crossed(Decimal("200"))) == [above_high.trigger_id]
+    assert index.pop_crossed(Decimal("1")) == [below_low.trigger_id]
+    assert len(index) == 0
+
+
+def test_index_fires_in_price_order():
+    index = MarketTriggerIndex()
+    triggers = [trigger("below", price) for price in ("70", "95", "80", "90")]
+    for item in triggers:
+        index.add(item)
+
+    # "below" triggers closest to the price cross first
+    fired = index.pop_crossed(Decimal("75"))
+    by_id = {item.trigger_id: item.trigger_price for item in triggers}
+    assert [by_id[trigger_id] for trigger_id in fired] == [
+        Decimal("95"),
+        Decimal("90"),
+        Decimal("80"),
+    ]
+
+
+def test_index_skips_removed_triggers():
+    index = MarketTriggerIndex()
+    kept, removed = trigger("above", "110"), trigger("above", "105")
+    index.add(kept)
+    index.add(removed)
+
+    assert index.remove(removed.trigger_id)
+    assert not index.remove(removed.trigger_id)
+    assert index.pop_crossed(Decimal("120")) == [kept.trigger_id]
+    assert len(index) == 0
+
+
+def test_index_compacts_stale_entries():
+    index = MarketTriggerIndex()
+    triggers = [trigger("above", str(100 + offset)) for offset in range(10)]
+    for item in triggers:
+        index.add(item)
+    for item in triggers[:9]:
+        index.remove(item.trigger_id)
+
+    assert len(index) == 1
+    assert len(index.above) <= 2
+    assert index.pop_crossed(Decimal("200")) == [triggers[9].trigger_id]
+
+
+class Trader:
+    def __init__(self, result=None):
+        self.batches = []
+        self.result = result or {"success": True, "txhash": "ABC"}
+        self.release = asyncio.Event()
+        self.release.set()
+        # functions whose orders cannot be built
+        self.unbuildable = set()
+
+    async def build_order_msg(self, order):
+        if order["function"] in self.unbuildable:
+            raise ValueError("Insufficient liquidity")
+        return order, None
+
+    async def broadcast_order_msgs(self, built):
+        await self.release.wait()
+        self.batches.append([msg for msg, _ in built])
+        return self.result
+
+
+def add(engine, agent_id, direction, price, order):
+    return engine.add_trigger(
+        agent_id, "testnet", "market", "spot", direction, Decimal(price), order
+    )
+
+
+def test_engine_fires_one_batch_per_agent():
+    async def scenario():
+        traders = {"a": Trader(), "b": Trader()}
+        engine = PriceTriggerEngine(lambda agent_id: {"trader": traders[agent_id]})
+        add(engine, "a", "above", "110", {"function": "a1"})
+        add(engine, "a", "above", "105", {"function": "a2"})
+        add(engine, "b", "below", "90", {"function": "b1"})
+        waiting = add(engine, "b", "above", "130", {"function": "b2"})
+
+        assert engine.process_ticks([("testnet", "market", Decimal("100"))]) == 0
+        assert engine.process_ticks([("testnet", "market", Decimal("115"))]) == 2
+        await asyncio.sleep(0)
+        assert engine.process_ticks([("testnet", "market", Decimal("85"))]) == 1
+        await asyncio.gather(*engine._pending)
+
+        orders_a = [order["function"] for order in traders["a"].batches[0]]
+        assert len(traders["a"].batches) == 1
+        assert sorted(orders_a) == ["a1", "a2"]
+        assert traders["b"].batches == [[{"function": "b1"}]]
+        assert engine.fired == 3
+        statuses = {
+            item["order"]["function"]: item["status"]
+            for item in engine.list_triggers("b")
+        }
+        assert statuses == {"b2": "active", "b1": "fired"}
+        assert engine.active_agents() == {"b"}
+        assert engine.cancel_trigger("b", waiting.trigger_id)
+        assert engine.active_agents() == set()
+
+    asyncio.run(scenario())
+
+
+def test_engine_records_failed_batches():
+    async def scenario():
+        trader = Trader({"success": False, "error": "out of gas"})
+        engine = PriceTriggerEngine(lambda agent_id: {"trader": trader})
+        add(engine, "a", "above", "110", {"function": "a1"})
+
+        engine.process_ticks([("testnet", "market", Decimal("110"))])
+        await asyncio.gather(*engine._pending)
+
+        [record] = engine.list_triggers("a")
+        assert record["status"] == "failed"
+        assert record["result"] == {"error": "out of gas"}
+        assert record["fired_price"] == "110"
+        assert engine.failed == 1
+
+    asyncio.run(scenario())
+
+
+def test_engine_rearms_orders_that_cannot_be_built():
+    async def scenario():
+        trader = Trader()
+        trader.unbuildable.add("stop")
+        engine = PriceTriggerEngine(lambda agent_id: {"trader": trader}, max_attempts=2)
+        stop = add(engine, "a", "below", "90", {"function": "stop"})
+        add(engine, "a", "below", "95", {"function": "take"})
+
+        engine.process_ticks([("testnet", "market", Decimal("85"))])
+        await asyncio.gather(*engine._pending)
+
+        assert trader.batches == [[{"function": "take"}]]
+        statuses = {
+            item["order"]["function"]: (item["status"], item["attempts"])
+            for item in engine.list_triggers("a")
+        }
+        assert statuses == {"stop": ("active", 1), "take": ("fired", 0)}
+        assert stop.result == {"error": "Insufficient liquidity"}
+        assert engine.active_agents() == {"a"}
+
+        # the next crossing retries it, and max_attempts ends the retries
+        engine.process_ticks([("testnet", "market", Decimal("85"))])
+        await asyncio.gather(*engine._pending)
+
+        assert stop.status == "failed"
+        assert engine.stats()["rearmed"] == 1
+        assert (engine.fired, engine.failed) == (1, 1)
+        assert engine.active_agents() == set()
+
+    asyncio.run(scenario())
+
+
+def test_engine_fails_triggers_of_rejected_transactions():
+    async def scenario():
+        trader = Trader(
+            {
+                "success": True,
+                "result": {"txResponse": {"code": 5, "rawLog": "insufficient funds"}},
+            }
+        )
+        engine = PriceTriggerEngine(lambda agent_id: {"trader": trader})
+        add(engine, "a", "above", "110", {"function": "a1"})
+
+        engine.process_ticks([("testnet", "market", Decimal("110"))])
+        await asyncio.gather(*engine._pending)
+
+        [record] = engine.list_triggers("a")
+        assert record["status"] == "failed"
+        assert record["result"] == {"error": "insufficient funds"}
+        assert engine.fired == 0
+
+    asyncio.run(scenario())
+
+
+def test_engine_keeps_firing_agents_active():
+    async def scenario():
+        trader = Trader()
+        trader.release.clear()
+        engine = PriceTriggerEngine(lambda agent_id: {"trader": trader})
+        add(engine, "a", "above", "110", {"function": "a1"})
+
+        engine.process_ticks([("testnet", "market", Decimal("120"))])
+        await asyncio.sleep(0)
+        assert engine.active_agents() == {"a"}
+        trader.release.set()
+        await asyncio.gather(*engine._pending)
+        assert engine.active_agents() == set()
+
+    asyncio.run(scenario())
+
+
+def test_engine_without_clients_fails_the_batch():
+    async def scenario():
+        engine = PriceTriggerEngine(lambda agent_id: None)
+        add(engine, "a", "below", "90", {"function": "a1"})
+
+        engine.process_ticks([("testnet", "market", Decimal("80"))])
+        await asyncio.gather(*engine._pending)
+
+        assert engine.list_triggers("a")[0]["result"] == {
+            "error": "Agent not initialized"
+        }
+
+    asyncio.run(scenario())
+
+
+class Market:
+    def price_from_extended_chain_format(self, value):
+        return value / 1000
+
+
+class MarketsClient:
+    def __init__(self):
+        self.market_requests = 0
+
+    async def all_derivative_markets(self):
+        self.market_requests += 1
+        return {DERIVATIVE_MARKET: Market()}
+
+    async def all_spot_markets(self):
+        self.market_requests += 1
+        return {SPOT_MARKET: Market()}
+
+    async def fetch_derivative_mid_price_and_tob(self, market_id):
+        return {"midPrice": "4000"}
+
+
+class ChainClient:
+    network_type = "testnet"
+    client = MarketsClient()
+
+
+ORDER = {"quantity": "1", "side": "BUY", "subaccount_idx": 0}
+
+
+def set_trigger(market_id, order_function, arguments):
+    engine = PriceTriggerEngine(lambda agent_id: None)
+    triggers = InjectiveTriggers(ChainClient(), engine, "agent")
+    result = asyncio.run(
+        triggers.set_price_trigger(market_id, "above", "5", order_function, arguments)
+    )
+    return engine, result
+
+
+def test_set_trigger_takes_the_feed_from_the_watched_market():
+    engine, result = set_trigger(
+        DERIVATIVE_MARKET,
+        "place_spot_market_order",
+        dict(ORDER, market_id=SPOT_MARKET),
+    )
+
+    assert result["success"]
+    assert engine._market_types == {("testnet", DERIVATIVE_MARKET): "derivative"}
+    assert result["result"]["order"]["arguments"]["market_id"] == SPOT_MARKET
+    assert isinstance(engine._markets[("testnet", DERIVATIVE_MARKET)], Market)
+
+
+def test_feed_resolves_each_market_once():
+    client = MarketsClient()
+    engine = PriceTriggerEngine(lambda agent_id: None)
+    engine._feed_clients["testnet"] = client
+
+    async def scenario():
+        return [
+            await engine._fetch_mid_price("testnet", DERIVATIVE_MARKET, "derivative")
+            for _ in range(3)
+        ]
+
+    assert asyncio.run(scenario()) == [Decimal("4")] * 3
+    assert client.market_requests == 1
+
+
+@pytest.mark.parametrize(
+    "market_id, order_function, arguments, message",
+    [
+        (
+            DERIVATIVE_MARKET,
+            "place_derivative_limit_order",
+            dict(ORDER, price="10"),
+            "missing a required argument: 'leverage'",
+        ),
+        (
+            SPOT_MARKET,
+            "place_spot_market_order",
+            dict(ORDER, leverage="2"),
+            "unexpected keyword argument 'leverage'",
+        ),
+        (SPOT_MARKET, "place_spot_market_order", dict(ORDER, quantity="0"), "quantity"),
+        (
+            SPOT_MARKET,
+            "place_derivative_market_order",
+            dict(ORDER, leverage="2"),
+            "cannot place orders on the spot market",
+        ),
+        ("0x" + "9" * 64, "place_spot_market_order", ORDER, "Unknown market"),
+    ],
+)
+def test_set_trigger_rejects_orders_that_cannot_be_built(
+    market_id, order_function, arguments, message
+):
+    engine, result = set_trigger(market_id, order_function, arguments)
+
+    assert not result["success"]
+    # errors are wrapped by detailed_exception_info
+    assert message in result["error"]["error"]["message"]
+    assert engine.stats()["active_triggers"] == 0
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("quart")
+pytest.importorskip("pyinjective")
+
+import agent_server  # noqa: E402
+
+AGENTS = {
+    "agent1": {
+        "address": "inj1first",
+        "private_key": "01" * 32,
+        "network": "testnet",
+    },
+    "agent2": {
+        "address": "inj1second",
+        "private_key": "02" * 32,
+        "network": "testnet",
+    },
+}
+
+
+@pytest.fixture
+def chat_agent(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("INJECTIVE_CLIENT_FACTORY", "benchmarks.fake_chain:create_all")
+
+    async def prefetch_metadata(network):
+        return {}
+
+    monkeypatch.setattr(agent_server, "prefetch_metadata", prefetch_metadata)
+    return agent_server.InjectiveChatAgent()
+
+
+def test_warmed_agents_are_found_under_their_address(chat_agent):
+    async def scenario():
+        await chat_agent.warm_up(AGENTS)
+        clients = chat_agent.agents.get("inj1first")
+        # a chat request of the same agent reuses the warmed clients
+        await chat_agent.initialize_agent("inj1first", "01" * 32, "testnet")
+        return clients
+
+    clients = asyncio.run(scenario())
+
+    assert chat_agent.ready
+    assert chat_agent.warmup_status["initialized"] == 2
+    assert clients is not None
+    assert chat_agent.agents.get("inj1first") is clients
+    assert chat_agent.agents.get("agent1") is None
+    assert chat_agent.agents.get("inj1second") is not None